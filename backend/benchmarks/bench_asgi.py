@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Sync vs Async Serving Benchmark
+Run this against a development database to compare the two serving modes
+under many concurrent study-session requests. It seeds benchmark users,
+sets and cards (as bench_load.py does), then for each mode starts one
+server process:
+
+    sync   the Flask app on Werkzeug's threaded server (as app.py runs it)
+    async  python_ai_service.asgi on uvicorn
+
+and holds --concurrency connections open at once, each fetching study
+sessions and due cards back to back. Requests/sec, p50/p99 latency,
+failed requests, and the server's peak thread count and memory are
+reported for each concurrency level. The client is a small asyncio HTTP
+client, so it can hold thousands of connections itself. Both servers use
+the same DB_POOL_* settings.
+
+    python benchmarks/bench_asgi.py --concurrency 10,100,1000 --duration 10
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from http.cookiejar import CookieJar
+
+# Add the backend directory to the path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from bench_load import PASSWORD, SERVER, cleanup, seed
+from python_ai_service.db.database import db_connection
+
+MODES = {
+    'sync': lambda port: [sys.executable, '-c', SERVER, str(port)],
+    'async': lambda port: [sys.executable, '-m', 'uvicorn', '--factory', 'python_ai_service.asgi:create_asgi_app',
+                           '--port', str(port), '--no-access-log', '--log-level', 'warning', '--backlog', '4096'],
+}
+
+def start_server(mode, port):
+    env = dict(os.environ)
+    # Under overload most requests are slow; keep the slow-request warnings out of the results
+    env.setdefault('LOG_LEVEL', 'ERROR')
+    env['PYTHONPATH'] = BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    server = subprocess.Popen(MODES[mode](port), env=env, cwd=BACKEND_DIR)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with status {server.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/test", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start within 30s")
+
+def session_cookie(port, username):
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    body = f'{{"username": "{username}", "password": "{PASSWORD}"}}'.encode()
+    opener.open(urllib.request.Request(f"http://127.0.0.1:{port}/login", data=body,
+                                       headers={'Content-Type': 'application/json'})).read()
+    return '; '.join(f"{cookie.name}={cookie.value}" for cookie in jar)
+
+def process_usage(pid):
+    """(threads, peak RSS in MiB) of a running process, from /proc."""
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = value.split()
+    return int(fields['Threads'][0]), int(fields['VmHWM'][0]) / 1024
+
+async def fetch(port, path, cookie, timeout):
+    """One GET on a fresh connection; returns the status code."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n"
+                     f"Connection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        return int(response.split(b' ', 2)[1])
+    finally:
+        writer.close()
+
+async def drive(port, users, concurrency, duration, seed_value, timeout):
+    latencies = []
+    failures = []
+    stop_at = time.perf_counter() + duration
+
+    async def client(index):
+        rng = random.Random(f"{seed_value}-{index}")
+        cookie, user = users[index % len(users)]
+        while time.perf_counter() < stop_at:
+            set_id = rng.choice(user["sets"])[0]
+            path = f"/study/session/{set_id}" if rng.random() < 0.5 else f"/progress/due?set_id={set_id}"
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path, cookie, timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures.append(status)
+                await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return latencies, failures, time.perf_counter() - started
+
+async def measure(pid, run):
+    """Await ``run`` while sampling the server's thread count; returns its result plus the peak."""
+    task = asyncio.ensure_future(run)
+    peak_threads = 0
+    while not task.done():
+        peak_threads = max(peak_threads, process_usage(pid)[0])
+        await asyncio.sleep(0.2)
+    return (*task.result(), peak_threads)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--sets-per-user', type=int, default=5)
+    parser.add_argument('--cards-per-set', type=int, default=30)
+    parser.add_argument('--concurrency', default='10,100,1000', help='comma-separated connection counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    print("=== Sync vs Async Serving Benchmark ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        print(f"Seeding {args.users} users x {args.sets_per_user} sets x {args.cards_per_set} cards...\n")
+        users = seed(conn, args.users, args.sets_per_user, args.cards_per_set)
+
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'failed':>7} "
+          f"{'threads':>8} {'peak MiB':>9}")
+    try:
+        for mode in args.modes.split(','):
+            for level in levels:
+                # A fresh server per level so peak threads and memory belong to that level
+                server = start_server(mode, args.port)
+                try:
+                    clients = [(session_cookie(args.port, user["username"]), user) for user in users]
+                    asyncio.run(drive(args.port, clients, min(level, 20), 1, args.seed, args.timeout))
+                    latencies, failures, elapsed, peak_threads = asyncio.run(measure(
+                        server.pid, drive(args.port, clients, level, args.duration, args.seed, args.timeout)))
+                    _, peak_mib = process_usage(server.pid)
+                finally:
+                    server.terminate()
+                    server.wait()
+
+                latencies.sort()
+                if len(latencies) > 1:
+                    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+                    p50, p99 = percentiles[49] * 1000, percentiles[98] * 1000
+                else:
+                    p50 = p99 = float('nan')
+                print(f"{mode:<6} {level:>7} {len(latencies) / elapsed:>8.1f} {p50:>8.1f} {p99:>9.1f} "
+                      f"{len(failures):>7} {peak_threads:>8} {peak_mib:>9.1f}")
+    finally:
+        if not args.keep:
+            with db_connection(timeout=60) as conn:
+                cleanup(conn)
+
+if __name__ == "__main__":
+    main()
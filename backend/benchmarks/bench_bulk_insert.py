@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Bulk Insert Benchmark
+Run this against a development database to compare rows/sec for inserting a
+set's flashcards one statement per card (the old path) versus the shared
+bulk-write path (multi-row VALUES, and COPY FROM STDIN for large sets).
+Every import is rolled back, so no data is left behind.
+
+    python benchmarks/bench_bulk_insert.py --sizes 10 100 10000
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.db.database import db_connection
+from python_ai_service.db.bulk import copy_flashcards, insert_flashcards
+
+def make_cards(n):
+    return [{"front": f"Question {i}\twith a tab", "back": f"Answer {i}\nwith a newline and a \\ backslash"}
+            for i in range(n)]
+
+def insert_set_row(cur, set_id, n):
+    cur.execute(
+        "INSERT INTO sets (set_id, topic, intensity_level, card_count, name) VALUES (%s, %s, %s, %s, %s)",
+        (set_id, 'benchmark', 'manual', n, 'benchmark')
+    )
+
+def per_row(cur, set_id, cards):
+    for card in cards:
+        cur.execute(
+            "INSERT INTO flashcards (set_id, front_text, back_text, star_status) VALUES (%s, %s, %s, false)",
+            (set_id, card['front'], card['back'])
+        )
+
+def values(cur, set_id, cards):
+    insert_flashcards(cur, set_id, cards, copy_threshold=len(cards) + 1)
+
+def copy(cur, set_id, cards):
+    copy_flashcards(cur, set_id, cards)
+
+def run(conn, method, cards):
+    set_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        insert_set_row(cur, set_id, len(cards))
+        method(cur, set_id, cards)
+        elapsed = time.perf_counter() - started
+        cur.execute("SELECT count(*) FROM flashcards WHERE set_id = %s", (set_id,))
+        assert cur.fetchone()[0] == len(cards)
+    conn.rollback()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=3, help='best of N runs per measurement')
+    args = parser.parse_args()
+
+    print("=== Bulk Insert Benchmark ===\n")
+    methods = [('per-row INSERT', per_row), ('multi-row VALUES', values), ('COPY FROM STDIN', copy)]
+    with db_connection() as conn:
+        print(f"{'cards':>8}  {'method':<18} {'seconds':>9} {'rows/sec':>12}")
+        for n in args.sizes:
+            cards = make_cards(n)
+            for name, method in methods:
+                best = min(run(conn, method, cards) for _ in range(args.repeat))
+                print(f"{n:>8}  {name:<18} {best:>9.4f} {n / best:>12.0f}")
+            print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Card Parser Benchmark
+Run this to measure how fast flashcards are extracted from large model
+responses. For each size it builds a pretty-printed JSON array of cards
+and reports MB/s and cards recovered for json.loads, parse_cards on the
+whole response, IncrementalCardParser fed in streaming-sized chunks, and
+parse_cards on the same response truncated mid-card and wrapped in prose
+(where json.loads recovers nothing).
+
+    python benchmarks/bench_card_parser.py --sizes 1,4,16 --chunk-size 64
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.card_parser import IncrementalCardParser, parse_cards
+
+WORDS = ('cell membrane protein enzyme {energy} pathway "signal" gene transcription ribosome '
+         'mitochondria gradient transport receptor hormone synthesis').split()
+
+def make_response(megabytes, seed_value):
+    """A pretty-printed card array of about ``megabytes`` MB, as a model would return it."""
+    rng = random.Random(seed_value)
+    cards = []
+    size = 0
+    while size < megabytes * 2 ** 20:
+        card = {"front": f"What does the {' '.join(rng.choices(WORDS, k=6))} do?",
+                "back": ' '.join(rng.choices(WORDS, k=20)) + '.'}
+        cards.append(card)
+        size += len(json.dumps(card)) + 12
+    return json.dumps(cards, indent=2)
+
+def json_loads(text):
+    try:
+        return len(json.loads(text))
+    except ValueError:
+        return 0
+
+def parse_whole(text):
+    return len(parse_cards(text)['cards'])
+
+def parse_chunked(text, chunk_size):
+    parser = IncrementalCardParser()
+    count = 0
+    for i in range(0, len(text), chunk_size):
+        count += len(parser.feed(text[i:i + chunk_size]))
+    return count
+
+def timed(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,4,16', help='comma-separated response sizes in MB')
+    parser.add_argument('--chunk-size', type=int, default=64, help='characters per streamed chunk')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=== Card Parser Benchmark ===\n")
+    print(f"{'MB':>5}  {'parser':<24} {'cards':>8} {'ms':>9} {'MB/s':>8}")
+    for megabytes in (float(size) for size in args.sizes.split(',')):
+        text = make_response(megabytes, args.seed)
+        # Cut mid-card, as max_tokens would, and wrap in the prose models add
+        noisy = 'Here are your flashcards:\n```json\n' + text[:len(text) - len(text) // 7]
+        size = len(text.encode()) / 2 ** 20
+        for name, function, function_args in (
+                ('json.loads', json_loads, (text,)),
+                ('parse_cards', parse_whole, (text,)),
+                (f'streamed ({args.chunk_size} chars)', parse_chunked, (text, args.chunk_size)),
+                ('json.loads (truncated)', json_loads, (noisy,)),
+                ('parse_cards (truncated)', parse_whole, (noisy,))):
+            count, elapsed = timed(function, *function_args)
+            print(f"{size:>5.1f}  {name:<24} {count:>8} {elapsed * 1000:>9.1f} {size / elapsed:>8.1f}")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Deck Import/Export Benchmark
+Run this against a development database to time bulk deck transfers. It
+writes a --cards card deck file in each format, then for each one starts
+the app on a threaded server (as bench_load.py does), uploads the file to
+/import_set and downloads the new set again from /export_set. For
+comparison the same cards are also sent as one JSON body to
+/create_manual_set. Seconds, cards/sec and the server's peak memory are
+reported per operation; a fresh server is started for every import, so
+its peak belongs to that import alone.
+
+    python benchmarks/bench_deck_io.py --cards 100000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import urllib.request
+
+# Add the backend directory to the path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from bench_asgi import process_usage
+from bench_load import Client, cleanup, seed, start_server
+from python_ai_service.db.database import db_connection
+from python_ai_service.services.deck_io import write_deck
+
+WORDS = ('cell membrane protein enzyme energy pathway signal gene transcription ribosome '
+         'mitochondria gradient transport receptor hormone synthesis').split()
+
+def make_cards(count, seed_value):
+    rng = random.Random(seed_value)
+    for index in range(count):
+        front = f"Card {index}: what does the {' '.join(rng.choices(WORDS, k=6))} do?"
+        back = ' '.join(rng.choices(WORDS, k=14)) + '.'
+        yield front, back, index % 9 == 0
+
+def timed_upload(client, path, file_path, content_type):
+    """POST a file as the raw body; returns (seconds, last NDJSON event)."""
+    started = time.perf_counter()
+    with open(file_path, 'rb') as body:
+        request = urllib.request.Request(client.url + path, data=body, method='POST', headers={
+            'Content-Type': content_type, 'Content-Length': str(os.path.getsize(file_path))})
+        with client.opener.open(request, timeout=600) as response:
+            last = None
+            for line in response:
+                last = json.loads(line)
+    return time.perf_counter() - started, last
+
+def timed_download(client, path):
+    """GET a response, discarding it as it arrives; returns (seconds, bytes)."""
+    started = time.perf_counter()
+    size = 0
+    with client.opener.open(client.url + path, timeout=600) as response:
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+    return time.perf_counter() - started, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=100000)
+    parser.add_argument('--formats', default='csv,tsv,anki')
+    parser.add_argument('--port', type=int, default=5096)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-json', action='store_true', help='skip the /create_manual_set comparison')
+    args = parser.parse_args()
+
+    print("=== Deck Import/Export Benchmark ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        user = seed(conn, 1, 1, 1)[0]
+    # Import limits are per deck; let this deck through whatever the configured cap
+    os.environ['IMPORT_MAX_CARDS'] = str(max(args.cards, 200000))
+    # Every operation here is a slow request; keep those warnings out of the results
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+    print(f"{'operation':<20} {'cards':>8} {'MiB':>7} {'seconds':>8} {'cards/s':>9} {'peak MiB':>9}")
+    def report(operation, cards, size, seconds, peak):
+        peak = f"{peak:>9.1f}" if peak is not None else f"{'-':>9}"
+        print(f"{operation:<20} {cards:>8} {size / 2 ** 20:>7.1f} {seconds:>8.2f} {cards / seconds:>9.0f} {peak}")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in args.formats.split(','):
+                file_path = os.path.join(directory, f"deck.{fmt}")
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    for chunk in write_deck(make_cards(args.cards, args.seed), fmt, 'Benchmark deck'):
+                        f.write(chunk)
+
+                server, url = start_server(args.port)
+                try:
+                    client = Client(url, user)
+                    client.login()
+                    seconds, event = timed_upload(client, f"/import_set?format={fmt}&name=bench+{fmt}",
+                                                  file_path, 'text/plain')
+                    if event.get('type') != 'done':
+                        raise RuntimeError(f"{fmt} import failed: {event}")
+                    report(f"import {fmt}", event['imported'], os.path.getsize(file_path), seconds,
+                           process_usage(server.pid)[1])
+                    seconds, size = timed_download(client, f"/export_set/{event['set_id']}?format={fmt}")
+                    report(f"export {fmt}", event['imported'], size, seconds, process_usage(server.pid)[1])
+                finally:
+                    server.terminate()
+                    server.wait()
+
+            if not args.no_json:
+                body = json.dumps({"name": "bench json", "cards": [
+                    {"front": front, "back": back} for front, back, _ in make_cards(args.cards, args.seed)]})
+                server, url = start_server(args.port)
+                try:
+                    client = Client(url, user)
+                    client.login()
+                    started = time.perf_counter()
+                    status = client.request('POST', '/create_manual_set', json.loads(body))
+                    seconds = time.perf_counter() - started
+                    if status != 201:
+                        raise RuntimeError(f"create_manual_set failed with status {status}")
+                    report("create_manual_set", args.cards, len(body), seconds, process_usage(server.pid)[1])
+                finally:
+                    server.terminate()
+                    server.wait()
+    finally:
+        with db_connection(timeout=60) as conn:
+            cleanup(conn)
+
+if __name__ == "__main__":
+    main()
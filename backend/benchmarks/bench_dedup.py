@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Dedup Benchmark
+Run this to time the card dedup stage on synthetic decks seeded with known
+exact and near duplicates, and to check how many of them it finds. For
+small decks it also times a brute-force all-pairs Jaccard comparison, which
+is what the MinHash/LSH stage avoids. No database is needed.
+
+    python benchmarks/bench_dedup.py --sizes 1000 10000 --dup-rate 0.1
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.dedup import NEAR_DUPLICATE_THRESHOLD, dedupe_cards, normalize_text
+
+def make_deck(n, dup_rate, seed):
+    """Return (cards, exact dups injected, near dups injected)."""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+                  for _ in range(5000)]
+    originals = [{"front": ' '.join(rng.choices(vocabulary, k=rng.randint(5, 12))) + '?',
+                  "back": ' '.join(rng.choices(vocabulary, k=rng.randint(6, 20)))}
+                 for _ in range(n)]
+    cards = list(originals)
+    exact = near = 0
+    for _ in range(int(n * dup_rate)):
+        source = rng.choice(originals)
+        if rng.random() < 0.5:
+            # Same question, different case and punctuation
+            cards.append({"front": source["front"].upper().rstrip('?') + '!', "back": source["back"]})
+            exact += 1
+        else:
+            # Reworded slightly: one extra word at the end of the answer
+            cards.append({"front": source["front"].rstrip('?') + ' exactly?',
+                          "back": source["back"] + ' ' + rng.choice(vocabulary)})
+            near += 1
+    rng.shuffle(cards)
+    return cards, exact, near
+
+def brute_force(cards):
+    """All-pairs Jaccard over the same shingles, for comparison."""
+    shingles = []
+    for card in cards:
+        text = normalize_text(card["front"]) + ' | ' + normalize_text(card["back"])
+        shingles.append({text[i:i + 5] for i in range(max(1, len(text) - 4))})
+    kept = []
+    for s in shingles:
+        if all(len(s & k) / len(s | k) < NEAR_DUPLICATE_THRESHOLD for k in kept):
+            kept.append(s)
+    return len(cards) - len(kept)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--dup-rate', type=float, default=0.1, help='duplicates injected per original card')
+    parser.add_argument('--brute-force-limit', type=int, default=2000,
+                        help='largest deck to also run the all-pairs comparison on')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=== Dedup Benchmark ===\n")
+    print(f"{'cards':>8} {'injected':>9} {'removed':>8} {'exact':>6} {'near':>6} {'seconds':>9} {'all-pairs s':>12}")
+    for n in args.sizes:
+        cards, exact, near = make_deck(n, args.dup_rate, args.seed)
+        started = time.perf_counter()
+        kept, removed = dedupe_cards(cards)
+        elapsed = time.perf_counter() - started
+        assert len(kept) + removed['exact'] + removed['near'] == len(cards)
+
+        brute = '-'
+        if len(cards) <= args.brute_force_limit:
+            started = time.perf_counter()
+            brute_force(cards)
+            brute = f"{time.perf_counter() - started:.3f}"
+        print(f"{len(cards):>8} {exact + near:>9} {removed['exact'] + removed['near']:>8} "
+              f"{removed['exact']:>6} {removed['near']:>6} {elapsed:>9.3f} {brute:>12}")
+
+if __name__ == "__main__":
+    main()
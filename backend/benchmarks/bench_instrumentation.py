@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Instrumentation Overhead Benchmark
+Run this to measure what request metrics and logging add to each request.
+It times many requests to /test through Flask's test client. The baseline
+is a Flask app with the same route, CORS and session setup but no metrics
+or access log. That is compared with the full app under a range of log
+settings: access logs at INFO with every record
+written, sampled at 1%, and at WARNING so only slow requests and errors are
+logged. Log output goes to /dev/null so terminal speed does not count. No
+database is needed. Configurations are timed in interleaved rounds and the
+best round of each is reported.
+
+    python benchmarks/bench_instrumentation.py --requests 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from flask import Flask, jsonify
+from flask_cors import CORS
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.app import create_app
+from python_ai_service.config import Settings
+from python_ai_service.logging_setup import configure_logging
+
+def bare_app():
+    settings = Settings()
+    app = Flask(__name__)
+    app.secret_key = settings.secret_key
+    CORS(app, supports_credentials=True, resources={r"/*": {"origins": settings.cors_origins}})
+
+    @app.route('/test', methods=['GET'])
+    def test_endpoint():
+        return jsonify({"message": "Test endpoint working!", "method": "GET"})
+    return app
+
+def configured_app(**env):
+    os.environ.update(env)
+    settings = Settings()
+    app = create_app(settings)
+    # Logging is configured per process, so it is reapplied before each timing
+    app.config['BENCH_SETTINGS'] = settings
+    return app
+
+def time_requests(app, requests):
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/test')
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/test')
+    return (time.perf_counter() - started) / requests * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    print("=== Instrumentation Overhead Benchmark ===\n")
+    stderr = sys.stderr
+    # The log handler binds to sys.stderr when the app is created
+    sys.stderr = open(os.devnull, 'w')
+    try:
+        runs = [
+            ('uninstrumented', bare_app),
+            ('INFO, every record', lambda: configured_app(LOG_LEVEL='INFO', LOG_SAMPLE_RATE='1')),
+            ('INFO, 1% sampled', lambda: configured_app(LOG_LEVEL='INFO', LOG_SAMPLE_RATE='0.01')),
+            ('WARNING', lambda: configured_app(LOG_LEVEL='WARNING', LOG_SAMPLE_RATE='1')),
+        ]
+        apps = [(label, build()) for label, build in runs]
+        best = {}
+        for _ in range(args.rounds):
+            for label, app in apps:
+                if 'BENCH_SETTINGS' in app.config:
+                    configure_logging(app.config['BENCH_SETTINGS'])
+                per_request = time_requests(app, args.requests // args.rounds)
+                best[label] = min(best.get(label, per_request), per_request)
+        results = [(label, best[label]) for label, _ in runs]
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    baseline = results[0][1]
+    print(f"{'configuration':<22} {'us/request':>11} {'overhead us':>12}")
+    for label, per_request in results:
+        print(f"{label:<22} {per_request:>11.1f} {per_request - baseline:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Model Client Benchmark
+Run this to see how the resilient model client copes with a misbehaving
+upstream. A burst of concurrent requests is sent to the fake model client,
+which rate-limits some calls, fails some as overloaded and answers some
+very slowly. Each request goes first straight to the backend, then through
+ResilientModelClient with retries only, then with hedging too. For each run
+it reports the success rate, latency percentiles and the calls made. No API
+key or network is needed.
+
+    python benchmarks/bench_llm_client.py --requests 200 --concurrency 32
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.fake_model_client import FakeModelClient
+from python_ai_service.services.llm_client import ResilientModelClient
+
+PROMPT = "Create 5 high-quality flashcards about Benchmark Topic. Return JSON."
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else float('nan')
+
+def run(client, requests, concurrency, timeout):
+    def one(_):
+        started = time.perf_counter()
+        try:
+            client.messages.create(model='fake', max_tokens=500, timeout=timeout,
+                                   messages=[{"role": "user", "content": PROMPT}])
+            return True, time.perf_counter() - started
+        except Exception:
+            return False, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    latencies = [elapsed for ok, elapsed in results if ok]
+    return len(latencies), latencies, wall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32, help='caller threads')
+    parser.add_argument('--max-concurrency', type=int, default=64, help='model calls in flight per process')
+    parser.add_argument('--latency', type=float, default=0.2, help='normal response time in seconds')
+    parser.add_argument('--slow-rate', type=float, default=0.05)
+    parser.add_argument('--slow-latency', type=float, default=3.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.03)
+    parser.add_argument('--hedge-after', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=10.0, help='deadline per request in seconds')
+    parser.add_argument('--rpm', type=float, default=0, help='requests-per-minute limit (0 for none)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    def backend():
+        return FakeModelClient(first_token_latency=args.latency, seconds_per_token=0,
+                               rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                               slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=args.seed)
+
+    print("=== Model Client Benchmark ===\n")
+    print(f"Fake model: {args.latency}s normally, {args.slow_rate:.0%} take {args.slow_latency}s, "
+          f"{args.rate_limit_rate:.0%} rate limited, {args.error_rate:.0%} overloaded\n")
+    print(f"{'client':<18} {'ok':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wall s':>7} "
+          f"{'calls':>6} {'retries':>8} {'hedges':>7} {'won':>4}")
+
+    runs = [
+        ('direct', None),
+        ('retries', dict(hedge_after=None)),
+        ('retries + hedging', dict(hedge_after=args.hedge_after)),
+    ]
+    for label, options in runs:
+        fake = backend()
+        client = fake
+        if options is not None:
+            client = ResilientModelClient(fake, max_concurrency=args.max_concurrency,
+                                          requests_per_minute=args.rpm, tokens_per_minute=0,
+                                          backoff_base=0.1, **options)
+        ok, latencies, wall = run(client, args.requests, args.concurrency, args.timeout)
+        stats = client.stats() if options is not None else {}
+        print(f"{label:<18} {f'{ok}/{args.requests}':>9} {percentile(latencies, 0.5) * 1000:>8.0f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.0f} {percentile(latencies, 0.99) * 1000:>8.0f} "
+              f"{wall:>7.2f} {fake.calls:>6} {stats.get('retries', '-'):>8} {stats.get('hedges', '-'):>7} "
+              f"{stats.get('hedge_wins', '-'):>4}")
+
+if __name__ == "__main__":
+    main()
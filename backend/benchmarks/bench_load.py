@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Run this against a development database to measure throughput and latency
+of the service's hot endpoints. It seeds benchmark users, sets and cards,
+starts the app in a separate process with the fake model client
+(LLM_BACKEND=fake) on a threaded server, logs every virtual user in and
+then drives each scenario for a fixed time at a fixed number of concurrent
+clients (closed loop: each client sends its next request as soon as the
+previous one completes). The generate_flashcards scenario submits a job
+and polls it until the cards are saved. Requests/sec, p50/p95/p99 latency and non-2xx
+responses are reported per scenario. Seeding and request choices are
+deterministic for a given --seed. The seeded rows are deleted afterwards
+unless --keep is given.
+
+    python benchmarks/bench_load.py --users 50 --concurrency 16 --duration 10
+
+Pass --url to drive a server that is already running (for example under
+gunicorn); it must be using the same database and LLM_BACKEND=fake.
+Results can be saved with --output and a later run checked against them
+with --compare: the script exits with status 1 if any scenario's
+requests/sec dropped, or its p95 rose, by more than --tolerance percent.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+
+from werkzeug.security import generate_password_hash
+
+# Add the backend directory to the path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from python_ai_service.db.database import db_connection
+
+USER_PREFIX = 'bench_load_'
+PASSWORD = 'bench-password'
+JOB_POLL_INTERVAL = 0.05
+
+# Executed in a separate process so the server does not share a GIL with the clients
+SERVER = r'''
+import sys
+import signal
+from werkzeug.serving import WSGIRequestHandler, make_server
+from python_ai_service.app import create_app
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass
+
+# Exit normally when terminated, so the password hashing pool is shut down with the server
+signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+make_server('127.0.0.1', int(sys.argv[1]), create_app(), threaded=True,
+            request_handler=QuietHandler).serve_forever()
+'''
+
+def seed(conn, n_users, sets_per_user, cards_per_set):
+    # One hash for everyone: seeding should not spend minutes in scrypt
+    password_hash = generate_password_hash(PASSWORD)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO users (username, email, password_hash)
+            SELECT %s || g, %s || g || '@example.com', %s FROM generate_series(1, %s) g
+            """,
+            (USER_PREFIX, USER_PREFIX, password_hash, n_users)
+        )
+        cur.execute(
+            """
+            INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+            SELECT md5(u.id || '-' || g)::uuid::text, 'load topic ' || g, 'manual', %s, 'Load set ' || g, u.id
+            FROM users u, generate_series(1, %s) g
+            WHERE u.username LIKE %s
+            """,
+            (cards_per_set, sets_per_user, USER_PREFIX + '%')
+        )
+        cur.execute(
+            """
+            INSERT INTO flashcards (set_id, front_text, back_text, star_status)
+            SELECT s.set_id, 'Question ' || g || ' about ' || s.topic || '?',
+                   'Answer ' || g || ' about ' || s.topic || '.', g %% 7 = 0
+            FROM sets s JOIN users u ON u.id = s.user_id, generate_series(1, %s) g
+            WHERE u.username LIKE %s
+            """,
+            (cards_per_set, USER_PREFIX + '%')
+        )
+        conn.commit()
+        cur.execute("ANALYZE users")
+        cur.execute("ANALYZE sets")
+        cur.execute("ANALYZE flashcards")
+        conn.commit()
+
+        cur.execute(
+            """
+            SELECT u.username, s.set_id, array_agg(f.id ORDER BY f.id)
+            FROM users u JOIN sets s ON s.user_id = u.id JOIN flashcards f ON f.set_id = s.set_id
+            WHERE u.username LIKE %s
+            GROUP BY u.username, s.set_id
+            ORDER BY u.username, s.set_id
+            """,
+            (USER_PREFIX + '%',)
+        )
+        users = {}
+        for username, set_id, card_ids in cur.fetchall():
+            user = users.setdefault(username, {"username": username, "sets": []})
+            user["sets"].append((set_id, card_ids))
+    return [users[name] for name in sorted(users)]
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+        user_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("DELETE FROM sets WHERE user_id = ANY(%s)", (user_ids,))
+        cur.execute("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+    conn.commit()
+
+def start_server(port):
+    env = dict(os.environ)
+    env['LLM_BACKEND'] = 'fake'
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    # The fake model has no provider quota to protect, so measure the service rather than the limiter
+    env.setdefault('LLM_REQUESTS_PER_MINUTE', '1000000')
+    env.setdefault('LLM_TOKENS_PER_MINUTE', '1000000000')
+    env['PYTHONPATH'] = BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    server = subprocess.Popen([sys.executable, '-c', SERVER, str(port)], env=env, cwd=BACKEND_DIR)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            urllib.request.urlopen(url + '/test', timeout=1).read()
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start within 30s")
+
+class Client:
+    """One virtual user: a cookie jar holding its session."""
+
+    def __init__(self, url, user):
+        self.url = url
+        self.user = user
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def send(self, method, path, body=None):
+        """Return the status code and the raw response body."""
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+    def request(self, method, path, body=None):
+        return self.send(method, path, body)[0]
+
+    def login(self):
+        return self.request('POST', '/login', {"username": self.user["username"], "password": PASSWORD})
+
+# Each scenario sends one request for a client and returns its status code
+def _random_set(client, rng):
+    return rng.choice(client.user["sets"])
+
+def _generate(client, rng):
+    # Submit a job and poll it, so the latency is the time until the cards are saved
+    status, body = client.send('POST', '/generate_flashcards', {
+        "topic": f"load topic {rng.randrange(10 ** 9)}",
+        "intensity_level": 'custom',
+        "custom_count": 5,
+    })
+    if status != 202:
+        return status
+    status_url = json.loads(body)["status_url"]
+    while True:
+        status, body = client.send('GET', status_url)
+        job = json.loads(body) if status == 200 else {}
+        if job.get("status") not in ('queued', 'running'):
+            return status if job.get("status") == 'succeeded' else f"job {job.get('status', status)}"
+        time.sleep(JOB_POLL_INTERVAL)
+
+SCENARIOS = {
+    'login': lambda client, rng: client.login(),
+    'get_all_sets': lambda client, rng: client.request('GET', '/get_all_sets'),
+    'get_flashcards_by_set': lambda client, rng: client.request(
+        'GET', f"/get_flashcards_by_set/{_random_set(client, rng)[0]}"),
+    'progress_set': lambda client, rng: client.request('GET', f"/progress/set/{_random_set(client, rng)[0]}"),
+    'progress_card': lambda client, rng: client.request(
+        'POST', f"/progress/card/{rng.choice(_random_set(client, rng)[1])}"),
+    'progress_due': lambda client, rng: client.request('GET', '/progress/due'),
+    'create_manual_set': lambda client, rng: client.request('POST', '/create_manual_set', {
+        "name": f"Load manual set {rng.randrange(10 ** 9)}",
+        "cards": [{"front": f"Front {i}", "back": f"Back {i}"} for i in range(10)],
+    }),
+    'generate_flashcards': _generate,
+}
+
+def run_scenario(scenario, clients, concurrency, duration, seed):
+    """Drive one scenario from ``concurrency`` threads for ``duration`` seconds."""
+    send = SCENARIOS[scenario]
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    start = threading.Barrier(concurrency + 1)
+    stop_at = []
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{scenario}-{index}")
+        client = clients[index % len(clients)]
+        start.wait()
+        while time.perf_counter() < stop_at[0]:
+            started = time.perf_counter()
+            try:
+                status = send(client, rng)
+            except OSError:
+                status = 'connection error'
+            latencies[index].append(time.perf_counter() - started)
+            statuses[index][status] = statuses[index].get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    stop_at.append(time.perf_counter() + duration)
+    started = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = sorted(latency for worker_latencies in latencies for latency in worker_latencies)
+    all_statuses = {}
+    for worker_statuses in statuses:
+        for status, count in worker_statuses.items():
+            all_statuses[str(status)] = all_statuses.get(str(status), 0) + count
+    percentiles = statistics.quantiles(all_latencies, n=100, method='inclusive') if len(all_latencies) > 1 \
+        else all_latencies * 99
+    return {
+        "requests": len(all_latencies),
+        "rps": len(all_latencies) / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "statuses": all_statuses,
+    }
+
+def compare(results, baseline, tolerance):
+    """Print the change from a saved run; return the scenarios that regressed."""
+    regressions = []
+    print(f"\nCompared with baseline (tolerance {tolerance:.0f}%):")
+    print(f"{'scenario':<22} {'rps change':>11} {'p95 change':>11}")
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        rps_change = (result["rps"] / before["rps"] - 1) * 100
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        if regressed:
+            regressions.append(scenario)
+        print(f"{scenario:<22} {rps_change:>+10.1f}% {p95_change:>+10.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--sets-per-user', type=int, default=10)
+    parser.add_argument('--cards-per-set', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients per scenario')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1, help='unmeasured seconds before each scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='drive an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=5099, help='port for the server this script starts')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=10, help='allowed regression in percent')
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    print("=== Load Test ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        print(f"Seeding {args.users} users x {args.sets_per_user} sets x {args.cards_per_set} cards...")
+        users = seed(conn, args.users, args.sets_per_user, args.cards_per_set)
+
+    server = None
+    results = {}
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            server, url = start_server(args.port)
+        clients = [Client(url, user) for user in users]
+        for client in clients:
+            if client.login() != 200:
+                raise RuntimeError(f"Could not log in as {client.user['username']}")
+        print(f"Driving {url} with {args.concurrency} clients, {args.duration:g}s per scenario\n")
+
+        print(f"{'scenario':<22} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  non-2xx")
+        for scenario in scenarios:
+            if args.warmup > 0:
+                run_scenario(scenario, clients, args.concurrency, args.warmup, args.seed)
+            result = results[scenario] = run_scenario(scenario, clients, args.concurrency, args.duration, args.seed)
+            failures = ', '.join(f"{status}: {count}" for status, count in sorted(result["statuses"].items())
+                                 if not status.startswith('2')) or '-'
+            print(f"{scenario:<22} {result['requests']:>9} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} "
+                  f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}  {failures}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if not args.keep:
+            with db_connection(timeout=60) as conn:
+                cleanup(conn)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Login Storm Benchmark
+Run this against a development database to see what a burst of logins
+does to the rest of the service. It seeds benchmark users (as
+bench_load.py does) and, for each hashing mode, starts the app on a
+threaded server and runs two phases:
+
+    quiet   --readers clients fetch due cards, with nobody logging in
+    storm   the same readers while --logins clients log in back to back
+
+The modes are
+
+    inline  PASSWORD_HASH_WORKERS=0: hashes on the request threads
+    pool    PASSWORD_HASH_WORKERS=--workers: hashes on the process pool
+
+Logins/sec, login p50/p99 and logins shed (429/503), then reads/sec and
+read p50/p99 are reported per phase. Login throttling is off unless
+--throttle is given, since every client shares one address.
+
+    python benchmarks/bench_login.py --logins 16 --readers 8 --duration 10
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+# Add the backend directory to the path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from bench_load import Client, cleanup, seed, start_server
+from python_ai_service.db.database import db_connection
+
+def drive(groups, duration):
+    """Run each group's clients at once for ``duration`` seconds.
+
+    ``groups`` maps a name to (clients, send); returns name -> (latencies, shed, elapsed).
+    """
+    results = {name: ([], [0]) for name in groups}
+    lock = threading.Lock()
+    threads = []
+    stop_at = time.perf_counter() + duration
+
+    def worker(name, client, send):
+        latencies, shed = results[name]
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                status = send(client)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    shed[0] += 1
+            if status != 200:
+                time.sleep(0.05)
+
+    started = time.perf_counter()
+    for name, (clients, send) in groups.items():
+        for client in clients:
+            threads.append(threading.Thread(target=worker, args=(name, client, send), daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {name: (sorted(latencies), shed[0], elapsed) for name, (latencies, shed) in results.items()}
+
+def summarize(latencies, elapsed):
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        return len(latencies) / elapsed, percentiles[49] * 1000, percentiles[98] * 1000
+    return len(latencies) / elapsed, float('nan'), float('nan')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=16, help='concurrent clients logging in')
+    parser.add_argument('--readers', type=int, default=8, help='concurrent clients fetching due cards')
+    parser.add_argument('--workers', type=int, default=2, help='hashing processes in pool mode')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per phase')
+    parser.add_argument('--modes', default='inline,pool')
+    parser.add_argument('--throttle', action='store_true', help='keep the login throttle on')
+    parser.add_argument('--port', type=int, default=5097)
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+
+    print("=== Login Storm Benchmark ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        users = seed(conn, args.logins + args.readers, 2, 20)
+
+    print(f"{'mode':<7} {'phase':<6} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'shed':>5} "
+          f"{'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for mode in args.modes.split(','):
+            # Logins are slow by design during the storm; keep the slow-request warnings out of the results
+            os.environ.setdefault('LOG_LEVEL', 'ERROR')
+            os.environ['PASSWORD_HASH_WORKERS'] = '0' if mode == 'inline' else str(args.workers)
+            if not args.throttle:
+                os.environ['LOGIN_IP_RATE_PER_MINUTE'] = '0'
+            server, url = start_server(args.port)
+            try:
+                readers = [Client(url, user) for user in users[:args.readers]]
+                login_clients = [Client(url, user) for user in users[args.readers:]]
+                for client in readers + login_clients[:1]:
+                    # Also starts the hashing workers, so their startup is not measured
+                    client.login()
+
+                phases = [
+                    ('quiet', {'reads': (readers, lambda c: c.request('GET', '/progress/due'))}),
+                    ('storm', {'reads': (readers, lambda c: c.request('GET', '/progress/due')),
+                               'logins': (login_clients, lambda c: c.login())}),
+                ]
+                for phase, groups in phases:
+                    results = drive(groups, args.duration)
+                    read_rps, read_p50, read_p99 = summarize(results['reads'][0], results['reads'][2])
+                    if 'logins' in results:
+                        latencies, shed, elapsed = results['logins']
+                        login_rps, login_p50, login_p99 = summarize(latencies, elapsed)
+                        logins = f"{login_rps:>9.1f} {login_p50:>8.1f} {login_p99:>8.1f} {shed:>5}"
+                    else:
+                        logins = f"{'-':>9} {'-':>8} {'-':>8} {'-':>5}"
+                    print(f"{mode:<7} {phase:<6} {logins} {read_rps:>8.1f} {read_p50:>8.1f} {read_p99:>8.1f}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        if not args.keep:
+            with db_connection(timeout=60) as conn:
+                cleanup(conn)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Progress Summary Benchmark
+Run this against a development database to compare reading a user's
+dashboard from the progress summaries with aggregating study_progress
+across all of their cards. It seeds one user with --sets sets of --cards
+cards, studies a share of the cards through record_reviews (which keeps the
+summaries up to date), then times both reads and checks they agree. It also
+reports what the summary update adds to a single progress write.
+
+    python benchmarks/bench_progress_summary.py --sets 50 --cards 200
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import datetime
+import statistics
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import cleanup, seed
+from python_ai_service.db.database import db_connection
+from python_ai_service.db.progress_summary import MASTERED_CORRECT_COUNT, UPDATE_SUMMARY_SQL, summary_params
+from python_ai_service.routes.progress_routes import SUMMARY_SETS_SQL
+from python_ai_service.services.scheduler import CORRECT_GRADE, record_review, record_reviews
+
+# What a cross-set dashboard costs without the summaries: every progress row of the user
+SCAN_SQL = f"""
+    SELECT s.set_id, COUNT(*), COUNT(*) FILTER (WHERE p.correct_count >= {MASTERED_CORRECT_COUNT}),
+           MAX(p.last_reviewed_at)
+    FROM sets s
+    JOIN flashcards f ON f.set_id = s.set_id
+    JOIN study_progress p ON p.card_id = f.id AND p.user_id = %s
+    WHERE s.user_id = %s
+    GROUP BY s.set_id
+"""
+
+def study(conn, user_id, card_ids, share, seed_value):
+    """Review ``share`` of the cards 1-5 times each, over the past two weeks."""
+    rng = random.Random(seed_value)
+    now = datetime.datetime.utcnow()
+    events = []
+    for card_id in rng.sample(card_ids, int(len(card_ids) * share)):
+        for _ in range(rng.randint(1, 5)):
+            events.append({'event_id': uuid.uuid4().hex, 'card_id': card_id,
+                           'grade': rng.choice([1, 3, 4, 5]),
+                           'reviewed_at': now - datetime.timedelta(minutes=rng.randint(0, 14 * 24 * 60))})
+    for start in range(0, len(events), 1000):
+        with conn.cursor() as cur:
+            record_reviews(cur, user_id, events[start:start + 1000])
+        conn.commit()
+    return len(events)
+
+def timed_query(conn, query, params, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        times.append(time.perf_counter() - started)
+    conn.rollback()
+    return rows, statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sets', type=int, default=50)
+    parser.add_argument('--cards', type=int, default=200, help='cards per set')
+    parser.add_argument('--studied', type=float, default=0.6, help='share of cards with progress')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--writes', type=int, default=200, help='single progress writes to time')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=== Progress Summary Benchmark ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        try:
+            user = seed(conn, 1, args.sets, args.cards)[0]
+            with conn.cursor() as cur:
+                cur.execute("SELECT id FROM users WHERE username = %s", (user['username'],))
+                user_id = cur.fetchone()[0]
+            card_ids = [card_id for _, ids in user['sets'] for card_id in ids]
+            started = time.perf_counter()
+            reviews = study(conn, user_id, card_ids, args.studied, args.seed)
+            print(f"{args.sets} sets x {args.cards} cards; {reviews} reviews recorded in "
+                  f"{time.perf_counter() - started:.1f}s\n")
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE study_progress")
+                cur.execute("ANALYZE set_progress_summary")
+            conn.commit()
+
+            scanned, scan_ms = timed_query(conn, SCAN_SQL, (user_id, user_id), args.repeat)
+            summary, summary_ms = timed_query(conn, SUMMARY_SETS_SQL, (user_id,), args.repeat)
+            expected = {row[0]: (row[1], row[2]) for row in scanned}
+            actual = {row[0]: (row[3], row[4]) for row in summary}
+            print(f"{'dashboard read':<28} {'rows':>6} {'median ms':>10}")
+            print(f"{'aggregate study_progress':<28} {len(scanned):>6} {scan_ms:>10.2f}")
+            print(f"{'read set_progress_summary':<28} {len(summary):>6} {summary_ms:>10.2f}")
+            print(f"Summaries match the progress rows: {'yes' if actual == expected else 'NO'}\n")
+
+            rng = random.Random(args.seed)
+            started = time.perf_counter()
+            for _ in range(args.writes):
+                with conn.cursor() as cur:
+                    record_review(cur, user_id, rng.choice(card_ids), CORRECT_GRADE)
+                conn.commit()
+            write_ms = (time.perf_counter() - started) * 1000 / args.writes
+            started = time.perf_counter()
+            for _ in range(args.writes):
+                with conn.cursor() as cur:
+                    cur.execute(UPDATE_SUMMARY_SQL, summary_params(
+                        user_id, [(rng.choice(card_ids), False, 1, 1, 1, datetime.datetime.utcnow())]))
+                conn.rollback()
+            summary_write_ms = (time.perf_counter() - started) * 1000 / args.writes
+            print(f"Progress write (record_review + commit): {write_ms:.2f} ms, "
+                  f"of which the summary update is about {summary_write_ms:.2f} ms")
+        finally:
+            conn.rollback()
+            cleanup(conn)
+
+if __name__ == "__main__":
+    main()
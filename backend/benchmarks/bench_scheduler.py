@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Scheduler Benchmark
+Run this to compare recomputing a user's SM-2 schedule from their review
+history one review at a time (schedule_review in a loop) versus the
+vectorized replay_reviews. Both are fed the same synthetic history and the
+results are checked to agree. No database is needed.
+
+    python benchmarks/bench_scheduler.py --reviews 100000 --cards 2000
+"""
+
+import os
+import sys
+import time
+import datetime
+import argparse
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.scheduler import replay_reviews, schedule_review
+
+def make_history(n_reviews, n_cards, seed):
+    rng = np.random.default_rng(seed)
+    card_ids = rng.integers(1, n_cards + 1, n_reviews)
+    # Mostly passing grades, like a real study history
+    grades = rng.choice(6, n_reviews, p=[0.05, 0.05, 0.1, 0.25, 0.35, 0.2])
+    start = datetime.datetime(2024, 1, 1).timestamp()
+    times = start + rng.uniform(0, 365 * 86400, n_reviews)
+    return card_ids, grades, times
+
+def scalar_replay(card_ids, grades, times):
+    order = np.lexsort((times, card_ids))
+    states = {}
+    for i in order:
+        card_id = int(card_ids[i])
+        reviewed_at = datetime.datetime.fromtimestamp(float(times[i]))
+        states[card_id] = schedule_review(states.get(card_id), int(grades[i]), reviewed_at)
+    return states
+
+def check(vectorized, scalar):
+    for i, card_id in enumerate(vectorized['card_id']):
+        expected = scalar[int(card_id)]
+        assert vectorized['repetitions'][i] == expected['repetitions']
+        assert vectorized['lapses'][i] == expected['lapses']
+        assert abs(vectorized['ease_factor'][i] - expected['ease_factor']) < 1e-9
+        assert abs(vectorized['interval_days'][i] - expected['interval_days']) < 1e-6 * max(1.0, expected['interval_days'])
+    assert len(vectorized['card_id']) == len(scalar)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--cards', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3, help='best of N runs per measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=== Scheduler Benchmark ===\n")
+    card_ids, grades, times = make_history(args.reviews, args.cards, args.seed)
+    print(f"{args.reviews} reviews across {args.cards} cards\n")
+
+    scalar_times, vector_times = [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        scalar = scalar_replay(card_ids, grades, times)
+        scalar_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        vectorized = replay_reviews(card_ids, grades, times)
+        vector_times.append(time.perf_counter() - started)
+
+    check(vectorized, scalar)
+    print("Results agree for every card\n")
+
+    scalar_best, vector_best = min(scalar_times), min(vector_times)
+    print(f"{'method':<22} {'seconds':>9} {'reviews/sec':>14}")
+    print(f"{'schedule_review loop':<22} {scalar_best:>9.4f} {args.reviews / scalar_best:>14.0f}")
+    print(f"{'replay_reviews':<22} {vector_best:>9.4f} {args.reviews / vector_best:>14.0f}")
+    print(f"\nSpeedup: {scalar_best / vector_best:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Search Benchmark
+Run this against a development database to time library search on a large
+seeded flashcards table. It creates benchmark users, sets and cards (1M
+cards by default, with a skewed vocabulary so some words are common and
+some rare), then times the ranked full-text search used by /search against
+an ILIKE scan of the same user's cards. The seeded rows are deleted
+afterwards unless --keep is given.
+
+    python benchmarks/bench_search.py --cards 1000000 --users 100
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import statistics
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.db.database import db_connection
+from python_ai_service.services.search import search_cards
+
+USER_PREFIX = 'bench_search_'
+SEED_BATCH = 100000
+
+# Word i of the vocabulary, computed identically in SQL and Python
+_SQL_WORD = "substr(translate(md5(({i})::text), '0123456789', 'ghijklmnop'), 1, 7)"
+
+def word(i):
+    return hashlib.md5(str(i).encode()).hexdigest().translate(str.maketrans('0123456789', 'ghijklmnop'))[:7]
+
+def _words(count, vocabulary):
+    # random()^3 skews picks towards low indices: word 0 is common, the last ones rare
+    pick = _SQL_WORD.format(i=f"floor({vocabulary} * power(random(), 3))::int")
+    return " || ' ' || ".join([pick] * count)
+
+def seed(conn, n_cards, n_users, sets_per_user, vocabulary):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO users (username, email, password_hash)
+            SELECT %s || g, %s || g || '@example.com', 'x' FROM generate_series(1, %s) g
+            RETURNING id
+            """,
+            (USER_PREFIX, USER_PREFIX, n_users)
+        )
+        user_ids = [row[0] for row in cur.fetchall()]
+        cur.execute(
+            """
+            INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+            SELECT gen_random_uuid()::text, 'benchmark topic ' || g, 'manual', 0, 'Benchmark set ' || g, u
+            FROM unnest(%s::int[]) u, generate_series(1, %s) g
+            """,
+            (user_ids, sets_per_user)
+        )
+        conn.commit()
+
+        done = 0
+        while done < n_cards:
+            batch = min(SEED_BATCH, n_cards - done)
+            cur.execute(
+                f"""
+                WITH s AS (SELECT array_agg(set_id ORDER BY id) AS a FROM sets WHERE user_id = ANY(%s))
+                INSERT INTO flashcards (set_id, front_text, back_text, star_status)
+                SELECT s.a[1 + (g %% array_length(s.a, 1))],
+                       'What is ' || {_words(6, vocabulary)} || '?',
+                       {_words(12, vocabulary)},
+                       false
+                FROM s, generate_series(%s, %s) g
+                """,
+                (user_ids, done + 1, done + batch)
+            )
+            conn.commit()
+            done += batch
+            print(f"  seeded {done} cards", end='\r', flush=True)
+        print()
+        cur.execute("ANALYZE flashcards")
+        cur.execute("ANALYZE sets")
+        conn.commit()
+    return user_ids
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+        user_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("DELETE FROM sets WHERE user_id = ANY(%s)", (user_ids,))
+        cur.execute("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+    conn.commit()
+
+def ilike_scan(cur, user_id, term, limit):
+    cur.execute(
+        """
+        SELECT f.id, f.front_text, f.back_text
+        FROM flashcards f JOIN sets s ON s.set_id = f.set_id
+        WHERE s.user_id = %s AND (f.front_text ILIKE %s OR f.back_text ILIKE %s)
+        ORDER BY f.id DESC
+        LIMIT %s
+        """,
+        (user_id, f'%{term}%', f'%{term}%', limit)
+    )
+    return cur.fetchall()
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--sets-per-user', type=int, default=10)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=20, help='results per page')
+    parser.add_argument('--repeat', type=int, default=5, help='median of N runs per measurement')
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+
+    print("=== Search Benchmark ===\n")
+    with db_connection(timeout=60) as conn:
+        cleanup(conn)
+        print(f"Seeding {args.cards} cards for {args.users} users...")
+        started = time.perf_counter()
+        user_ids = seed(conn, args.cards, args.users, args.sets_per_user, args.vocabulary)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s (search vectors and GIN index maintained on insert)\n")
+
+        user_id = user_ids[len(user_ids) // 2]
+        terms = [
+            ('common word', word(0)),
+            ('mid-frequency', word(args.vocabulary // 10)),
+            ('rare word', word(args.vocabulary - 1)),
+            ('two words', f"{word(1)} {word(50)}"),
+        ]
+        try:
+            print(f"{'query':<16} {'term':<24} {'fts ms':>8} {'hits':>5} {'ilike ms':>9} {'hits':>5}")
+            with conn.cursor() as cur:
+                for label, term in terms:
+                    fts_ms, (results, _) = timed(lambda: search_cards(cur, user_id, term, args.limit), args.repeat)
+                    ilike_ms, rows = timed(lambda: ilike_scan(cur, user_id, term.split()[0], args.limit), args.repeat)
+                    print(f"{label:<16} {term:<24} {fts_ms:>8.1f} {len(results):>5} {ilike_ms:>9.1f} {len(rows):>5}")
+            conn.rollback()
+        finally:
+            if not args.keep:
+                cleanup(conn)
+
+if __name__ == "__main__":
+    main()
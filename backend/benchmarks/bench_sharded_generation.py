@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Sharded Generation Benchmark
+Run this to compare one blocking model call against sharded generation
+(a subtopic outline, then one concurrent call per shard) for large sets,
+using the local fake model client (no API key or network needed). For
+each card count it reports the cards produced, model calls and wall time,
+next to the time of a single shard-sized call for reference.
+
+    python benchmarks/bench_sharded_generation.py --cards 120,500,1000 --concurrency 8
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.dedup import dedupe_cards
+from python_ai_service.services.fake_model_client import FakeModelClient
+from python_ai_service.services.flashcard_generator import (
+    _build_prompt, _max_tokens_for, _request_flashcards, _resolve_card_count, generate_sharded
+)
+
+TOPIC = 'Benchmark Topic'
+
+def bench_single_call(fake, num_cards):
+    """One request for the whole set, as create_study_set used to send it."""
+    _, depth, _ = _resolve_card_count('custom', num_cards)
+    started = time.perf_counter()
+    cards = _request_flashcards(_build_prompt(num_cards, TOPIC, None, depth), model_client=fake)
+    return len(cards), time.perf_counter() - started
+
+def bench_sharded(fake, num_cards, shard_size, concurrency, token_budget):
+    _, depth, _ = _resolve_card_count('custom', num_cards)
+    started = time.perf_counter()
+    result = generate_sharded(TOPIC, None, depth, num_cards, model_client=fake, shard_size=shard_size,
+                              max_concurrency=concurrency, token_budget=token_budget)
+    cards, _ = dedupe_cards(result['flashcards'])
+    return len(cards), time.perf_counter() - started, result['shards']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', default='120,500,1000', help='comma-separated set sizes')
+    parser.add_argument('--shard-size', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--token-budget', type=int, default=100000)
+    parser.add_argument('--first-token-latency', type=float, default=0.3, help='seconds before the first token')
+    parser.add_argument('--seconds-per-token', type=float, default=0.002)
+    args = parser.parse_args()
+
+    print("=== Sharded Generation Benchmark ===\n")
+    print(f"Shard size: {args.shard_size}, concurrency: {args.concurrency}, token budget: {args.token_budget}")
+    print(f"Fake model: {args.first_token_latency}s first token, {args.seconds_per_token * 1000:.1f}ms/token\n")
+
+    fake = FakeModelClient(args.first_token_latency, args.seconds_per_token)
+    _, depth, _ = _resolve_card_count('custom', args.shard_size)
+    started = time.perf_counter()
+    _request_flashcards(_build_prompt(args.shard_size, TOPIC, None, depth),
+                        _max_tokens_for(args.shard_size), model_client=fake)
+    print(f"One shard of {args.shard_size} cards: {(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+    print(f"{'cards':>6}  {'mode':<8} {'produced':>8} {'calls':>6} {'total ms':>9}")
+    for num_cards in (int(count) for count in args.cards.split(',')):
+        fake = FakeModelClient(args.first_token_latency, args.seconds_per_token)
+        produced, elapsed = bench_single_call(fake, num_cards)
+        print(f"{num_cards:>6}  {'single':<8} {produced:>8} {fake.calls:>6} {elapsed * 1000:>9.1f}")
+
+        fake = FakeModelClient(args.first_token_latency, args.seconds_per_token)
+        produced, elapsed, shards = bench_sharded(fake, num_cards, args.shard_size, args.concurrency,
+                                                  args.token_budget)
+        print(f"{num_cards:>6}  {'sharded':<8} {produced:>8} {fake.calls:>6} {elapsed * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Run this to check how quickly a fresh worker process becomes ready. Each
+run starts a new interpreter and times importing the app module, building
+the app with create_app(), the first request (no database), the first
+database-backed request (which opens the connection pool) and the first
+use of the model client (which imports the model SDK). Medians over
+several runs are reported. The database must be reachable for the
+database timing; the model client is built with a dummy key and never
+called.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter for every run
+PROBE = r'''
+import json, time
+started = time.perf_counter()
+from python_ai_service.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get('/test')
+first_request = time.perf_counter()
+status = client.get('/health/db').status_code
+first_db_request = time.perf_counter()
+from python_ai_service.services.llm_client import get_model_client
+get_model_client()
+model_client = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first request": first_request - created,
+    "first db request": first_db_request - first_request,
+    "model client": model_client - first_db_request,
+    "db_status": status,
+}))
+'''
+
+STEPS = ["import", "create_app", "first request", "first db request", "model client"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('ANTHROPIC_API_KEY', 'benchmark-dummy-key')
+    env['PYTHONPATH'] = BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', '')
+
+    print("=== Startup Benchmark ===\n")
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], env=env, cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    if runs[0]["db_status"] != 200:
+        print(f"Warning: /health/db returned {runs[0]['db_status']}; is the database running?\n")
+    ready = [r["import"] + r["create_app"] + r["first request"] for r in runs]
+    for step in STEPS:
+        print(f"{step:<18} {statistics.median(r[step] for r in runs) * 1000:8.1f} ms")
+    print(f"\nTime to first request: {statistics.median(ready) * 1000:.1f} ms (import + create_app + first request)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Streaming Generation Benchmark
+Run this to compare time-to-first-card and total wall time of the single
+blocking generation call against batched streaming generation, using the
+local fake model client (no API key or network needed).
+
+    python benchmarks/bench_streaming_generation.py --cards 120 --batch-size 20
+    python benchmarks/bench_streaming_generation.py --persist   # also insert into the database
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ai_service.services.fake_model_client import FakeModelClient
+from python_ai_service.services.flashcard_generator import (
+    MODEL_NAME, _build_prompt, _resolve_card_count, stream_study_materials
+)
+from python_ai_service.services.card_parser import IncrementalCardParser
+
+def bench_single_call(fake, num_cards):
+    """Time one blocking request for the whole set, as generate_study_materials does."""
+    _, depth, _ = _resolve_card_count('custom', num_cards)
+    prompt = _build_prompt(num_cards, 'Benchmark Topic', None, depth)
+    started = time.perf_counter()
+    response = fake.messages.create(
+        model=MODEL_NAME, max_tokens=4000, temperature=0.3,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    parser = IncrementalCardParser()
+    cards = parser.feed(response.content[0].text)
+    elapsed = time.perf_counter() - started
+    # Nothing can be shown until the whole response has arrived.
+    return len(cards), elapsed, elapsed, response.stop_reason
+
+def bench_streaming(fake, num_cards, batch_size, concurrency, persist):
+    """Time batched streaming generation through stream_study_materials."""
+    started = time.perf_counter()
+    first_card = None
+    count = 0
+    for event in stream_study_materials(
+        topic='Benchmark Topic', intensity_level='custom', custom_count=num_cards,
+        batch_size=batch_size, max_concurrency=concurrency,
+        model_client=fake, persist=persist
+    ):
+        if event['type'] == 'card':
+            count += 1
+            if first_card is None:
+                first_card = time.perf_counter() - started
+    return count, first_card, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=120)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--first-token-latency', type=float, default=0.3, help='seconds before the first token')
+    parser.add_argument('--seconds-per-token', type=float, default=0.002)
+    parser.add_argument('--persist', action='store_true', help='insert generated cards into the database')
+    args = parser.parse_args()
+
+    print("=== Streaming Generation Benchmark ===\n")
+    print(f"Cards: {args.cards}, batch size: {args.batch_size}, concurrency: {args.concurrency}")
+    print(f"Fake model: {args.first_token_latency}s first token, {args.seconds_per_token * 1000:.1f}ms/token\n")
+
+    fake = FakeModelClient(args.first_token_latency, args.seconds_per_token)
+    cards, first, total, stop_reason = bench_single_call(fake, args.cards)
+    print(f"Single call:   {cards:4d} cards  first card {first * 1000:8.1f} ms  total {total * 1000:8.1f} ms  (stop_reason={stop_reason})")
+
+    fake = FakeModelClient(args.first_token_latency, args.seconds_per_token)
+    cards, first, total = bench_streaming(fake, args.cards, args.batch_size, args.concurrency, args.persist)
+    first_ms = f"{first * 1000:8.1f}" if first is not None else "     n/a"
+    print(f"Streaming:     {cards:4d} cards  first card {first_ms} ms  total {total * 1000:8.1f} ms  ({fake.calls} model calls)")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 import sys
-from dotenv import load_dotenv
+import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
@@ -9,65 +9,86 @@ backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(backend_dir)
 
 # Now import the routes
+from python_ai_service import metrics
+from python_ai_service.config import get_settings
+from python_ai_service.logging_setup import configure_logging
+from python_ai_service.sessions import create_session_interface
 from python_ai_service.routes.flashcard_routes import flashcard_bp
 from python_ai_service.routes.generation_routes import generation_bp
 from python_ai_service.routes.auth_routes import auth_bp
 from python_ai_service.routes.profile_routes import profile_bp
 from python_ai_service.routes.progress_routes import progress_bp
-from python_ai_service.db.database import (
-    create_users_table, 
-    add_user_id_to_sets, 
-    add_profile_columns_to_users,
-    create_study_progress_table
-)
+from python_ai_service.routes.search_routes import search_bp
+from python_ai_service.routes.deck_routes import deck_bp
+from python_ai_service.db.database import get_pool
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger('python_ai_service.app')
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'a_default_secret_key')
+def create_app(settings=None):
+    """Build the Flask application.
 
-# Configure session cookie settings for cross-origin requests
-app.config.update(
-    SESSION_COOKIE_SAMESITE='None',
-    SESSION_COOKIE_SECURE=False,  # Use False for HTTP in development
-    SESSION_COOKIE_HTTPONLY=True
-)
+    Nothing here touches the database or the model API: the connection pool
+    and the model client are created by the first request that needs them,
+    so importing the module and spawning workers stay cheap. Database tables
+    are managed by migrations; apply them before starting with
+        python -m python_ai_service.db.migrate upgrade
+    """
+    settings = settings or get_settings()
+    configure_logging(settings)
+    app = Flask(__name__)
+    app.secret_key = settings.secret_key
 
-# Initialize CORS with support for credentials
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": "http://localhost:3000"}})
+    # Configure session cookie settings for cross-origin requests
+    app.config.update(
+        SESSION_COOKIE_SAMESITE='None',
+        SESSION_COOKIE_SECURE=False,  # Use False for HTTP in development
+        SESSION_COOKIE_HTTPONLY=True
+    )
 
-# Register blueprints
-app.register_blueprint(flashcard_bp)
-app.register_blueprint(generation_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(profile_bp)
-app.register_blueprint(progress_bp)
+    # Keep session data server-side so sessions can be revoked (SESSION_BACKEND=cookie opts out)
+    session_interface = create_session_interface(settings)
+    if session_interface is not None:
+        app.session_interface = session_interface
 
-# Add a simple test endpoint
-@app.route('/test', methods=['GET', 'POST'])
-def test_endpoint():
-    print(f"Test endpoint called with method: {request.method}")
-    if request.method == 'POST':
-        print(f"POST data: {request.get_json()}")
-    return jsonify({"message": "Test endpoint working!", "method": request.method})
+    # Initialize CORS with support for credentials
+    CORS(app, supports_credentials=True, resources={r"/*": {"origins": settings.cors_origins}})
 
-# Initialize database tables
-create_users_table()
-add_user_id_to_sets()
-add_profile_columns_to_users()
-create_study_progress_table()
+    # Register blueprints
+    app.register_blueprint(flashcard_bp)
+    app.register_blueprint(generation_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(profile_bp)
+    app.register_blueprint(progress_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(deck_bp)
+
+    # Request latency, database time and query counts, served at /metrics
+    metrics.init_app(app, slow_request_seconds=settings.slow_request_seconds)
+
+    # Add a simple test endpoint
+    @app.route('/test', methods=['GET', 'POST'])
+    def test_endpoint():
+        if request.method == 'POST':
+            logger.debug("Test endpoint POST data: %s", request.get_json())
+        return jsonify({"message": "Test endpoint working!", "method": request.method})
+
+    # Connection pool statistics for monitoring
+    @app.route('/health/db', methods=['GET'])
+    def db_pool_health():
+        return jsonify(get_pool().stats())
+
+    return app
 
 if __name__ == '__main__':
-    print("Loading environment variables...")
-    print(f"Current working directory: {os.getcwd()}")
-    print(f"Python path: {sys.path}")
-    print(f"ANTHROPIC_API_KEY exists: {bool(os.getenv('ANTHROPIC_API_KEY'))}")
-    print(f"DB_HOST exists: {bool(os.getenv('DB_HOST'))}")
-    print(f"DB_NAME exists: {bool(os.getenv('DB_NAME'))}")
-    print(f"DB_USER exists: {bool(os.getenv('DB_USER'))}")
-    print(f"DB_PASSWORD exists: {bool(os.getenv('DB_PASSWORD'))}")
-    print(f"SECRET_KEY exists: {bool(os.getenv('SECRET_KEY'))}")
-    
+    settings = get_settings()
+    app = create_app(settings)
+    logger.info("Starting development server", extra={
+        "cwd": os.getcwd(),
+        "anthropic_api_key_set": bool(settings.anthropic_api_key),
+        "llm_backend": settings.llm_backend,
+        **{f"{name.lower()}_set": bool(os.getenv(name))
+           for name in ('DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD', 'SECRET_KEY')},
+    })
+
     # Run on port 5001 to match the TypeScript server's expectations
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5001)
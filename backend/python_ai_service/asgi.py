@@ -0,0 +1,375 @@
+"""Async (ASGI) serving mode.
+
+    uvicorn --factory python_ai_service.asgi:create_asgi_app --port 5001
+
+Requires starlette, uvicorn, a2wsgi, psycopg[binary] (3.x) and psycopg_pool,
+listed in requirements.txt; the Flask-only mode (app.py) doesn't import them.
+
+The hot study endpoints are native coroutines here, running the same SQL
+as the Flask routes on an async connection pool, so one process can hold
+thousands of concurrent requests that are waiting on PostgreSQL without a
+thread each. Every other route is served by the Flask app mounted
+underneath through a WSGI bridge, so the API is identical in both modes.
+Sessions are read through Flask's session interface, so a login made
+through either is honoured by both.
+
+Streamed generation still runs the thread-based generator: model calls
+go through the process-wide rate limits, retries and hedging of
+services/llm_client.py, which cap concurrent model calls at
+LLM_MAX_CONCURRENCY anyway. Long generations are best submitted to
+/generate_flashcards, whose job queue never holds a request open.
+"""
+import re
+import time
+import uuid
+import logging
+import datetime
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from psycopg import sql as async_sql
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags, quote_etag
+
+from python_ai_service.app import create_app
+from python_ai_service.config import get_settings
+from python_ai_service.db.async_database import async_db_connection, close_async_pool, open_async_pool
+from python_ai_service.db.pagination import (
+    CARD_FIELDS, SET_FIELDS, keyset_query, page_from_rows, parse_page_args, row_to_item
+)
+from python_ai_service.db.pool import DatabaseUnavailable
+from python_ai_service.metrics import begin_request, end_request, observe_request
+from python_ai_service.routes.flashcard_routes import (
+    LIBRARY_VERSION_SQL, SET_INFO_SQL, STREAM_FETCH_SIZE, set_info_to_json
+)
+from python_ai_service.routes.generation_routes import (
+    NDJSON_HEADERS, ndjson_generation_events, stream_request_params
+)
+from python_ai_service.routes.progress_routes import (
+    DUE_CARDS_SQL, NEW_CARDS_SQL, SET_PROGRESS_SQL, STUDY_DELTA_SQL, STUDY_SESSION_SQL,
+    due_cards_to_json, parse_due_args, parse_session_token, study_delta, study_session
+)
+from python_ai_service.services.response_cache import get_response_cache, make_etag
+from python_ai_service.services.scheduler import CORRECT_GRADE, record_review_async
+
+logger = logging.getLogger(__name__)
+
+_routes = []
+
+def _flask_rule(path):
+    # '/progress/card/{card_id:int}' -> '/progress/card/<int:card_id>', matching the sync metrics labels
+    return re.sub(r'\{(\w+)(?::(\w+))?\}', lambda m: f"<{m.group(2) + ':' if m.group(2) else ''}{m.group(1)}>", path)
+
+def route(path, methods=('GET',)):
+    """Register an async handler, timed and logged like the Flask routes."""
+    endpoint = _flask_rule(path)
+
+    def register(handler):
+        async def handle(request):
+            started = time.perf_counter()
+            token = begin_request()
+            try:
+                response = await handler(request)
+                observe_request(endpoint, request.method, request.url.path, response.status_code,
+                                time.perf_counter() - started, request.app.state.settings.slow_request_seconds)
+                return response
+            finally:
+                end_request(token)
+        _routes.append((path, handle, list(methods)))
+        return handler
+    return register
+
+def _json(request, data, status=200):
+    # Same encoder and layout as Flask's jsonify, so bodies match the sync mode byte for byte
+    body = request.app.state.flask_app.json.dumps(data, separators=(',', ':')) + '\n'
+    return Response(body, status, media_type='application/json')
+
+async def _user_id(request):
+    flask_app = request.app.state.flask_app
+    interface = flask_app.session_interface
+    if getattr(interface, 'blocking', False):
+        # Server-side sessions stored in a database are looked up off the event loop
+        session = await run_in_threadpool(interface.open_session, flask_app, request)
+    else:
+        session = interface.open_session(flask_app, request)
+    return session.get('user_id') if session is not None else None
+
+def _etag(request, scope, key, version):
+    return make_etag(scope, key, version, request.scope['query_string'])
+
+def _set_etag(response, etag):
+    response.headers['ETag'] = quote_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _cached_response(request, etag):
+    """Answer from the client's or the server's cache if possible, else None."""
+    if parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+        return _set_etag(Response(status_code=304), etag)
+    cache = get_response_cache()
+    body = cache.get(etag) if cache else None
+    if body is None:
+        return None
+    return _set_etag(Response(body, media_type='application/json'), etag)
+
+def _cacheable(response, etag):
+    _set_etag(response, etag)
+    cache = get_response_cache()
+    if cache and response.status_code == 200:
+        cache.set(etag, response.body)
+    return response
+
+async def _stream_json_rows(dumps, query, params, fields, prefix, suffix):
+    """Async version of flashcard_routes._stream_json_rows, on a server-side cursor."""
+    async with async_db_connection() as conn:
+        async with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = STREAM_FETCH_SIZE
+            await cursor.execute(query, params)
+            yield prefix
+            chunk = []
+            separator = ''
+            async for row in cursor:
+                chunk.append(separator + dumps(row_to_item(row, fields)))
+                separator = ','
+                if len(chunk) >= STREAM_FETCH_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(suffix)
+            yield ''.join(chunk)
+
+async def _streaming_response(chunks, etag):
+    # Run up to the first chunk now so query errors become a normal error response.
+    first = await chunks.__anext__()
+    cache = get_response_cache()
+
+    async def generate():
+        body = [] if cache else None
+        size = 0
+        yield first
+        if body is not None:
+            body.append(first)
+            size += len(first)
+        async for chunk in chunks:
+            if body is not None:
+                body.append(chunk)
+                size += len(chunk)
+                if size > cache.max_entry_bytes:
+                    body = None
+            yield chunk
+        if body is not None:
+            cache.set(etag, ''.join(body).encode('utf-8'))
+    return _set_etag(StreamingResponse(generate(), media_type='application/json'), etag)
+
+@route('/get_all_sets')
+async def get_all_sets(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    try:
+        page = parse_page_args(request.query_params, SET_FIELDS)
+    except ValueError as e:
+        return _json(request, {'error': str(e)}, 400)
+
+    query, params = keyset_query('sets', SET_FIELDS, page, 'user_id = %s', (user_id,), sql_module=async_sql)
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(LIBRARY_VERSION_SQL, (user_id,))
+            row = await cursor.fetchone()
+            etag = _etag(request, 'sets', user_id, row[0] if row else 0)
+            cached = _cached_response(request, etag)
+            if cached is not None:
+                return cached
+            if page.paginated:
+                await cursor.execute(query, params)
+                sets, next_cursor = page_from_rows(await cursor.fetchall(), page)
+                return _cacheable(_json(request, {'sets': sets, 'next_cursor': next_cursor}), etag)
+
+        dumps = request.app.state.flask_app.json.dumps
+        return await _streaming_response(_stream_json_rows(dumps, query, params, page.fields, '[', ']'), etag)
+    except Exception as e:
+        return _json(request, {'error': str(e)}, 500)
+
+@route('/get_flashcards_by_set/{set_id}')
+async def get_flashcards_by_set(request):
+    set_id = request.path_params['set_id']
+    try:
+        page = parse_page_args(request.query_params, CARD_FIELDS)
+    except ValueError as e:
+        return _json(request, {'error': str(e)}, 400)
+
+    dumps = request.app.state.flask_app.json.dumps
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(SET_INFO_SQL, (set_id,))
+            set_info = await cursor.fetchone()
+            if not set_info:
+                return _json(request, {'error': 'Set not found'}, 404)
+
+            etag = _etag(request, 'set', set_info[0], set_info[7])
+            cached = _cached_response(request, etag)
+            if cached is not None:
+                return cached
+            set_info = set_info_to_json(set_info)
+
+            query, params = keyset_query('flashcards', CARD_FIELDS, page, 'set_id = %s', (set_id,),
+                                         sql_module=async_sql)
+            if page.paginated:
+                await cursor.execute(query, params)
+                flashcards, next_cursor = page_from_rows(await cursor.fetchall(), page)
+                return _cacheable(_json(request, {
+                    'set_info': set_info,
+                    'flashcards': flashcards,
+                    'next_cursor': next_cursor
+                }), etag)
+
+        return await _streaming_response(_stream_json_rows(
+            dumps, query, params, page.fields,
+            '{"flashcards":[',
+            '],"set_info":' + dumps(set_info) + '}'
+        ), etag)
+    except Exception as e:
+        return _json(request, {'error': str(e)}, 500)
+
+@route('/progress/set/{set_id}')
+async def get_set_progress(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    set_id = request.path_params['set_id']
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(SET_PROGRESS_SQL, (user_id, set_id))
+            rows = await cur.fetchall()
+        return _json(request, {row[0]: row[1] for row in rows})
+    except DatabaseUnavailable:
+        return _json(request, {"error": "Database connection failed"}, 500)
+    except Exception as e:
+        logger.exception("Error fetching progress for set %s: %s", set_id, e)
+        return _json(request, {"error": "An error occurred while fetching progress"}, 500)
+
+@route('/progress/card/{card_id:int}', methods=('POST',))
+async def update_card_progress(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    card_id = request.path_params['card_id']
+    try:
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await record_review_async(cur, user_id, card_id, CORRECT_GRADE)
+            await conn.commit()
+        return _json(request, {"message": "Progress updated successfully"})
+    except DatabaseUnavailable:
+        return _json(request, {"error": "Database connection failed"}, 500)
+    except Exception as e:
+        logger.exception("Error updating progress for card %s: %s", card_id, e)
+        return _json(request, {"error": "Failed to update progress"}, 500)
+
+@route('/progress/due')
+async def get_due_cards(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    try:
+        limit, set_id, include_new = parse_due_args(request.query_params)
+    except ValueError as e:
+        return _json(request, {"error": str(e)}, 400)
+
+    now = datetime.datetime.utcnow()
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(DUE_CARDS_SQL, (user_id, now, set_id, set_id, limit))
+            rows = await cur.fetchall()
+            if include_new and len(rows) < limit:
+                await cur.execute(NEW_CARDS_SQL, (set_id, set_id, user_id, user_id, limit - len(rows)))
+                rows += await cur.fetchall()
+        return _json(request, {"cards": due_cards_to_json(rows), "as_of": now.isoformat()})
+    except DatabaseUnavailable:
+        return _json(request, {"error": "Database connection failed"}, 500)
+    except Exception as e:
+        logger.exception("Error fetching due cards: %s", e)
+        return _json(request, {"error": "An error occurred while fetching due cards"}, 500)
+
+@route('/study/session/{set_id}')
+async def get_study_session(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    set_id = request.path_params['set_id']
+    since = None
+    if request.query_params.get('since'):
+        try:
+            since = parse_session_token(request.query_params['since'])
+        except ValueError as e:
+            return _json(request, {"error": str(e)}, 400)
+
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            if since is not None:
+                await cur.execute(STUDY_DELTA_SQL, (user_id, since[1], set_id))
+                rows = await cur.fetchall()
+                if not rows:
+                    return _json(request, {"error": "Set not found"}, 404)
+                delta = study_delta(rows, since)
+                if delta is not None:
+                    return _json(request, delta)
+
+            await cur.execute(STUDY_SESSION_SQL, (user_id, set_id))
+            rows = await cur.fetchall()
+
+        if not rows:
+            return _json(request, {"error": "Set not found"}, 404)
+        return _json(request, study_session(rows))
+    except DatabaseUnavailable:
+        return _json(request, {"error": "Database connection failed"}, 500)
+    except Exception as e:
+        logger.exception("Error fetching study session for set %s: %s", set_id, e)
+        return _json(request, {"error": "An error occurred while fetching the study session"}, 500)
+
+@route('/generate_flashcards/stream', methods=('POST',))
+async def generate_flashcards_stream(request):
+    user_id = await _user_id(request)
+    if user_id is None:
+        return _json(request, {"error": "Authentication required"}, 401)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    params, error = stream_request_params(data)
+    if error:
+        return _json(request, {"error": error}, 400)
+    # A sync iterator: Starlette advances it on a worker thread
+    return StreamingResponse(ndjson_generation_events(user_id, params),
+                             media_type='application/x-ndjson', headers=NDJSON_HEADERS)
+
+@asynccontextmanager
+async def _lifespan(app):
+    await open_async_pool(app.state.settings)
+    try:
+        yield
+    finally:
+        await close_async_pool()
+
+def create_asgi_app(settings=None):
+    """Build the ASGI application: the async routes above, then everything else from Flask."""
+    settings = settings or get_settings()
+    flask_app = create_app(settings)
+    # Preflight requests fall through to Flask; this adds CORS headers to the async responses
+    cors = [Middleware(CORSMiddleware, allow_origins=settings.cors_origins, allow_credentials=True,
+                       allow_methods=['*'], allow_headers=['*'])]
+    routes = [Route(path, handle, methods=methods, middleware=cors) for path, handle, methods in _routes]
+    routes.append(Mount('/', WSGIMiddleware(flask_app, workers=settings.asgi_wsgi_workers)))
+    app = Starlette(routes=routes, lifespan=_lifespan)
+    app.state.settings = settings
+    app.state.flask_app = flask_app
+    return app
+
+if __name__ == '__main__':
+    import uvicorn
+    # Requests are already logged by the metrics middleware
+    uvicorn.run(create_asgi_app(), host='0.0.0.0', port=5001, access_log=False)
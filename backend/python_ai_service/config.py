@@ -0,0 +1,129 @@
+"""Application settings.
+
+Every environment variable the service reads is parsed here, once per
+process: ``get_settings()`` loads ``.env`` on first use and caches the
+result, so request handlers and pools never touch the environment again.
+"""
+import os
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+def _int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class Settings:
+    """Snapshot of the environment, grouped by the component that uses it."""
+
+    def __init__(self):
+        self.secret_key = os.getenv('SECRET_KEY', 'a_default_secret_key')
+        self.cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+
+        # Sessions (see sessions.py) and the user record cache (see services/user_cache.py)
+        self.session_backend = os.getenv('SESSION_BACKEND', 'postgres').lower()
+        self.session_sqlite_path = os.getenv('SESSION_SQLITE_PATH', 'sessions.sqlite3')
+        self.session_max_entries = _int('SESSION_MAX_ENTRIES', 10000)
+        self.user_cache_ttl = _float('USER_CACHE_TTL', 60.0)
+        self.user_cache_max_entries = _int('USER_CACHE_MAX_ENTRIES', 10000)
+
+        # Password hashing (see services/password_hashing.py) and login throttling (services/login_throttle.py)
+        self.password_hash_method = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        self.password_hash_workers = _int('PASSWORD_HASH_WORKERS', 2)
+        self.password_hash_max_pending = _int('PASSWORD_HASH_MAX_PENDING', 32)
+        self.password_hash_timeout = _float('PASSWORD_HASH_TIMEOUT', 10.0)
+        self.login_ip_rate_per_minute = _float('LOGIN_IP_RATE_PER_MINUTE', 120.0)
+        self.login_ip_burst = _int('LOGIN_IP_BURST', 30)
+        self.login_max_failures = _int('LOGIN_MAX_FAILURES', 5)
+        self.login_failure_window = _float('LOGIN_FAILURE_WINDOW', 300.0)
+
+        # Logging and metrics (see logging_setup.py and metrics.py)
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.log_format = os.getenv('LOG_FORMAT', 'json').lower()
+        self.log_sample_rate = _float('LOG_SAMPLE_RATE', 1.0)
+        self.slow_request_seconds = _float('LOG_SLOW_REQUEST_SECONDS', 1.0)
+
+        # Database (see db/database.py)
+        self.db_host = os.getenv('DB_HOST', 'localhost')
+        self.db_name = os.getenv('DB_NAME', 'flashcard_app_db')
+        self.db_user = os.getenv('DB_USER', 'postgres')
+        self.db_password = os.getenv('DB_PASSWORD', '')
+        self.db_pool_min = _int('DB_POOL_MIN', 1)
+        self.db_pool_max = _int('DB_POOL_MAX', 10)
+        self.db_pool_max_lifetime = _float('DB_POOL_MAX_LIFETIME', 1800.0)
+        self.db_pool_health_check_interval = _float('DB_POOL_HEALTH_CHECK_INTERVAL', 30.0)
+        self.db_pool_timeout = _float('DB_POOL_TIMEOUT', 10.0)
+
+        # ASGI serving (see asgi.py): threads running the Flask routes it mounts
+        self.asgi_wsgi_workers = _int('ASGI_WSGI_WORKERS', 10)
+
+        # Model client (see services/llm_client.py)
+        self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
+        self.llm_backend = os.getenv('LLM_BACKEND', 'anthropic').lower()
+        self.llm_max_concurrency = _int('LLM_MAX_CONCURRENCY', 8)
+        self.llm_requests_per_minute = _float('LLM_REQUESTS_PER_MINUTE', 50.0)
+        self.llm_tokens_per_minute = _float('LLM_TOKENS_PER_MINUTE', 100000.0)
+        self.llm_timeout = _float('LLM_TIMEOUT_SECONDS', 60.0)
+        self.llm_max_retries = _int('LLM_MAX_RETRIES', 4)
+        self.llm_hedge_after = _float('LLM_HEDGE_AFTER_SECONDS', None)
+        self.fake_model_latency = _float('FAKE_MODEL_LATENCY', 0.3)
+        self.fake_model_rate_limit_rate = _float('FAKE_MODEL_RATE_LIMIT_RATE', 0.0)
+        self.fake_model_error_rate = _float('FAKE_MODEL_ERROR_RATE', 0.0)
+        self.fake_model_slow_rate = _float('FAKE_MODEL_SLOW_RATE', 0.0)
+
+        # Generation (see services/flashcard_generator.py)
+        self.generation_batch_size = _int('GENERATION_BATCH_SIZE', 20)
+        self.generation_max_concurrency = _int('GENERATION_MAX_CONCURRENCY', 4)
+        # Largest custom_count a generation request may ask for
+        self.generation_max_cards = _int('GENERATION_MAX_CARDS', 500)
+        # Output tokens one generated set may use across all of its model calls
+        self.generation_token_budget = _int('GENERATION_TOKEN_BUDGET', 100000)
+        self.generation_workers = _int('GENERATION_WORKERS', 4)
+        self.generation_max_queue = _int('GENERATION_MAX_QUEUE', 50)
+        self.generation_max_jobs_per_user = _int('GENERATION_MAX_JOBS_PER_USER', 2)
+        self.generation_cache_backend = os.getenv('GENERATION_CACHE_BACKEND', 'memory').lower()
+        self.generation_cache_ttl = _float('GENERATION_CACHE_TTL', 7 * 24 * 3600.0)
+        self.generation_cache_max_entries = _int('GENERATION_CACHE_MAX_ENTRIES', 1000)
+        # Cards rewritten in one /regenerate_cards call, all in a single model request
+        self.regenerate_max_cards = _int('REGENERATE_MAX_CARDS', 40)
+        # Memoized rewrites, one entry per card and instruction (same backend and TTL as above)
+        self.regeneration_cache_max_entries = _int('REGENERATION_CACHE_MAX_ENTRIES', 10000)
+
+        # Deck import and export (see routes/deck_routes.py)
+        self.import_batch_size = _int('IMPORT_BATCH_SIZE', 5000)
+        self.import_max_cards = _int('IMPORT_MAX_CARDS', 200000)
+
+        # Response cache (see services/response_cache.py)
+        self.response_cache_max_bytes = _int('RESPONSE_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        self.response_cache_max_entry_bytes = _int('RESPONSE_CACHE_MAX_ENTRY_BYTES', 1024 * 1024)
+
+    def db_connection_params(self):
+        return {
+            'host': self.db_host,
+            'database': self.db_name,
+            'user': self.db_user,
+            'password': self.db_password,
+        }
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Return the process-wide settings, loading .env and the environment on first use."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                load_dotenv()
+                _settings = Settings()
+    return _settings
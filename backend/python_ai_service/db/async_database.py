@@ -0,0 +1,89 @@
+"""Async PostgreSQL access for the ASGI app (see asgi.py).
+
+Uses psycopg 3, whose placeholders match psycopg2's, so the async handlers
+run the same SQL as the Flask routes. The pool is sized by the same
+DB_POOL_* settings as the sync pool and must be opened inside the event
+loop, which the ASGI app does at startup.
+"""
+import time
+from contextlib import asynccontextmanager
+
+from psycopg import AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from python_ai_service.config import get_settings
+from python_ai_service.db.pool import DatabaseUnavailable
+from python_ai_service.metrics import record_query, register_stats
+
+_pool = None
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """Async cursor that reports each statement's duration to the request metrics."""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            record_query(time.perf_counter() - started)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            record_query(time.perf_counter() - started)
+
+
+async def open_async_pool(settings=None) -> AsyncConnectionPool:
+    """Create and open the process-wide async pool. Call from the event loop."""
+    global _pool
+    settings = settings or get_settings()
+    params = {key: value for key, value in settings.db_connection_params().items() if value}
+    params['dbname'] = params.pop('database', settings.db_name)
+    _pool = AsyncConnectionPool(
+        make_conninfo(**params),
+        min_size=settings.db_pool_min,
+        max_size=settings.db_pool_max,
+        max_lifetime=settings.db_pool_max_lifetime,
+        timeout=settings.db_pool_timeout,
+        kwargs={'cursor_factory': InstrumentedAsyncCursor},
+        open=False,
+    )
+    await _pool.open()
+    return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def async_db_connection(timeout=None):
+    """Borrow a pooled async connection for the duration of an ``async with`` block.
+
+    The transaction is committed when the block exits normally and rolled
+    back on error. Raises ``DatabaseUnavailable`` if no connection can be
+    obtained.
+    """
+    if _pool is None:
+        raise DatabaseUnavailable("Async connection pool is not open")
+    try:
+        async with _pool.connection(timeout) as conn:
+            yield conn
+    except PoolTimeout as e:
+        # The pool keeps retrying failed connects in the background, so an
+        # unreachable database also surfaces as a checkout timeout
+        raise DatabaseUnavailable(str(e)) from e
+
+
+def async_pool_stats():
+    """Return async pool statistics, or None if the pool is not open."""
+    return _pool.get_stats() if _pool is not None else None
+
+register_stats('db_async_pool', async_pool_stats)
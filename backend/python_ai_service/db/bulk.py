@@ -0,0 +1,89 @@
+import io
+from typing import Dict, Iterable, List, Optional
+
+from psycopg2.extras import execute_values
+
+from python_ai_service.db.versions import bump_library_version
+
+# Above this many rows COPY beats a single multi-row INSERT.
+COPY_THRESHOLD = 1000
+
+_FLASHCARD_COLUMNS = "(set_id, front_text, back_text, star_status)"
+
+
+def _copy_escape(value) -> str:
+    """Escape a value for PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def copy_flashcards(cur, set_id: str, cards: Iterable[Dict]) -> int:
+    """Stream cards into the flashcards table with a single COPY FROM STDIN.
+
+    Cards may carry ``starred``; it defaults to false.
+    """
+    buf = io.StringIO()
+    count = 0
+    escaped_set_id = _copy_escape(set_id)
+    for card in cards:
+        starred = 't' if card.get('starred') else 'f'
+        buf.write(f"{escaped_set_id}\t{_copy_escape(card.get('front'))}\t{_copy_escape(card.get('back'))}\t{starred}\n")
+        count += 1
+    buf.seek(0)
+    cur.copy_expert(f"COPY flashcards {_FLASHCARD_COLUMNS} FROM STDIN", buf)
+    return count
+
+
+def insert_flashcards(cur, set_id: str, cards: List[Dict], copy_threshold: int = COPY_THRESHOLD) -> int:
+    """Insert all cards for a set in one statement, using COPY for large sets.
+
+    Cards may carry ``starred``; it defaults to false on both paths.
+    Returns the number of rows written. Does not commit.
+    """
+    if not cards:
+        return 0
+    if len(cards) >= copy_threshold:
+        return copy_flashcards(cur, set_id, cards)
+    execute_values(
+        cur,
+        f"INSERT INTO flashcards {_FLASHCARD_COLUMNS} VALUES %s",
+        [(set_id, card.get('front'), card.get('back'), bool(card.get('starred', False))) for card in cards],
+        template="(%s, %s, %s, %s)",
+        page_size=len(cards)
+    )
+    return len(cards)
+
+
+def create_set_with_cards(conn, set_id: str, topic: str, intensity_level: str, name: str,
+                          user_id: Optional[int], cards: List[Dict]) -> int:
+    """Insert a set row and all of its cards in a single transaction.
+
+    Cards are dicts with front, back and optionally ``starred``.
+
+    Costs four round trips (set insert, card insert/COPY, library version
+    bump, commit) regardless of the number of cards. Returns the new set's primary key. The transaction
+    is rolled back if any part fails.
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
+                """,
+                (set_id, topic, intensity_level, len(cards), name, user_id)
+            )
+            set_pk = cur.fetchone()[0]
+            insert_flashcards(cur, set_id, cards)
+            bump_library_version(cur, user_id)
+        conn.commit()
+        return set_pk
+    except Exception:
+        conn.rollback()
+        raise
@@ -1,132 +1,88 @@
-import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
 import psycopg2
-from dotenv import load_dotenv
+from psycopg2 import extensions
+from python_ai_service.config import get_settings
+from python_ai_service.db.pool import ConnectionPool, DatabaseUnavailable
+from python_ai_service.metrics import record_query, register_stats
 
-def get_db_connection():
-    """Create a connection to the PostgreSQL database."""
-    try:
-        # Load environment variables
-        load_dotenv()
-        
-        # Get database connection parameters from environment variables
-        db_host = os.getenv('DB_HOST', 'localhost')
-        db_name = os.getenv('DB_NAME', 'flashcard_app_db')
-        db_user = os.getenv('DB_USER', 'postgres')
-        db_password = os.getenv('DB_PASSWORD', '')
-        
-        print(f"Attempting to connect to database: {db_name} on {db_host} as {db_user}")
-        
-        # Create connection
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
-        
-        print("Database connection successful!")
-        return conn
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        print(f"Database config - Host: {os.getenv('DB_HOST', 'localhost')}, Name: {os.getenv('DB_NAME', 'flashcard_app_db')}, User: {os.getenv('DB_USER', 'postgres')}")
-        return None
+logger = logging.getLogger(__name__)
 
-def create_users_table():
-    """Create users table if it doesn't exist"""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(50) UNIQUE NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    password_hash VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-            print("Users table created successfully")
-        except Exception as e:
-            print(f"Error creating users table: {e}")
-        finally:
-            cur.close()
-            conn.close()
+_pool = None
+_pool_lock = threading.Lock()
 
-def add_profile_columns_to_users():
-    """Add bio and profile_image_url columns to users table if they don't exist"""
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cur:
-                # Check for bio column
-                cur.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'users' AND column_name = 'bio'
-                """)
-                if not cur.fetchone():
-                    cur.execute('ALTER TABLE users ADD COLUMN bio TEXT')
-                    print("Added bio column to users table")
+class InstrumentedCursor(extensions.cursor):
+    """Cursor that reports each statement's duration to the request metrics."""
 
-                # Check for profile_image_url column
-                cur.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'users' AND column_name = 'profile_image_url'
-                """)
-                if not cur.fetchone():
-                    cur.execute("ALTER TABLE users ADD COLUMN profile_image_url VARCHAR(255)")
-                    print("Added profile_image_url column to users table")
-                
-                conn.commit()
-        except Exception as e:
-            print(f"Error adding profile columns to users: {e}")
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
         finally:
-            conn.close()
+            record_query(time.perf_counter() - started)
 
-def create_study_progress_table():
-    """Create study_progress table to track user's learning progress"""
-    conn = get_db_connection()
-    if conn:
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS study_progress (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                        card_id INTEGER NOT NULL REFERENCES flashcards(id) ON DELETE CASCADE,
-                        correct_count INTEGER NOT NULL DEFAULT 0,
-                        last_correct_at TIMESTAMP,
-                        UNIQUE(user_id, card_id)
-                    )
-                """)
-                conn.commit()
-                print("study_progress table checked/created successfully.")
-        except Exception as e:
-            print(f"Error creating study_progress table: {e}")
+            return super().executemany(query, vars_list)
         finally:
-            conn.close()
+            record_query(time.perf_counter() - started)
 
-def add_user_id_to_sets():
-    """Add user_id column to sets table if it doesn't exist"""
-    conn = get_db_connection()
-    if conn:
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
         try:
-            cur = conn.cursor()
-            # Check if user_id column exists
-            cur.execute('''
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'sets' AND column_name = 'user_id'
-            ''')
-            if not cur.fetchone():
-                cur.execute('ALTER TABLE sets ADD COLUMN user_id INTEGER REFERENCES users(id)')
-                conn.commit()
-                print("Added user_id column to sets table")
-        except Exception as e:
-            print(f"Error adding user_id to sets: {e}")
+            return super().copy_expert(sql, file, size)
         finally:
-            cur.close()
-            conn.close() 
\ No newline at end of file
+            record_query(time.perf_counter() - started)
+
+def get_db_connection():
+    """Create a standalone connection to the PostgreSQL database.
+
+    Request handlers should use ``db_connection()`` instead, which borrows a
+    connection from the process-wide pool.
+    """
+    settings = get_settings()
+    try:
+        return psycopg2.connect(cursor_factory=InstrumentedCursor, **settings.db_connection_params())
+    except Exception as e:
+        logger.error("Error connecting to database: %s", e,
+                     extra={"db_host": settings.db_host, "db_name": settings.db_name, "db_user": settings.db_user})
+        return None
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use.
+
+    Sizing and recycling are configured with DB_POOL_MIN, DB_POOL_MAX,
+    DB_POOL_MAX_LIFETIME, DB_POOL_HEALTH_CHECK_INTERVAL and DB_POOL_TIMEOUT.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = get_settings()
+                _pool = ConnectionPool(
+                    dict(settings.db_connection_params(), cursor_factory=InstrumentedCursor),
+                    minconn=settings.db_pool_min,
+                    maxconn=settings.db_pool_max,
+                    max_lifetime=settings.db_pool_max_lifetime,
+                    health_check_interval=settings.db_pool_health_check_interval,
+                    timeout=settings.db_pool_timeout,
+                )
+    return _pool
+
+@contextmanager
+def db_connection(timeout=None):
+    """Borrow a pooled connection for the duration of a ``with`` block.
+
+    Raises ``DatabaseUnavailable`` if no connection can be obtained.
+    """
+    with get_pool().connection(timeout) as conn:
+        yield conn
+
+def pool_stats():
+    """Return connection pool statistics, or None if the pool is not yet in use."""
+    return _pool.stats() if _pool is not None else None
+
+register_stats('db_pool', pool_stats)
@@ -0,0 +1,201 @@
+"""Versioned schema migrations.
+
+Migrations are the ``NNNN_description.sql`` files in ``db/migrations``; each
+is applied once, in its own transaction, and recorded in the
+``schema_migrations`` table. Run them from the backend directory with::
+
+    python -m python_ai_service.db.migrate upgrade
+    python -m python_ai_service.db.migrate status
+    python -m python_ai_service.db.migrate check   # EXPLAIN the hot queries (--analyze, --strict)
+"""
+import os
+import re
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from python_ai_service.db.database import db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Arbitrary constant so concurrent deploys don't apply migrations twice
+_ADVISORY_LOCK_ID = 7240531
+
+_FILENAME_RE = re.compile(r'^(\d{4})_([a-z0-9_]+)\.sql$')
+
+
+def load_migrations() -> List[Tuple[int, str, str]]:
+    """Return (version, name, path) for every migration file, in order."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers in " + MIGRATIONS_DIR)
+    return migrations
+
+
+def _ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cur) -> Dict[int, str]:
+    _ensure_migrations_table(cur)
+    cur.execute("SELECT version, applied_at FROM schema_migrations ORDER BY version")
+    return {version: applied_at for version, applied_at in cur.fetchall()}
+
+
+def upgrade(target: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Apply pending migrations up to ``target`` (default: all); return those applied."""
+    applied = []
+    with db_connection(timeout=60) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_ADVISORY_LOCK_ID,))
+            try:
+                done = applied_versions(cur)
+                conn.commit()
+                for version, name, path in load_migrations():
+                    if version in done or (target is not None and version > target):
+                        continue
+                    with open(path, encoding='utf-8') as f:
+                        statements = f.read()
+                    try:
+                        cur.execute(statements)
+                        cur.execute(
+                            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                            (version, name)
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    print(f"Applied migration {version:04d}_{name}")
+                    applied.append((version, name))
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_ADVISORY_LOCK_ID,))
+                conn.commit()
+    return applied
+
+
+def status() -> List[Dict]:
+    """Return every known migration with its applied timestamp (or None)."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            done = applied_versions(cur)
+        conn.commit()
+    return [
+        {'version': version, 'name': name, 'applied_at': done.get(version)}
+        for version, name, _ in load_migrations()
+    ]
+
+
+# Hot route queries and the index each one is expected to use
+HOT_QUERIES = [
+    ('get_all_sets', 'idx_sets_user_id_created_at',
+     "SELECT id, set_id, name FROM sets WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT 100", (0,)),
+    ('get_flashcards_by_set', 'idx_flashcards_set_id_created_at',
+     "SELECT id, front_text, back_text FROM flashcards WHERE set_id = %s ORDER BY created_at DESC, id DESC", ('',)),
+    ('get_set_progress', 'idx_flashcards_set_id_created_at',
+     """SELECT p.card_id, p.correct_count FROM study_progress p
+        JOIN flashcards f ON p.card_id = f.id WHERE p.user_id = %s AND f.set_id = %s""", (0, '')),
+    ('delete_card_cascade', 'idx_study_progress_card_id',
+     "SELECT id FROM study_progress WHERE card_id = %s", (0,)),
+    ('get_due_cards', 'idx_study_progress_user_due',
+     "SELECT card_id FROM study_progress WHERE user_id = %s AND due_at <= NOW() ORDER BY due_at LIMIT 20", (0,)),
+    ('get_progress_summary', 'set_progress_summary_pkey',
+     "SELECT set_id, cards_seen, cards_mastered FROM set_progress_summary WHERE user_id = %s", (0,)),
+]
+
+
+def _plan_indexes(node, found):
+    if 'Index Name' in node:
+        found.add(node['Index Name'])
+    for child in node.get('Plans', []):
+        _plan_indexes(child, found)
+    return found
+
+
+def _explain_indexes(cur, query, params) -> List[str]:
+    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return sorted(_plan_indexes(plan[0]['Plan'], set()))
+
+
+def check_query_plans(queries=HOT_QUERIES, analyze: bool = False) -> List[Dict]:
+    """EXPLAIN each hot query and report whether it uses its expected index.
+
+    Each query is planned twice. First with default planner settings, which
+    is the plan the database would really run on its current statistics
+    (``ok``). Then with sequential scans disabled, which only shows that the
+    index is usable (``usable``). On a small development database the
+    planner legitimately prefers a seq scan, so a query can be usable but
+    not ok there; run the check against production-sized data, with
+    ``analyze`` to refresh statistics first, to see the real plans.
+    """
+    results = []
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            if analyze:
+                cur.execute("ANALYZE")
+            for name, index, query, params in queries:
+                planned = _explain_indexes(cur, query, params)
+                results.append({'query': name, 'expected_index': index, 'indexes_used': planned,
+                                'ok': index in planned})
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for result, (_, index, query, params) in zip(results, queries):
+                result['usable'] = index in _explain_indexes(cur, query, params)
+        if analyze:
+            conn.commit()
+        else:
+            conn.rollback()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the flashcard service database schema.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    up = sub.add_parser('upgrade', help='apply pending migrations')
+    up.add_argument('--target', type=int, help='stop after this version')
+    sub.add_parser('status', help='list migrations and whether they are applied')
+    check = sub.add_parser('check', help='verify hot queries use their indexes')
+    check.add_argument('--analyze', action='store_true', help='refresh planner statistics first')
+    check.add_argument('--strict', action='store_true',
+                       help='also fail when the planner prefers a seq scan (usable index, not chosen)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        applied = upgrade(args.target)
+        print(f"{len(applied)} migration(s) applied" if applied else "Database is up to date")
+    elif args.command == 'status':
+        for row in status():
+            state = row['applied_at'] or 'pending'
+            print(f"{row['version']:04d}_{row['name']:<40} {state}")
+    elif args.command == 'check':
+        results = check_query_plans(analyze=args.analyze)
+        for row in results:
+            mark = 'ok ' if row['ok'] else 'SEQSCAN' if row['usable'] else 'MISSING'
+            print(f"[{mark}] {row['query']:<24} expects {row['expected_index']}, uses {row['indexes_used'] or 'no index'}")
+        if any(not row['usable'] for row in results):
+            return 1
+        if any(not row['ok'] for row in results):
+            print("SEQSCAN: the index is usable but the planner chose not to use it with current statistics; "
+                  "expected on small databases")
+            if args.strict:
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
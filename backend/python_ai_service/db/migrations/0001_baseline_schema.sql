@@ -0,0 +1,46 @@
+-- Baseline schema: the tables the service previously created or patched at
+-- import time, plus the star_status column from backend/src/db/migrations.
+-- Every statement is idempotent so existing databases can adopt migrations.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS bio TEXT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_image_url VARCHAR(255);
+
+CREATE TABLE IF NOT EXISTS sets (
+    id SERIAL PRIMARY KEY,
+    set_id VARCHAR(36) UNIQUE NOT NULL,
+    topic TEXT,
+    intensity_level VARCHAR(50),
+    card_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    name VARCHAR(255)
+);
+
+ALTER TABLE sets ADD COLUMN IF NOT EXISTS user_id INTEGER REFERENCES users(id);
+
+CREATE TABLE IF NOT EXISTS flashcards (
+    id SERIAL PRIMARY KEY,
+    set_id VARCHAR(36) NOT NULL REFERENCES sets(set_id) ON DELETE CASCADE,
+    front_text TEXT NOT NULL,
+    back_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Add star_status column to flashcards table
+ALTER TABLE flashcards ADD COLUMN IF NOT EXISTS star_status BOOLEAN DEFAULT FALSE;
+
+CREATE TABLE IF NOT EXISTS study_progress (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    card_id INTEGER NOT NULL REFERENCES flashcards(id) ON DELETE CASCADE,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    last_correct_at TIMESTAMP,
+    UNIQUE(user_id, card_id)
+);
@@ -0,0 +1,8 @@
+-- Storage for the Postgres generation cache backend
+CREATE TABLE IF NOT EXISTS generation_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    cards JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_generation_cache_created_at ON generation_cache (created_at);
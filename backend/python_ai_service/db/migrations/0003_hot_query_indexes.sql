@@ -0,0 +1,14 @@
+-- Indexes for the filters and orderings used by the route queries.
+
+-- get_flashcards_by_set / get_flashcards: WHERE set_id = ? ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_flashcards_set_id_created_at
+    ON flashcards (set_id, created_at DESC, id DESC);
+
+-- get_all_sets / get_flashcards: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_sets_user_id_created_at
+    ON sets (user_id, created_at DESC, id DESC);
+
+-- Card deletes cascade into study_progress; (user_id, card_id) is already
+-- covered by the table's unique constraint.
+CREATE INDEX IF NOT EXISTS idx_study_progress_card_id
+    ON study_progress (card_id);
@@ -0,0 +1,31 @@
+-- SM-2 scheduling state per user/card and the review history it is derived from.
+
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS ease_factor REAL NOT NULL DEFAULT 2.5;
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS interval_days REAL NOT NULL DEFAULT 0;
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS repetitions INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS lapses INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS last_reviewed_at TIMESTAMP;
+ALTER TABLE study_progress ADD COLUMN IF NOT EXISTS due_at TIMESTAMP;
+
+-- Existing progress predates scheduling: treat those cards as due now.
+UPDATE study_progress
+SET due_at = COALESCE(last_correct_at, CURRENT_TIMESTAMP),
+    last_reviewed_at = last_correct_at
+WHERE due_at IS NULL;
+
+-- "Next N due cards" for a user
+CREATE INDEX IF NOT EXISTS idx_study_progress_user_due
+    ON study_progress (user_id, due_at);
+
+CREATE TABLE IF NOT EXISTS review_log (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    card_id INTEGER NOT NULL REFERENCES flashcards(id) ON DELETE CASCADE,
+    grade SMALLINT NOT NULL CHECK (grade BETWEEN 0 AND 5),
+    reviewed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_log_user_card_time
+    ON review_log (user_id, card_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_review_log_card_id
+    ON review_log (card_id);
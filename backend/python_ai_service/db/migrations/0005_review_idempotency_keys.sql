@@ -0,0 +1,8 @@
+-- Client-supplied idempotency keys for review events, so a retried batch
+-- submission is applied at most once per user.
+
+ALTER TABLE review_log ADD COLUMN IF NOT EXISTS event_id VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_review_log_user_event_id
+    ON review_log (user_id, event_id)
+    WHERE event_id IS NOT NULL;
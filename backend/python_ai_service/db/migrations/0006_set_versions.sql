@@ -0,0 +1,6 @@
+-- Change counters used as response validators (ETags): a set's version is
+-- bumped whenever the set or any of its cards change, and a user's
+-- sets_version whenever any of their sets do.
+
+ALTER TABLE sets ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS sets_version BIGINT NOT NULL DEFAULT 1;
@@ -0,0 +1,7 @@
+-- Monotonic change marker on progress rows so study sessions can fetch only
+-- the rows that changed since their last refresh.
+
+CREATE SEQUENCE IF NOT EXISTS study_progress_revision_seq;
+
+ALTER TABLE study_progress
+    ADD COLUMN IF NOT EXISTS revision BIGINT NOT NULL DEFAULT nextval('study_progress_revision_seq');
@@ -0,0 +1,18 @@
+-- Full-text search over cards and sets. The tsvector columns are generated,
+-- so PostgreSQL keeps them current on every insert and update (COPY
+-- included) without application code.
+
+ALTER TABLE flashcards ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(front_text, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(back_text, '')), 'B')
+    ) STORED;
+
+ALTER TABLE sets ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(topic, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_flashcards_search_vector ON flashcards USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_sets_search_vector ON sets USING GIN (search_vector);
@@ -0,0 +1,13 @@
+-- Server-side sessions (see sessions.py): the cookie carries only the
+-- session id, so a session can be ended from any worker by deleting its row.
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id VARCHAR(64) PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    data TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Revoking all of a user's sessions, and trimming expired ones on write
+CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
@@ -0,0 +1,86 @@
+-- Study progress aggregates for dashboards (see db/progress_summary.py),
+-- maintained in the same transaction as every study_progress write so that
+-- dashboards read one row per set instead of every card's progress.
+
+CREATE TABLE IF NOT EXISTS set_progress_summary (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    set_id VARCHAR(36) NOT NULL REFERENCES sets(set_id) ON DELETE CASCADE,
+    cards_seen INTEGER NOT NULL DEFAULT 0,
+    cards_mastered INTEGER NOT NULL DEFAULT 0,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    last_studied_at TIMESTAMP,
+    -- Consecutive UTC days studied, ending on last_studied_at's day
+    streak_days INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, set_id)
+);
+
+-- Keeps a set's summary rows removable when the set is deleted
+CREATE INDEX IF NOT EXISTS idx_set_progress_summary_set_id ON set_progress_summary (set_id);
+
+-- A study streak across all sets can't be derived from per-set streaks
+CREATE TABLE IF NOT EXISTS user_study_streaks (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    last_studied_at TIMESTAMP NOT NULL,
+    streak_days INTEGER NOT NULL DEFAULT 1
+);
+
+-- Backfill from existing progress; mastered means 3 or more correct answers.
+INSERT INTO set_progress_summary (user_id, set_id, cards_seen, cards_mastered, last_studied_at)
+SELECT p.user_id, f.set_id, COUNT(*), COUNT(*) FILTER (WHERE p.correct_count >= 3),
+       MAX(COALESCE(p.last_reviewed_at, p.last_correct_at))
+FROM study_progress p
+JOIN flashcards f ON f.id = p.card_id
+GROUP BY p.user_id, f.set_id
+ON CONFLICT (user_id, set_id) DO NOTHING;
+
+WITH set_reviews AS (
+    SELECT r.user_id, f.set_id, COUNT(*) AS reviews
+    FROM review_log r
+    JOIN flashcards f ON f.id = r.card_id
+    GROUP BY r.user_id, f.set_id
+)
+UPDATE set_progress_summary s SET reviews = r.reviews
+FROM set_reviews r
+WHERE s.user_id = r.user_id AND s.set_id = r.set_id;
+
+-- Streaks: the run of consecutive review days that ends on the last one.
+-- Progress older than the review log counts as a one-day streak.
+WITH days AS (
+    SELECT DISTINCT r.user_id, f.set_id, r.reviewed_at::date AS day
+    FROM review_log r
+    JOIN flashcards f ON f.id = r.card_id
+), runs AS (
+    SELECT user_id, set_id, day,
+           day - (ROW_NUMBER() OVER (PARTITION BY user_id, set_id ORDER BY day))::int AS run
+    FROM days
+), last_runs AS (
+    SELECT DISTINCT ON (user_id, set_id) user_id, set_id, COUNT(*) AS streak_days
+    FROM runs
+    GROUP BY user_id, set_id, run
+    ORDER BY user_id, set_id, MAX(day) DESC
+)
+UPDATE set_progress_summary s SET streak_days = l.streak_days
+FROM last_runs l
+WHERE s.user_id = l.user_id AND s.set_id = l.set_id;
+
+UPDATE set_progress_summary SET streak_days = 1
+WHERE streak_days = 0 AND last_studied_at IS NOT NULL;
+
+WITH days AS (
+    SELECT DISTINCT user_id, reviewed_at::date AS day FROM review_log
+), runs AS (
+    SELECT user_id, day, day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::int AS run
+    FROM days
+), last_runs AS (
+    SELECT DISTINCT ON (user_id) user_id, COUNT(*) AS streak_days
+    FROM runs
+    GROUP BY user_id, run
+    ORDER BY user_id, MAX(day) DESC
+)
+INSERT INTO user_study_streaks (user_id, last_studied_at, streak_days)
+SELECT s.user_id, MAX(s.last_studied_at), COALESCE(MAX(l.streak_days), 1)
+FROM set_progress_summary s
+LEFT JOIN last_runs l ON l.user_id = s.user_id
+WHERE s.last_studied_at IS NOT NULL
+GROUP BY s.user_id
+ON CONFLICT (user_id) DO NOTHING;
@@ -0,0 +1,14 @@
+-- Replace the progress revision sequence with the id of the transaction that
+-- last wrote each row. Sequence values are taken in statement order but
+-- become visible in commit order, so a delta token holding the highest
+-- revision seen could skip a row whose transaction committed later. A
+-- snapshot's xmin has no such gap: every transaction below it has finished,
+-- so a row changed after the snapshot always has changed_xid >= xmin.
+-- Existing rows get this migration's transaction id, which is below the
+-- xmin of every snapshot taken after it commits.
+
+ALTER TABLE study_progress
+    ADD COLUMN IF NOT EXISTS changed_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+ALTER TABLE study_progress DROP COLUMN IF EXISTS revision;
+DROP SEQUENCE IF EXISTS study_progress_revision_seq;
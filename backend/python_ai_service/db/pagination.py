@@ -0,0 +1,147 @@
+import json
+import base64
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from psycopg2 import sql
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# API field name -> column name for each listable resource
+SET_FIELDS = {
+    'id': 'id',
+    'set_id': 'set_id',
+    'topic': 'topic',
+    'intensity_level': 'intensity_level',
+    'card_count': 'card_count',
+    'created_at': 'created_at',
+    'name': 'name',
+    'user_id': 'user_id',
+}
+CARD_FIELDS = {
+    'id': 'id',
+    'set_id': 'set_id',
+    'front': 'front_text',
+    'back': 'back_text',
+    'created_at': 'created_at',
+    'star_status': 'star_status',
+}
+
+
+class PageArgs:
+    """Parsed ``limit``/``cursor``/``fields`` query parameters."""
+
+    def __init__(self, limit: Optional[int], after: Optional[Tuple[datetime.datetime, int]], fields: List[str]):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+
+    @property
+    def paginated(self):
+        return self.limit is not None
+
+
+def _encode(values) -> str:
+    raw = json.dumps(values).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(created_at: datetime.datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given row."""
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        created_at, row_id = _decode(cursor)
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """Cursor for results ordered by (rank DESC, id DESC), e.g. search."""
+    return _encode([rank, row_id])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, row_id = _decode(cursor)
+        return float(rank), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_page_args(args, field_map: Dict[str, str]) -> PageArgs:
+    """Parse pagination and projection arguments, raising ValueError on bad input.
+
+    Pagination is enabled when either ``limit`` or ``cursor`` is present;
+    ``limit`` is clamped to MAX_PAGE_SIZE. ``fields`` is a comma-separated
+    list of field names to return (default: all).
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+    elif cursor:
+        limit = DEFAULT_PAGE_SIZE
+
+    fields = list(field_map)
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in field_map]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return PageArgs(limit, decode_cursor(cursor) if cursor else None, fields)
+
+
+def keyset_query(table: str, field_map: Dict[str, str], page: PageArgs, where: str,
+                 params: Sequence, sql_module=sql) -> Tuple[sql.Composed, List]:
+    """Build a newest-first keyset query over ``table``.
+
+    Selected columns are ``created_at, id`` (for the cursor) followed by the
+    projected fields. ``where`` is a trusted SQL fragment using %s params.
+    Fetches ``limit + 1`` rows so callers can tell whether a next page exists.
+    Pass ``sql_module=psycopg.sql`` to compose the query for the async driver.
+    """
+    columns = sql_module.SQL(', ').join(sql_module.Identifier(field_map[f]) for f in page.fields)
+    conditions = [sql_module.SQL(where)]
+    params = list(params)
+    if page.after:
+        conditions.append(sql_module.SQL("(created_at, id) < (%s, %s)"))
+        params.extend(page.after)
+    query = sql_module.SQL("SELECT created_at, id{extra} FROM {table} WHERE {where} ORDER BY created_at DESC, id DESC").format(
+        extra=sql_module.SQL(', ') + columns if page.fields else sql_module.SQL(''),
+        table=sql_module.Identifier(table),
+        where=sql_module.SQL(' AND ').join(conditions),
+    )
+    if page.limit is not None:
+        query += sql_module.SQL(" LIMIT %s")
+        params.append(page.limit + 1)
+    return query, params
+
+
+def row_to_item(row: Sequence, fields: List[str]) -> Dict:
+    """Map a row from keyset_query to an API dict of the projected fields."""
+    return dict(zip(fields, row[2:]))
+
+
+def page_from_rows(rows: List[Sequence], page: PageArgs) -> Tuple[List[Dict], Optional[str]]:
+    """Return (items, next_cursor) for a page fetched with keyset_query."""
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    next_cursor = encode_cursor(rows[-1][0], rows[-1][1]) if has_more and rows else None
+    return [row_to_item(row, page.fields) for row in rows], next_cursor
@@ -0,0 +1,247 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class DatabaseUnavailable(psycopg2.OperationalError):
+    """Raised when a pooled connection cannot be opened or checked out in time."""
+
+
+class _PooledConnection:
+    """A raw connection plus the bookkeeping the pool needs to recycle it."""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool.
+
+    Connections are opened lazily up to ``maxconn``. Idle connections are
+    health-checked with ``SELECT 1`` before reuse once they have sat idle for
+    ``health_check_interval`` seconds, and are recycled once older than
+    ``max_lifetime`` seconds. Callers that find the pool exhausted block for
+    up to ``timeout`` seconds before ``DatabaseUnavailable`` is raised.
+    """
+
+    def __init__(self, connect_kwargs, minconn=1, maxconn=10, max_lifetime=1800.0,
+                 health_check_interval=30.0, timeout=10.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: require 0 <= minconn <= maxconn and maxconn >= 1")
+        self._connect_kwargs = dict(connect_kwargs)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+
+        self._lock = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._pending = 0
+        self._pid = os.getpid()
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._connects = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        for _ in range(minconn):
+            try:
+                self._idle.append(self._open())
+            except psycopg2.Error:
+                # The database may not be up yet; connections are opened on demand.
+                break
+
+    def _open(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._connects += 1
+        return _PooledConnection(conn)
+
+    def _discard(self, pooled):
+        self._discarded += 1
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, pooled, now):
+        return self.max_lifetime and now - pooled.created_at > self.max_lifetime
+
+    def _is_healthy(self, pooled, now):
+        conn = pooled.conn
+        if conn.closed:
+            return False
+        if now - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reset_after_fork(self):
+        # Connections must never be shared between a parent and a forked child.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._in_use = {}
+            self._pending = 0
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to ``timeout`` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                self._reset_after_fork()
+                if self._closed:
+                    raise DatabaseUnavailable("Connection pool is closed")
+
+                # Connections being opened or health-checked count as pending
+                # so concurrent callers cannot overshoot maxconn.
+                pooled = None
+                must_open = False
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._pending += 1
+                elif len(self._in_use) + self._pending < self.maxconn:
+                    self._pending += 1
+                    must_open = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise DatabaseUnavailable(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection"
+                        )
+                    waited = True
+                    self._lock.wait(remaining)
+                    continue
+
+            now = time.monotonic()
+            if must_open:
+                try:
+                    pooled = self._open()
+                except psycopg2.Error as e:
+                    with self._lock:
+                        self._pending -= 1
+                        self._lock.notify()
+                    raise DatabaseUnavailable(f"Could not connect to database: {e}") from e
+            elif self._is_expired(pooled, now) or not self._is_healthy(pooled, now):
+                with self._lock:
+                    self._pending -= 1
+                    self._discard(pooled)
+                    self._lock.notify()
+                continue
+
+            with self._lock:
+                self._pending -= 1
+                wait_time = time.monotonic() - started
+                self._in_use[id(pooled.conn)] = pooled
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                self._total_wait += wait_time
+                self._max_wait = max(self._max_wait, wait_time)
+            return pooled.conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        with self._lock:
+            pooled = self._in_use.get(id(conn))
+            if pooled is None:
+                # Not ours (or checked out before a fork); just drop it.
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                return
+
+        if not conn.closed and not close:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._lock:
+            self._in_use.pop(id(conn), None)
+            now = time.monotonic()
+            if close or conn.closed or self._closed or self._is_expired(pooled, now):
+                self._discard(pooled)
+            else:
+                pooled.last_used = now
+                self._idle.append(pooled)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks a connection out and always returns it.
+
+        Any transaction left open (including one aborted by an exception) is
+        rolled back before the connection goes back to the pool, so callers
+        only need to ``commit()`` on success.
+        """
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+        except psycopg2.InterfaceError:
+            broken = True
+            raise
+        except psycopg2.OperationalError:
+            broken = conn.closed != 0
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            for pooled in self._idle:
+                self._discard(pooled)
+            self._idle = []
+            self._lock.notify_all()
+
+    def stats(self):
+        """Return a snapshot of pool usage for monitoring."""
+        with self._lock:
+            in_use = len(self._in_use)
+            idle = len(self._idle)
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': in_use + idle,
+                'in_use': in_use,
+                'idle': idle,
+                'checkouts': self._checkouts,
+                'connects': self._connects,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+                'waits': self._waits,
+                'total_wait_seconds': round(self._total_wait, 6),
+                'avg_wait_ms': round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+            }
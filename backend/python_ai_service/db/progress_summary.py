@@ -0,0 +1,79 @@
+"""Per-set and per-user study progress aggregates behind the dashboards.
+
+Every write to study_progress must pass its changes to ``summary_params``
+and execute ``UPDATE_SUMMARY_SQL`` in the same transaction, so a dashboard
+that reads the summary agrees with the progress rows. The scheduler's
+record functions do this for every study endpoint.
+"""
+import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+# A card counts as mastered once it has been answered correctly this many times
+MASTERED_CORRECT_COUNT = 3
+
+# Consecutive UTC days: studying the day after the last study day extends the
+# streak, a later day restarts it, and the same or an earlier day (a late
+# batch upload) leaves it alone.
+_STREAK = """
+        streak_days = CASE
+            WHEN EXCLUDED.last_studied_at::date = {table}.last_studied_at::date + 1 THEN {table}.streak_days + 1
+            WHEN EXCLUDED.last_studied_at::date > {table}.last_studied_at::date + 1 THEN 1
+            ELSE {table}.streak_days
+        END,
+        last_studied_at = GREATEST({table}.last_studied_at, EXCLUDED.last_studied_at)"""
+
+# Takes arrays rather than a VALUES list so one statement serves both psycopg2
+# and psycopg 3 cursors, for one card or a whole batch. Summary rows are
+# upserted in set_id order so that concurrent multi-set batches of one user
+# (two tabs, a retry) lock them in the same order instead of deadlocking.
+UPDATE_SUMMARY_SQL = """
+    WITH changes AS (
+        SELECT f.set_id, SUM(v.seen) AS seen, SUM(v.mastered) AS mastered, SUM(v.reviews) AS reviews,
+               MAX(v.reviewed_at) AS studied_at
+        FROM unnest(%(card_ids)s::int[], %(seen)s::int[], %(mastered)s::int[], %(reviews)s::int[],
+                    %(reviewed_at)s::timestamp[]) AS v (card_id, seen, mastered, reviews, reviewed_at)
+        JOIN flashcards f ON f.id = v.card_id
+        GROUP BY f.set_id
+        ORDER BY f.set_id
+    ), set_summaries AS (
+        INSERT INTO set_progress_summary
+            (user_id, set_id, cards_seen, cards_mastered, reviews, last_studied_at, streak_days)
+        SELECT %(user_id)s, set_id, seen, mastered, reviews, studied_at, 1 FROM changes ORDER BY set_id
+        ON CONFLICT (user_id, set_id) DO UPDATE SET
+            cards_seen = set_progress_summary.cards_seen + EXCLUDED.cards_seen,
+            cards_mastered = set_progress_summary.cards_mastered + EXCLUDED.cards_mastered,
+            reviews = set_progress_summary.reviews + EXCLUDED.reviews,""" + _STREAK.format(table='set_progress_summary') + """
+    )
+    INSERT INTO user_study_streaks (user_id, last_studied_at, streak_days)
+    SELECT %(user_id)s, MAX(studied_at), 1 FROM changes HAVING COUNT(*) > 0
+    ON CONFLICT (user_id) DO UPDATE SET""" + _STREAK.format(table='user_study_streaks') + "\n"
+
+# One card's change: (card_id, inserted, correct_count after, correct answers added, reviews, last reviewed_at)
+ProgressChange = Tuple[int, bool, int, int, int, datetime.datetime]
+
+
+def summary_params(user_id: int, changes: Iterable[ProgressChange]) -> Dict:
+    """Turn study_progress upsert results into UPDATE_SUMMARY_SQL parameters.
+
+    ``inserted`` means the card had no progress row before, i.e. is newly
+    seen; it is mastered by this write if its correct count crossed
+    MASTERED_CORRECT_COUNT.
+    """
+    params = {'user_id': user_id, 'card_ids': [], 'seen': [], 'mastered': [], 'reviews': [], 'reviewed_at': []}
+    for card_id, inserted, correct_count, correct_added, reviews, reviewed_at in changes:
+        before = correct_count - correct_added
+        params['card_ids'].append(card_id)
+        params['seen'].append(1 if inserted else 0)
+        params['mastered'].append(1 if before < MASTERED_CORRECT_COUNT <= correct_count else 0)
+        params['reviews'].append(reviews)
+        params['reviewed_at'].append(reviewed_at)
+    return params
+
+
+def current_streak(streak_days: int, last_studied_at: Optional[datetime.datetime],
+                   today: Optional[datetime.date] = None) -> int:
+    """A stored streak is still current if its last day was today or yesterday (UTC)."""
+    if last_studied_at is None:
+        return 0
+    today = today or datetime.datetime.utcnow().date()
+    return streak_days if last_studied_at.date() >= today - datetime.timedelta(days=1) else 0
@@ -0,0 +1,28 @@
+"""Change counters behind the set and library ETags.
+
+Every write that changes what a set or a user's set list looks like must
+call one of these in the same transaction, so a reader that sees the new
+data also sees the new version.
+"""
+from typing import Optional
+
+
+def bump_set_version(cur, set_id: str) -> None:
+    """Mark a set (and its owner's set list) as changed."""
+    cur.execute(
+        """
+        WITH changed AS (
+            UPDATE sets SET version = version + 1 WHERE set_id = %s RETURNING user_id
+        )
+        UPDATE users SET sets_version = sets_version + 1
+        WHERE id IN (SELECT user_id FROM changed)
+        """,
+        (set_id,)
+    )
+
+
+def bump_library_version(cur, user_id: Optional[int]) -> None:
+    """Mark a user's set list as changed, e.g. after creating a set."""
+    if user_id is None:
+        return
+    cur.execute("UPDATE users SET sets_version = sets_version + 1 WHERE id = %s", (user_id,))
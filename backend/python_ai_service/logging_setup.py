@@ -0,0 +1,92 @@
+"""Structured, leveled and sampled logging for the service.
+
+Modules log through ``logging.getLogger(__name__)``. ``configure_logging``
+attaches one handler to the ``python_ai_service`` logger that writes a JSON
+object per line (or plain text with LOG_FORMAT=text) including any
+``extra`` fields. Records below LOG_LEVEL are discarded before any
+formatting is done. Of the INFO and DEBUG records that remain, only a
+LOG_SAMPLE_RATE fraction is written; warnings and errors are always kept.
+Hot paths can call ``should_log`` first to skip building records that
+sampling would drop.
+"""
+import json
+import time
+import random
+import logging
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'taskName', 'sampled'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        extra = ' '.join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} " \
+               f"{record.name}: {record.getMessage()}" + (f" [{extra}]" if extra else '')
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def _sampled(level: int, rate: float) -> bool:
+    return level >= logging.WARNING or rate >= 1 or random.random() < rate
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every warning and error but only ``rate`` of the records below."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        # Records already sampled by should_log are not sampled twice
+        return getattr(record, 'sampled', False) or _sampled(record.levelno, self.rate)
+
+
+_HANDLER_NAME = 'python_ai_service'
+_sample_rate = 1.0
+
+
+def should_log(logger: logging.Logger, level: int) -> bool:
+    """Whether a record at ``level`` would be written, applying the sample rate.
+
+    Pass ``extra={"sampled": True, ...}`` to the log call that follows so it
+    is not sampled a second time.
+    """
+    return logger.isEnabledFor(level) and _sampled(level, _sample_rate)
+
+
+def configure_logging(settings) -> None:
+    """Install the service's log handler, replacing one installed earlier."""
+    global _sample_rate
+    _sample_rate = settings.log_sample_rate
+    logger = logging.getLogger('python_ai_service')
+    logger.setLevel(settings.log_level)
+    for handler in list(logger.handlers):
+        if handler.get_name() == _HANDLER_NAME:
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.set_name(_HANDLER_NAME)
+    handler.setFormatter(TextFormatter() if settings.log_format == 'text' else JsonFormatter())
+    handler.addFilter(SamplingFilter(settings.log_sample_rate))
+    logger.addHandler(handler)
+    # Records are written once, here, rather than again by the root logger
+    logger.propagate = False
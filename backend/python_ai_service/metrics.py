@@ -0,0 +1,297 @@
+"""Prometheus metrics.
+
+A small in-process registry of counters and histograms, rendered in the
+Prometheus text exposition format by the ``/metrics`` endpoint, and the
+middleware that times every request. Database time and query counts are
+accumulated per request by the instrumented cursor (see db/database.py)
+through a context variable, so they need no plumbing through the routes.
+
+Values are per process: with several workers, each is scraped on its own.
+"""
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, g, request
+
+from python_ai_service.logging_setup import should_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram:
+    """Histogram with fixed upper bounds, optionally labelled."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# A collector returns (name, type, help, [(labels, value), ...]) tuples read at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                logger.exception("Metrics collector %s failed", getattr(collector, '__name__', collector))
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} "
+                                 f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _flatten(stats: Dict, prefix: str = ''):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        elif isinstance(value, (int, float)):
+            yield name, int(value) if isinstance(value, bool) else value
+
+
+def register_stats(prefix: str, stats: Callable[[], Optional[Dict]]) -> None:
+    """Expose a component's ``stats()`` dict as gauges named ``<prefix>_<key>``.
+
+    ``stats`` is called at scrape time and may return None while the
+    component has not been created yet. Nested dicts are flattened and
+    non-numeric values skipped.
+    """
+    def collect():
+        snapshot = stats()
+        if not snapshot:
+            return []
+        return [(f"{prefix}_{name}", 'gauge', f"{name} from the {prefix} stats.", [({}, value)])
+                for name, value in _flatten(snapshot)]
+    REGISTRY.register_collector(collect)
+
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests handled.', ('endpoint', 'method', 'status')))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce a response (to the first byte for streams).',
+    ('endpoint', 'method')))
+HTTP_REQUEST_DB_SECONDS = REGISTRY.register(Histogram(
+    'http_request_db_seconds', 'Database time spent per request.', ('endpoint',)))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    'http_request_db_queries', 'Database queries issued per request.', ('endpoint',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'db_query_duration_seconds', 'Duration of individual database statements.'))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'llm_request_duration_seconds', 'Model call duration, including retries and rate limit waits.',
+    ('operation', 'outcome'), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)))
+LLM_TOKENS = REGISTRY.register(Counter(
+    'llm_tokens_total', 'Model tokens used, by input or output.', ('kind',)))
+LLM_CARDS_PARSED = REGISTRY.register(Counter(
+    'llm_cards_parsed_total', 'Cards parsed from model responses, by whether the response was '
+    'valid JSON (clean) or had to be salvaged (recovered).', ('outcome',)))
+
+
+class RequestStats:
+    """Database work done while handling one request."""
+
+    __slots__ = ('db_seconds', 'db_queries')
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+def record_query(seconds: float) -> None:
+    """Count one database statement against the current request, if any."""
+    DB_QUERY_SECONDS.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.db_queries += 1
+
+
+def record_llm_usage(usage) -> None:
+    """Count the tokens reported by a model response's ``usage``."""
+    if usage is not None:
+        LLM_TOKENS.inc(usage.input_tokens, kind='input')
+        LLM_TOKENS.inc(usage.output_tokens, kind='output')
+
+
+def begin_request() -> contextvars.Token:
+    """Start counting database work against a new request.
+
+    Pass the returned token to ``end_request`` once the request is done.
+    """
+    return _request_stats.set(RequestStats())
+
+
+def end_request(token: contextvars.Token) -> None:
+    _request_stats.reset(token)
+
+
+_access_logger = logging.getLogger('python_ai_service.access')
+
+
+def observe_request(endpoint: str, method: str, path: str, status: int, elapsed: float,
+                    slow_request_seconds: Optional[float] = None) -> None:
+    """Record a finished request's metrics and write its access log line.
+
+    Requests slower than ``slow_request_seconds`` are logged as warnings so
+    they are never dropped by log sampling.
+    """
+    stats = _request_stats.get() or RequestStats()
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=status)
+    HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=method)
+    HTTP_REQUEST_DB_SECONDS.observe(stats.db_seconds, endpoint=endpoint)
+    HTTP_REQUEST_DB_QUERIES.observe(stats.db_queries, endpoint=endpoint)
+
+    level = logging.WARNING if slow_request_seconds and elapsed >= slow_request_seconds else logging.INFO
+    if should_log(_access_logger, level):
+        _access_logger.log(level, "%s %s %s", method, path, status, extra={
+            "sampled": True,
+            "endpoint": endpoint,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "db_ms": round(stats.db_seconds * 1000, 2),
+            "db_queries": stats.db_queries,
+        })
+
+
+def _endpoint() -> str:
+    # The route pattern, not the path, so ids do not explode the label set
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_app(app: Flask, slow_request_seconds: Optional[float] = None) -> None:
+    """Time every request, log it, and serve the registry at ``/metrics``."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_token = begin_request()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        observe_request(_endpoint(), request.method, request.path, response.status_code,
+                        time.perf_counter() - started, slow_request_seconds)
+        return response
+
+    @app.teardown_request
+    def _reset_request_stats(error=None):
+        token = g.pop('_metrics_token', None)
+        if token is not None:
+            end_request(token)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,47 +1,49 @@
-from flask import Blueprint, request, jsonify, session
-from werkzeug.security import generate_password_hash, check_password_hash
-from python_ai_service.db.database import get_db_connection
+import math
+import logging
+from flask import Blueprint, current_app, request, jsonify, session
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.services.login_throttle import get_login_throttle
+from python_ai_service.services.password_hashing import HashingOverloaded, get_password_hasher
+from python_ai_service.services.user_cache import get_user, prime_user, user_from_row
 import uuid
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+def _overloaded(error):
+    logger.warning("Password hashing overloaded: %s", error)
+    return jsonify({"error": "The server is busy, please try again shortly"}), 503, {'Retry-After': '1'}
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
-        print("Registration request received")
         data = request.get_json()
         if not data:
-            print("No JSON data provided")
             return jsonify({"error": "No JSON data provided"}), 400
 
         username = data.get('username')
         email = data.get('email')
         password = data.get('password')
 
-        print(f"Registration attempt for username: {username}, email: {email}")
-
         if not username or not email or not password:
-            print("Missing required fields")
             return jsonify({"error": "Missing required fields"}), 400
 
-        password_hash = generate_password_hash(password)
-
-        conn = get_db_connection()
-        if not conn:
-            print("Database connection failed")
-            return jsonify({"error": "Database connection failed"}), 500
+        try:
+            password_hash = get_password_hasher().hash(password)
+        except HashingOverloaded as e:
+            return _overloaded(e)
 
         try:
-            cur = conn.cursor()
-            print("Attempting to insert user into database")
-            cur.execute(
-                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
-                (username, email, password_hash)
-            )
-            user_id = cur.fetchone()[0]
-            conn.commit()
-            print(f"User registered successfully with ID: {user_id}")
-            
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
+                        (username, email, password_hash)
+                    )
+                    user_id = cur.fetchone()[0]
+                conn.commit()
+            logger.info("User registered", extra={"user_id": user_id})
+
             session['user_id'] = user_id
             session['username'] = username
             
@@ -54,90 +56,136 @@ def register():
                 }
             })
             
+        except DatabaseUnavailable as e:
+            logger.error("Database connection failed: %s", e)
+            return jsonify({"error": "Database connection failed"}), 500
         except Exception as e:
-            conn.rollback()
-            print(f"Database error during registration: {e}")
+            logger.warning("Database error during registration: %s", e)
             if "duplicate key" in str(e).lower():
                 return jsonify({"error": "Username or email already exists"}), 400
             return jsonify({"error": f"Database error: {str(e)}"}), 500
-        finally:
-            cur.close()
-            conn.close()
 
     except Exception as e:
-        print(f"Unexpected error during registration: {e}")
+        logger.exception("Unexpected error during registration: %s", e)
         return jsonify({"error": f"Registration failed: {str(e)}"}), 500
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
-        print("Login request received")
         data = request.get_json()
         if not data:
-            print("No JSON data provided")
             return jsonify({"error": "No JSON data provided"}), 400
 
         username = data.get('username')
         password = data.get('password')
 
-        print(f"Login attempt for username: {username}")
-
         if not username or not password:
-            print("Missing username or password")
             return jsonify({"error": "Missing username or password"}), 400
 
-        conn = get_db_connection()
-        if not conn:
-            print("Database connection failed")
+        # Refuse floods and repeated guesses before any password is hashed
+        throttle = get_login_throttle()
+        retry_after = throttle.check(request.remote_addr, username)
+        if retry_after is not None:
+            logger.info("Login throttled", extra={"username": username, "remote_addr": request.remote_addr})
+            return (jsonify({"error": "Too many login attempts, please try again later"}), 429,
+                    {'Retry-After': str(max(1, math.ceil(retry_after)))})
+
+        try:
+            with db_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, username, email, bio, profile_image_url, password_hash FROM users WHERE username = %s",
+                    (username,)
+                )
+                user = cur.fetchone()
+        except DatabaseUnavailable as e:
+            logger.error("Database connection failed: %s", e)
             return jsonify({"error": "Database connection failed"}), 500
 
+        hasher = get_password_hasher()
         try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT id, username, email, password_hash FROM users WHERE username = %s",
-                (username,)
-            )
-            user = cur.fetchone()
-
-            if not user or not check_password_hash(user[3], password):
-                print("Invalid username or password")
-                return jsonify({"error": "Invalid username or password"}), 401
-
-            print(f"Login successful for user: {username}")
-            session['user_id'] = user[0]
-            session['username'] = user[1]
-            
-            return jsonify({
-                "message": "Login successful",
-                "user": {
-                    "id": user[0],
-                    "username": user[1],
-                    "email": user[2]
-                }
-            })
-            
-        finally:
-            cur.close()
-            conn.close()
+            valid = bool(user) and hasher.verify(user[5], password)
+        except HashingOverloaded as e:
+            return _overloaded(e)
+        if not valid:
+            throttle.record_failure(username)
+            logger.info("Failed login", extra={"username": username})
+            return jsonify({"error": "Invalid username or password"}), 401
+
+        throttle.record_success(username)
+        logger.info("Login successful", extra={"user_id": user[0]})
+        if hasher.needs_rehash(user[5]):
+            _rehash(hasher, user[0], password)
+        # The session's first requests (check-auth, profile) are then served from the cache
+        prime_user(user_from_row(user[:5]))
+        session['user_id'] = user[0]
+        session['username'] = user[1]
+        
+        return jsonify({
+            "message": "Login successful",
+            "user": {
+                "id": user[0],
+                "username": user[1],
+                "email": user[2]
+            }
+        })
 
     except Exception as e:
-        print(f"Unexpected error during login: {e}")
+        logger.exception("Unexpected error during login: %s", e)
         return jsonify({"error": f"Login failed: {str(e)}"}), 500
 
+def _rehash(hasher, user_id, password):
+    """Store the password again under the current PASSWORD_HASH_METHOD; best effort."""
+    try:
+        password_hash = hasher.hash(password)
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+            conn.commit()
+    except (HashingOverloaded, DatabaseUnavailable) as e:
+        logger.info("Password rehash skipped for user %s: %s", user_id, e)
+
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
     session.clear()
     return jsonify({"message": "Logout successful"})
 
+@auth_bp.route('/logout-all', methods=['POST'])
+def logout_all():
+    """End every session of the current user, on every device and worker."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    revoke_user = getattr(current_app.session_interface, 'revoke_user', None)
+    if revoke_user is None:
+        return jsonify({"error": "Session revocation requires a server-side SESSION_BACKEND"}), 501
+    user_id = session['user_id']
+    try:
+        revoked = revoke_user(user_id)
+    except DatabaseUnavailable as e:
+        logger.error("Database connection failed: %s", e)
+        return jsonify({"error": "Database connection failed"}), 500
+    session.clear()
+    logger.info("All sessions revoked", extra={"user_id": user_id, "sessions": revoked})
+    return jsonify({"message": "Logged out of all sessions", "sessions_revoked": revoked})
+
 @auth_bp.route('/check-auth', methods=['GET'])
 def check_auth():
-    if 'user_id' in session:
-        return jsonify({
-            "authenticated": True,
-            "user": {
-                "id": session['user_id'],
-                "username": session['username']
-            }
-        })
-    else:
-        return jsonify({"authenticated": False}) 
\ No newline at end of file
+    if 'user_id' not in session:
+        return jsonify({"authenticated": False})
+
+    try:
+        user = get_user(session['user_id'])
+    except DatabaseUnavailable as e:
+        logger.error("Database connection failed: %s", e)
+        return jsonify({"error": "Database connection failed"}), 500
+    if user is None:
+        # The account was deleted while the session was live
+        session.clear()
+        return jsonify({"authenticated": False})
+    return jsonify({
+        "authenticated": True,
+        "user": {
+            "id": user['id'],
+            "username": user['username']
+        }
+    })
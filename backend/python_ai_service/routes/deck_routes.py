@@ -0,0 +1,183 @@
+import io
+import csv
+import json
+import uuid
+import logging
+import tempfile
+import itertools
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from werkzeug.utils import secure_filename
+from python_ai_service.config import get_settings
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.db.bulk import copy_flashcards
+from python_ai_service.db.versions import bump_library_version
+from python_ai_service.routes.generation_routes import NDJSON_HEADERS
+from python_ai_service.services.dedup import Deduplicator
+from python_ai_service.services.deck_io import FORMATS, format_for, read_deck, write_deck
+
+deck_bp = Blueprint('decks', __name__)
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when exporting
+EXPORT_FETCH_SIZE = 1000
+# Rejected rows listed in the import summary; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+# Accepted cards are buffered in memory up to this size while an upload is read, then on disk
+IMPORT_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+
+class ImportRejected(Exception):
+    """Raised when an import as a whole cannot be accepted."""
+
+
+def _import_events(user_id, stream, fmt, name, dedupe, batch_size, max_cards):
+    """Import a deck file, yielding NDJSON progress events.
+
+    Rows are parsed and validated ``batch_size`` at a time as the upload
+    arrives, and the accepted cards are spooled to a temporary file without
+    holding a database connection, so a slow uploader pins no pool slot and
+    holds no locks. Once the whole file has been read, the set and its cards
+    are written with COPY in one short transaction: either the whole deck is
+    imported or, on error, nothing is. The ``set`` event is only sent after
+    that commit.
+    """
+    dedup = Deduplicator() if dedupe else None
+    rows = accepted = skipped = duplicates = 0
+    errors = []
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MEMORY_BYTES, mode='w+', encoding='utf-8') as spool:
+            parsed = read_deck(stream, fmt)
+            while True:
+                batch = list(itertools.islice(parsed, batch_size))
+                if not batch:
+                    break
+                for line, card, error in batch:
+                    rows += 1
+                    if error:
+                        skipped += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append({"line": line, "error": error})
+                    elif dedup is not None and not dedup.add(card):
+                        duplicates += 1
+                    else:
+                        spool.write(json.dumps(card) + "\n")
+                        accepted += 1
+                if accepted > max_cards:
+                    raise ImportRejected(f"Decks are limited to {max_cards} cards")
+                yield json.dumps({"type": "progress", "rows": rows, "accepted": accepted,
+                                  "skipped": skipped, "duplicates_removed": duplicates}) + "\n"
+
+            if not accepted:
+                raise ImportRejected("No valid cards found")
+            spool.seek(0)
+            cards = (json.loads(line) for line in spool)
+            set_id = str(uuid.uuid4())
+            imported = 0
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+                        VALUES (%s, %s, 'manual', %s, %s, %s)
+                        """,
+                        (set_id, name, accepted, name, user_id)
+                    )
+                    while True:
+                        batch = list(itertools.islice(cards, batch_size))
+                        if not batch:
+                            break
+                        imported += copy_flashcards(cur, set_id, batch)
+                    bump_library_version(cur, user_id)
+                conn.commit()
+        logger.info("Deck imported", extra={"user_id": user_id, "set_id": set_id, "format": fmt,
+                                            "cards": imported, "skipped": skipped})
+        yield json.dumps({"type": "set", "set_id": set_id, "name": name}) + "\n"
+        yield json.dumps({"type": "done", "set_id": set_id, "rows": rows, "imported": imported,
+                          "skipped": skipped, "duplicates_removed": duplicates, "errors": errors}) + "\n"
+    except (ImportRejected, csv.Error, UnicodeDecodeError) as error:
+        yield json.dumps({"type": "error", "error": str(error), "errors": errors}) + "\n"
+    except DatabaseUnavailable as error:
+        logger.error("Database connection failed: %s", error)
+        yield json.dumps({"type": "error", "error": "Database connection failed"}) + "\n"
+    except Exception as error:
+        logger.exception("Error importing deck: %s", error)
+        yield json.dumps({"type": "error", "error": "Failed to import deck"}) + "\n"
+
+@deck_bp.route('/import_set', methods=['POST'])
+def import_set():
+    """Create a set from a deck file sent as the raw request body.
+
+    ``format`` is csv, tsv or anki (default: from the Content-Type, else
+    csv) and ``name`` names the new set. Duplicate and near-duplicate cards
+    are dropped, as for generated sets, unless ``dedupe=false``; the number
+    dropped is reported as ``duplicates_removed``. The file is read as it
+    arrives; the response is NDJSON: a ``progress`` event per batch read,
+    then, once the set is committed, a ``set`` event and ``done`` with
+    counts and the first rejected rows; or ``error``, in which case no set
+    was created.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    fmt = format_for(request.args.get('format'), request.content_type)
+    if fmt is None:
+        return jsonify({"error": f"Unsupported format; use one of {', '.join(FORMATS)}"}), 400
+    name = (request.args.get('name') or '').strip()
+    if not name:
+        return jsonify({"error": "Set name is required"}), 400
+
+    settings = get_settings()
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    return Response(
+        stream_with_context(_import_events(
+            session['user_id'], stream, fmt, name, request.args.get('dedupe') != 'false',
+            settings.import_batch_size, settings.import_max_cards)),
+        mimetype='application/x-ndjson',
+        headers=NDJSON_HEADERS
+    )
+
+def _card_rows(set_id):
+    """Yield (front, back, starred) for a set's cards from a server-side cursor."""
+    with db_connection() as conn:
+        with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = EXPORT_FETCH_SIZE
+            cursor.execute(
+                "SELECT front_text, back_text, star_status FROM flashcards WHERE set_id = %s ORDER BY id",
+                (set_id,)
+            )
+            yield from cursor
+
+@deck_bp.route('/export_set/<set_id>', methods=['GET'])
+def export_set(set_id):
+    """Download a set as a csv, tsv or anki file, streamed as it is read."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    fmt = format_for(request.args.get('format', 'csv'))
+    if fmt is None:
+        return jsonify({"error": f"Unsupported format; use one of {', '.join(FORMATS)}"}), 400
+
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT name, user_id FROM sets WHERE set_id = %s", (set_id,))
+            row = cur.fetchone()
+        if not row or row[1] != session['user_id']:
+            return jsonify({"error": "Set not found"}), 404
+
+        name = row[0] or 'flashcards'
+        chunks = write_deck(_card_rows(set_id), fmt, name, chunk_rows=EXPORT_FETCH_SIZE)
+        # Run up to the first chunk now so query errors become a normal error response
+        first = next(chunks)
+    except DatabaseUnavailable as e:
+        logger.error("Database connection failed: %s", e)
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error exporting set %s: %s", set_id, e)
+        return jsonify({"error": "Failed to export set"}), 500
+
+    filename = f"{secure_filename(name) or 'flashcards'}.{FORMATS[fmt]['extension']}"
+    return Response(
+        stream_with_context(itertools.chain([first], chunks)),
+        mimetype=FORMATS[fmt]['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'Cache-Control': 'no-cache'}
+    )
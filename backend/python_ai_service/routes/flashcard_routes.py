@@ -1,8 +1,23 @@
+import logging
 import uuid
-from flask import Blueprint, request, jsonify, session
-from python_ai_service.db.database import get_db_connection
+import itertools
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context
+from psycopg2.extras import execute_values
+from python_ai_service.config import get_settings
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.db.bulk import create_set_with_cards
+from python_ai_service.db.pagination import (
+    CARD_FIELDS, SET_FIELDS, keyset_query, page_from_rows, parse_page_args, row_to_item
+)
+from python_ai_service.db.versions import bump_set_version
+from python_ai_service.services.flashcard_generator import regenerate_cards
+from python_ai_service.services.response_cache import get_response_cache, make_etag
 
 flashcard_bp = Blueprint('flashcard', __name__)
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when streaming large listings
+STREAM_FETCH_SIZE = 500
 
 @flashcard_bp.route('/get_flashcards', methods=['GET'])
 def get_flashcards():
@@ -12,123 +27,225 @@ def get_flashcards():
             
         user_id = session['user_id']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT s.id, s.set_id, s.topic, s.intensity_level, s.card_count, s.created_at, s.name, s.user_id
-            FROM sets s 
-            WHERE s.user_id = %s
-            ORDER BY s.created_at DESC 
-            LIMIT 1
-        ''', (user_id,))
-        latest_set = cursor.fetchone()
-        
-        if not latest_set:
-            return jsonify([])
-        
-        cursor.execute('''
-            SELECT id, set_id, front_text, back_text, created_at, star_status
-            FROM flashcards 
-            WHERE set_id = %s 
-            ORDER BY created_at DESC
-        ''', (latest_set[1],))
-        flashcards = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn, conn.cursor() as cursor:
+            etag = _etag('latest', user_id, _library_version(cursor, user_id))
+            cached = _cached_response(etag)
+            if cached is not None:
+                return cached
+
+            cursor.execute('''
+                SELECT s.id, s.set_id, s.topic, s.intensity_level, s.card_count, s.created_at, s.name, s.user_id
+                FROM sets s 
+                WHERE s.user_id = %s
+                ORDER BY s.created_at DESC 
+                LIMIT 1
+            ''', (user_id,))
+            latest_set = cursor.fetchone()
+            
+            if not latest_set:
+                return _cacheable(jsonify([]), etag)
+            
+            cursor.execute('''
+                SELECT id, set_id, front_text, back_text, created_at, star_status
+                FROM flashcards 
+                WHERE set_id = %s 
+                ORDER BY created_at DESC
+            ''', (latest_set[1],))
+            flashcards = cursor.fetchall()
         
-        return jsonify([{
+        return _cacheable(jsonify([{
             'id': card[0],
             'set_id': card[1],
             'front': card[2],
             'back': card[3],
             'created_at': card[4],
             'star_status': card[5]
-        } for card in flashcards])
+        } for card in flashcards]), etag)
     except Exception as e:
-        print(f"Error in get_flashcards: {str(e)}")
+        logger.exception("Error in get_flashcards: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def _etag(scope, key, version):
+    return make_etag(scope, key, version, request.query_string)
+
+LIBRARY_VERSION_SQL = "SELECT sets_version FROM users WHERE id = %s"
+
+def _library_version(cursor, user_id):
+    cursor.execute(LIBRARY_VERSION_SQL, (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def _cached_response(etag):
+    """Answer from the client's or the server's cache if possible, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        cache = get_response_cache()
+        body = cache.get(etag) if cache else None
+        if body is None:
+            return None
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _cacheable(response, etag):
+    """Tag a fully built response and store its body in the response cache."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    cache = get_response_cache()
+    if cache and response.status_code == 200:
+        cache.set(etag, response.get_data())
+    return response
+
+def _stream_json_rows(query, params, fields, prefix, suffix):
+    """Yield a JSON document whose array is filled from a server-side cursor.
+
+    Rows are fetched STREAM_FETCH_SIZE at a time so memory stays flat however
+    many rows match. The first chunk (``prefix``) is only yielded once the
+    query has executed, so callers can prime the generator to surface errors
+    before the response starts.
+    """
+    with db_connection() as conn:
+        with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = STREAM_FETCH_SIZE
+            cursor.execute(query, params)
+            yield prefix
+            dumps = current_app.json.dumps
+            chunk = []
+            separator = ''
+            for row in cursor:
+                chunk.append(separator + dumps(row_to_item(row, fields)))
+                separator = ','
+                if len(chunk) >= STREAM_FETCH_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(suffix)
+            yield ''.join(chunk)
+
+def _streaming_response(chunks, etag=None):
+    # Run up to the first chunk now so query errors become a normal error response.
+    first = next(chunks)
+    cache = get_response_cache() if etag else None
+    def generate():
+        # Keep a copy for the response cache until the body outgrows an entry
+        body = [] if cache else None
+        size = 0
+        for chunk in itertools.chain([first], chunks):
+            if body is not None:
+                body.append(chunk)
+                size += len(chunk)
+                if size > cache.max_entry_bytes:
+                    body = None
+            yield chunk
+        if body is not None:
+            cache.set(etag, ''.join(body).encode('utf-8'))
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Column order: id, set_id, topic, intensity_level, card_count, created_at, name, version
+SET_INFO_SQL = '''
+    SELECT id, set_id, topic, intensity_level, card_count, created_at, name, version
+    FROM sets
+    WHERE set_id = %s
+'''
+
+def set_info_to_json(row):
+    return {
+        'id': row[0],
+        'set_id': row[1],
+        'topic': row[2],
+        'intensity_level': row[3],
+        'card_count': row[4],
+        'created_at': row[5],
+        'name': row[6]
+    }
+
 @flashcard_bp.route('/get_flashcards_by_set/<set_id>', methods=['GET'])
 def get_flashcards_by_set(set_id):
+    """Return a set and its cards, newest first.
+
+    With ``limit`` and/or ``cursor`` the cards are paginated by keyset and a
+    ``next_cursor`` is returned; otherwise all cards are streamed. ``fields``
+    selects which card fields to return (e.g. ``fields=id,front``).
+
+    Responses carry an ETag derived from the set's version, so a matching
+    ``If-None-Match`` gets a 304 without reading the flashcards table.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get set information - match the column order: id, set_id, topic, intensity_level, card_count, created_at, name
-        cursor.execute('''
-            SELECT id, set_id, topic, intensity_level, card_count, created_at, name
-            FROM sets 
-            WHERE set_id = %s
-        ''', (set_id,))
-        set_info = cursor.fetchone()
-        
-        if not set_info:
-            return jsonify({'error': 'Set not found'}), 404
-        
-        # Get flashcards for this set - match the column order: id, set_id, front_text, back_text, created_at, star_status
-        cursor.execute('''
-            SELECT id, set_id, front_text, back_text, created_at, star_status
-            FROM flashcards 
-            WHERE set_id = %s 
-            ORDER BY created_at DESC
-        ''', (set_id,))
-        flashcards = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            'set_info': {
-                'id': set_info[0],
-                'set_id': set_info[1],
-                'topic': set_info[2],
-                'intensity_level': set_info[3],
-                'card_count': set_info[4],
-                'created_at': set_info[5],
-                'name': set_info[6]
-            },
-            'flashcards': [{
-                'id': card[0],
-                'set_id': card[1],
-                'front': card[2],  # front_text
-                'back': card[3],   # back_text
-                'created_at': card[4],
-                'star_status': card[5]
-            } for card in flashcards]
-        })
+        page = parse_page_args(request.args, CARD_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(SET_INFO_SQL, (set_id,))
+            set_info = cursor.fetchone()
+            
+            if not set_info:
+                return jsonify({'error': 'Set not found'}), 404
+
+            etag = _etag('set', set_info[0], set_info[7])
+            cached = _cached_response(etag)
+            if cached is not None:
+                return cached
+
+            set_info = set_info_to_json(set_info)
+
+            # Get flashcards for this set
+            query, params = keyset_query('flashcards', CARD_FIELDS, page, 'set_id = %s', (set_id,))
+            if page.paginated:
+                cursor.execute(query, params)
+                flashcards, next_cursor = page_from_rows(cursor.fetchall(), page)
+                return _cacheable(jsonify({
+                    'set_info': set_info,
+                    'flashcards': flashcards,
+                    'next_cursor': next_cursor
+                }), etag)
+
+        return _streaming_response(_stream_json_rows(
+            query, params, page.fields,
+            '{"flashcards":[',
+            '],"set_info":' + current_app.json.dumps(set_info) + '}'
+        ), etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @flashcard_bp.route('/get_all_sets', methods=['GET'])
 def get_all_sets():
+    """Return the user's sets, newest first.
+
+    Without ``limit``/``cursor`` this streams the full list as before; with
+    them it returns ``{"sets": [...], "next_cursor": ...}``. ``fields``
+    selects which set fields to return. Responses carry an ETag derived from
+    the user's set list version.
+    """
     try:
         if 'user_id' not in session:
             return jsonify({"error": "Authentication required"}), 401
             
         user_id = session['user_id']
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, set_id, topic, intensity_level, card_count, created_at, name, user_id
-            FROM sets 
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        sets = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return jsonify([{
-            'id': set_data[0],
-            'set_id': set_data[1],
-            'topic': set_data[2],
-            'intensity_level': set_data[3],
-            'card_count': set_data[4],
-            'created_at': set_data[5],
-            'name': set_data[6],
-            'user_id': set_data[7]
-        } for set_data in sets])
+
+        try:
+            page = parse_page_args(request.args, SET_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query, params = keyset_query('sets', SET_FIELDS, page, 'user_id = %s', (user_id,))
+        with db_connection() as conn, conn.cursor() as cursor:
+            etag = _etag('sets', user_id, _library_version(cursor, user_id))
+            cached = _cached_response(etag)
+            if cached is not None:
+                return cached
+            if page.paginated:
+                cursor.execute(query, params)
+                sets, next_cursor = page_from_rows(cursor.fetchall(), page)
+                return _cacheable(jsonify({'sets': sets, 'next_cursor': next_cursor}), etag)
+
+        return _streaming_response(_stream_json_rows(query, params, page.fields, '[', ']'), etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -145,20 +262,114 @@ def update_flashcard(card_id):
         if not front_text or not back_text:
             return jsonify({"error": "Front and back text are required"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE flashcards SET front_text = %s, back_text = %s WHERE id = %s",
-            (front_text, back_text, card_id)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE flashcards SET front_text = %s, back_text = %s WHERE id = %s RETURNING set_id",
+                    (front_text, back_text, card_id)
+                )
+                updated = cursor.fetchone()
+                if updated:
+                    bump_set_version(cursor, updated[0])
+            conn.commit()
 
         return jsonify({"message": "Flashcard updated successfully"})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@flashcard_bp.route('/regenerate_cards/<set_id>', methods=['POST'])
+def regenerate_set_cards(set_id):
+    """Rewrite selected cards of a set with the model, updating them in place.
+
+    The body selects cards with ``card_ids`` (a list of ids) or
+    ``starred: true``, and may give an ``instruction`` such as "make the
+    answers shorter". Rewrites are memoized per card and instruction;
+    ``refresh: true`` asks the model again. Cards the model did not return
+    are left as they were and listed in ``unchanged``.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({"error": "Authentication required"}), 401
+
+        data = request.get_json(silent=True) or {}
+        card_ids = data.get('card_ids')
+        starred = data.get('starred') is True
+        instruction = data.get('instruction')
+        # type() rather than isinstance: JSON true/false arrive as bool, an int subclass
+        if card_ids is not None and (not isinstance(card_ids, list)
+                                     or not all(type(card_id) is int for card_id in card_ids)):
+            return jsonify({"error": "card_ids must be a list of card ids"}), 400
+        if not card_ids and not starred:
+            return jsonify({"error": "Select cards with card_ids or starred"}), 400
+        if instruction is not None and not isinstance(instruction, str):
+            return jsonify({"error": "instruction must be a string"}), 400
+
+        with db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT topic, user_id FROM sets WHERE set_id = %s", (set_id,))
+            set_row = cursor.fetchone()
+            if not set_row or set_row[1] != session['user_id']:
+                return jsonify({"error": "Set not found"}), 404
+            if card_ids:
+                cursor.execute(
+                    "SELECT id, front_text, back_text FROM flashcards WHERE set_id = %s AND id = ANY(%s) ORDER BY id",
+                    (set_id, card_ids)
+                )
+            else:
+                cursor.execute(
+                    "SELECT id, front_text, back_text FROM flashcards WHERE set_id = %s AND star_status ORDER BY id",
+                    (set_id,)
+                )
+            rows = cursor.fetchall()
+
+        if not rows:
+            return jsonify({"error": "No matching cards in this set"}), 400
+        max_cards = get_settings().regenerate_max_cards
+        if len(rows) > max_cards:
+            return jsonify({"error": f"At most {max_cards} cards can be regenerated at once"}), 400
+
+        # No connection is held during the model call
+        result = regenerate_cards(set_row[0], [{"front": row[1], "back": row[2]} for row in rows],
+                                  instruction, use_cache=not data.get('refresh'))
+        updates = [(row[0], card['front'], card['back'])
+                   for row, card in zip(rows, result['cards']) if card is not None]
+        if not updates:
+            return jsonify({"error": "Failed to regenerate cards"}), 502
+
+        with db_connection() as conn:
+            with conn.cursor() as cursor:
+                # All rows in one statement and one transaction, like update_flashcard per card
+                updated = execute_values(
+                    cursor,
+                    """
+                    UPDATE flashcards SET front_text = v.front, back_text = v.back
+                    FROM (VALUES %s) AS v (id, front, back, set_id)
+                    WHERE flashcards.id = v.id AND flashcards.set_id = v.set_id
+                    RETURNING flashcards.id
+                    """,
+                    [update + (set_id,) for update in updates],
+                    page_size=len(updates),
+                    fetch=True
+                )
+                if updated:
+                    bump_set_version(cursor, set_id)
+            conn.commit()
+
+        updated_ids = {row[0] for row in updated}
+        return jsonify({
+            'set_id': set_id,
+            'cards': [{'id': card_id, 'front': front, 'back': back}
+                      for card_id, front, back in updates if card_id in updated_ids],
+            'regenerated': len(updated_ids),
+            'cached': result['cached'],
+            'unchanged': [row[0] for row in rows if row[0] not in updated_ids],
+        })
+    except DatabaseUnavailable as e:
+        logger.error("Database connection failed: %s", e)
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error regenerating cards for set %s: %s", set_id, e)
+        return jsonify({'error': 'Failed to regenerate cards'}), 500
+
 @flashcard_bp.route('/toggle_star/<int:card_id>', methods=['PUT'])
 def toggle_star(card_id):
     try:
@@ -171,15 +382,16 @@ def toggle_star(card_id):
         if star_status is None:
             return jsonify({"error": "Star status is required"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE flashcards SET star_status = %s WHERE id = %s",
-            (star_status, card_id)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE flashcards SET star_status = %s WHERE id = %s RETURNING set_id",
+                    (star_status, card_id)
+                )
+                updated = cursor.fetchone()
+                if updated:
+                    bump_set_version(cursor, updated[0])
+            conn.commit()
 
         return jsonify({"message": "Star status updated successfully"})
     except Exception as e:
@@ -195,16 +407,16 @@ def update_set_name(set_id):
         if not data or 'name' not in data:
             return jsonify({'error': 'Missing name field'}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'UPDATE sets SET name = %s WHERE set_id = %s RETURNING *',
-            (data['name'], set_id)
-        )
-        updated_set = cursor.fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE sets SET name = %s WHERE set_id = %s RETURNING *',
+                    (data['name'], set_id)
+                )
+                updated_set = cursor.fetchone()
+                if updated_set:
+                    bump_set_version(cursor, set_id)
+            conn.commit()
 
         if not updated_set:
             return jsonify({'error': 'Set not found'}), 404
@@ -233,40 +445,24 @@ def create_manual_set():
     if not name or not cards:
         return jsonify({"error": "Set name and cards are required"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        with conn.cursor() as cur:
-            set_id = str(uuid.uuid4())
-            
-            # Insert the new set
-            cur.execute(
-                """
-                INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (set_id, name, 'manual', len(cards), name, user_id)
-            )
-
-            # Insert flashcards
-            for card in cards:
-                cur.execute(
-                    """
-                    INSERT INTO flashcards (set_id, front_text, back_text, star_status)
-                    VALUES (%s, %s, %s, false)
-                    """,
-                    (set_id, card.get('front'), card.get('back'))
-                )
-        
-        conn.commit()
+        set_id = str(uuid.uuid4())
+        with db_connection() as conn:
+            # Insert the new set and all of its flashcards in one transaction
+            create_set_with_cards(conn, set_id, name, 'manual', name, user_id, cards)
         return jsonify({"message": "Set created successfully", "set_id": set_id}), 201
     
+    except DatabaseUnavailable as e:
+        logger.error("Error creating manual set: %s", e)
+        return jsonify({"error": "Database connection failed"}), 500
+
     except Exception as e:
-        conn.rollback()
-        print(f"Error creating manual set: {e}")
+        logger.exception("Error creating manual set: %s", e)
         return jsonify({"error": "Failed to create set"}), 500
-    
-    finally:
-        conn.close() 
\ No newline at end of file
+
+@flashcard_bp.route('/response_cache/stats', methods=['GET'])
+def get_response_cache_stats():
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(cache.stats(), enabled=True))
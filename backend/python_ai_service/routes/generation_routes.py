@@ -1,16 +1,35 @@
-from flask import Blueprint, request, jsonify, session
-from python_ai_service.services.flashcard_generator import generate_study_materials
-from python_ai_service.db.database import get_db_connection
+import logging
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+from python_ai_service.config import get_settings
+from python_ai_service.services.flashcard_generator import get_generation_queue, stream_study_materials, PROMPT_VERSION
+from python_ai_service.services.generation_cache import get_generation_cache, make_cache_key
+from python_ai_service.services.job_queue import QueueFull, UserLimitExceeded
+import json
 import uuid
 
 generation_bp = Blueprint('generation', __name__)
+logger = logging.getLogger(__name__)
+
+def parse_custom_count(value):
+    """Validate an optional custom_count, returning (count, error message).
+
+    It decides how many model calls a request makes, so it must be a
+    positive integer no larger than GENERATION_MAX_CARDS.
+    """
+    if value is None:
+        return None, None
+    # bool is an int subclass, but true/false are not counts
+    if type(value) is not int or value < 1:
+        return None, "custom_count must be a positive integer"
+    max_cards = get_settings().generation_max_cards
+    if value > max_cards:
+        return None, f"custom_count may be at most {max_cards}"
+    return value, None
 
 @generation_bp.route('/generate_flashcards', methods=['POST'])
 def generate_flashcards():
     try:
-        print("GENERATION ROUTE: Session data:", dict(session))
         if 'user_id' not in session:
-            print("GENERATION ROUTE: Auth failed. 'user_id' not in session.")
             return jsonify({"error": "Authentication required"}), 401
             
         user_id = session['user_id']
@@ -23,9 +42,14 @@ def generate_flashcards():
         test_name = data.get('test_name')
         intensity_level = data.get('intensity_level')
         context = data.get('context', '')
-        custom_count = data.get('custom_count')
+        custom_count, error = parse_custom_count(data.get('custom_count'))
+        if error:
+            return jsonify({"error": error}), 400
 
-        print(f"Received request - Topic: {topic}, Test: {test_name}, Intensity: {intensity_level}, Custom Count: {custom_count}, User ID: {user_id}")
+        logger.info("Generation requested", extra={
+            "topic": topic, "test_name": test_name, "intensity_level": intensity_level,
+            "custom_count": custom_count, "user_id": user_id
+        })
 
         if not topic or not intensity_level:
             return jsonify({"error": "Missing required fields: topic and intensity_level are required"}), 400
@@ -33,15 +57,131 @@ def generate_flashcards():
         if not test_name or test_name.strip() == '':
             test_name = None
 
-        flashcards = generate_study_materials(
+        # Generation runs on the background worker pool; poll the job for the result
+        job = get_generation_queue().submit(user_id, dict(
             topic=topic,
             test_name=test_name,
             intensity_level=intensity_level,
             custom_count=custom_count,
-            user_id=user_id
-        )
+            user_id=user_id,
+            use_cache=data.get('use_cache', True) is not False,
+            refresh_cache=bool(data.get('refresh_cache', False))
+        ))
+
+        response = job.to_dict()
+        response['status_url'] = f"/generation_jobs/{job.id}"
+        return jsonify(response), 202
+    except UserLimitExceeded as error:
+        return jsonify({"error": str(error)}), 429
+    except QueueFull as error:
+        return jsonify({"error": str(error)}), 503, {'Retry-After': '5'}
+    except Exception as error:
+        logger.exception("Error in generate_flashcards route: %s", error)
+        return jsonify({"error": f"An unexpected error occurred: {str(error)}"}), 500
+
+@generation_bp.route('/generation_jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    job = get_generation_queue().get(job_id)
+    if not job or job.user_id != session['user_id']:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(job.to_dict())
+
+@generation_bp.route('/generation_jobs/stats', methods=['GET'])
+def get_generation_queue_stats():
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    return jsonify(get_generation_queue().stats())
+
+def stream_request_params(data):
+    """Validate a /generate_flashcards/stream body, returning (params, error message)."""
+    if not data:
+        return None, "No JSON data provided"
+
+    topic = data.get('topic')
+    test_name = data.get('test_name')
+    intensity_level = data.get('intensity_level')
+
+    if not topic or not intensity_level:
+        return None, "Missing required fields: topic and intensity_level are required"
+
+    if not test_name or test_name.strip() == '':
+        test_name = None
+
+    custom_count, error = parse_custom_count(data.get('custom_count'))
+    if error:
+        return None, error
 
-        return jsonify(flashcards)
+    return dict(
+        topic=topic,
+        test_name=test_name,
+        intensity_level=intensity_level,
+        custom_count=custom_count,
+        use_cache=data.get('use_cache', True) is not False,
+        refresh_cache=bool(data.get('refresh_cache', False))
+    ), None
+
+def ndjson_generation_events(user_id, params):
+    """Yield stream_study_materials events as NDJSON lines, ending with an error event on failure."""
+    try:
+        for event in stream_study_materials(user_id=user_id, **params):
+            yield json.dumps(event) + "\n"
+    except Exception as error:
+        logger.exception("Error in generate_flashcards_stream route: %s", error)
+        yield json.dumps({"type": "error", "error": str(error)}) + "\n"
+
+NDJSON_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+@generation_bp.route('/generate_flashcards/stream', methods=['POST'])
+def generate_flashcards_stream():
+    """Generate a set in concurrent batches, streaming cards back as NDJSON.
+
+    Each line is one JSON event: ``set`` (with the new set_id), ``card``,
+    ``batch_saved``/``batch_failed`` as batches are persisted, then ``done``.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    params, error = stream_request_params(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+
+    return Response(
+        stream_with_context(ndjson_generation_events(session['user_id'], params)),
+        mimetype='application/x-ndjson',
+        headers=NDJSON_HEADERS
+    )
+
+@generation_bp.route('/generation_cache/stats', methods=['GET'])
+def get_generation_cache_stats():
+    cache = get_generation_cache()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(cache.stats(), enabled=True))
+
+@generation_bp.route('/generation_cache', methods=['DELETE'])
+def invalidate_generation_cache():
+    """Drop the cached cards for one request (same fields as /generate_flashcards)."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    cache = get_generation_cache()
+    if cache is None:
+        return jsonify({"error": "Generation cache is disabled"}), 404
+
+    data = request.get_json()
+    if not data or not data.get('topic') or not data.get('intensity_level'):
+        return jsonify({"error": "Missing required fields: topic and intensity_level are required"}), 400
+
+    key = make_cache_key(data.get('topic'), data.get('test_name'), data.get('intensity_level'),
+                         data.get('custom_count'), PROMPT_VERSION)
+    try:
+        invalidated = cache.invalidate(key)
     except Exception as error:
-        print(f"Error in generate_flashcards route: {error}")
-        return jsonify({"error": f"An unexpected error occurred: {str(error)}"}), 500 
\ No newline at end of file
+        logger.exception("Error invalidating generation cache: %s", error)
+        return jsonify({"error": "Failed to invalidate cache entry"}), 500
+    return jsonify({"invalidated": invalidated})
\ No newline at end of file
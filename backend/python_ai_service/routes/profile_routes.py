@@ -1,58 +1,32 @@
+import logging
 from flask import Blueprint, request, jsonify, session
-from python_ai_service.db.database import get_db_connection
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.services.user_cache import get_user, invalidate_user
 
 profile_bp = Blueprint('profile', __name__)
+logger = logging.getLogger(__name__)
 
 @profile_bp.route('/profile', methods=['GET'])
 def get_user_profile():
     if 'user_id' not in session:
         return jsonify({"error": "Authentication required"}), 401
     
-    user_id = session['user_id']
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-        
     try:
-        with conn.cursor() as cur:
-            # Assuming 'bio' and 'profile_image_url' columns exist or will be added
-            cur.execute(
-                "SELECT username, email, bio, profile_image_url FROM users WHERE id = %s",
-                (user_id,)
-            )
-            user = cur.fetchone()
-            if user:
-                return jsonify({
-                    "username": user[0],
-                    "email": user[1],
-                    "bio": user[2],
-                    "profile_image_url": user[3]
-                })
-            else:
-                return jsonify({"error": "User not found"}), 404
+        user = get_user(session['user_id'])
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as e:
-        # Gracefully handle missing columns
-        if 'column "bio" does not exist' in str(e) or 'column "profile_image_url" does not exist' in str(e):
-             # Rerun query without the new columns
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT username, email FROM users WHERE id = %s",
-                    (user_id,)
-                )
-                user = cur.fetchone()
-                if user:
-                    return jsonify({
-                        "username": user[0],
-                        "email": user[1],
-                        "bio": "This is a default biography.",
-                        "profile_image_url": None
-                    })
-                else:
-                    return jsonify({"error": "User not found"}), 404
-        print(f"Error fetching profile: {e}")
+        logger.exception("Error fetching profile: %s", e)
         return jsonify({"error": "An error occurred while fetching the profile"}), 500
-    finally:
-        conn.close()
+
+    if user is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({
+        "username": user['username'],
+        "email": user['email'],
+        "bio": user['bio'],
+        "profile_image_url": user['profile_image_url']
+    })
 
 @profile_bp.route('/profile', methods=['PUT'])
 def update_user_profile():
@@ -64,24 +38,21 @@ def update_user_profile():
     bio = data.get('bio')
     profile_image_url = data.get('profile_image_url')
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        with conn.cursor() as cur:
-            # This will fail if the columns don't exist. 
-            # This should be paired with a database migration.
-            cur.execute(
-                "UPDATE users SET bio = %s, profile_image_url = %s WHERE id = %s",
-                (bio, profile_image_url, user_id)
-            )
-        conn.commit()
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                # This will fail if the columns don't exist. 
+                # This should be paired with a database migration.
+                cur.execute(
+                    "UPDATE users SET bio = %s, profile_image_url = %s WHERE id = %s",
+                    (bio, profile_image_url, user_id)
+                )
+            conn.commit()
+        invalidate_user(user_id)
         return jsonify({"message": "Profile updated successfully"})
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as e:
-        conn.rollback()
-        print(f"Error updating profile: {e}")
+        logger.exception("Error updating profile: %s", e)
         # A more robust solution would be to check for the specific "column does not exist" error
-        return jsonify({"error": "Failed to update profile. Columns may be missing."}), 500
-    finally:
-        conn.close() 
\ No newline at end of file
+        return jsonify({"error": "Failed to update profile. Columns may be missing."}), 500
\ No newline at end of file
@@ -1,8 +1,21 @@
+import logging
 from flask import Blueprint, request, jsonify, session
-from python_ai_service.db.database import get_db_connection
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.db.progress_summary import MASTERED_CORRECT_COUNT, current_streak
 import datetime
+from python_ai_service.services.scheduler import (
+    CORRECT_GRADE, INCORRECT_GRADE, record_review, record_reviews, reschedule_user
+)
 
 progress_bp = Blueprint('progress', __name__)
+logger = logging.getLogger(__name__)
+
+SET_PROGRESS_SQL = """
+    SELECT p.card_id, p.correct_count
+    FROM study_progress p
+    JOIN flashcards f ON p.card_id = f.id
+    WHERE p.user_id = %s AND f.set_id = %s
+"""
 
 @progress_bp.route('/progress/set/<set_id>', methods=['GET'])
 def get_set_progress(set_id):
@@ -10,28 +23,120 @@ def get_set_progress(set_id):
         return jsonify({"error": "Authentication required"}), 401
     
     user_id = session['user_id']
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT p.card_id, p.correct_count
-                FROM study_progress p
-                JOIN flashcards f ON p.card_id = f.id
-                WHERE p.user_id = %s AND f.set_id = %s
-            """, (user_id, set_id))
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(SET_PROGRESS_SQL, (user_id, set_id))
             progress_data = cur.fetchall()
             
-            progress_map = {row[0]: row[1] for row in progress_data}
-            
-            return jsonify(progress_map)
+        progress_map = {row[0]: row[1] for row in progress_data}
+        
+        return jsonify(progress_map)
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as e:
-        print(f"Error fetching progress for set {set_id}: {e}")
+        logger.exception("Error fetching progress for set %s: %s", set_id, e)
         return jsonify({"error": "An error occurred while fetching progress"}), 500
-    finally:
-        conn.close()
+
+
+# One row per studied set, read through the summary's primary key
+SUMMARY_SETS_SQL = """
+    SELECT s.set_id, s.name, s.card_count, p.cards_seen, p.cards_mastered, p.reviews,
+           p.last_studied_at, p.streak_days
+    FROM set_progress_summary p
+    JOIN sets s ON s.set_id = p.set_id
+    WHERE p.user_id = %s
+    ORDER BY p.last_studied_at DESC NULLS LAST
+"""
+
+SET_SUMMARY_SQL = """
+    SELECT s.set_id, s.name, s.card_count, p.cards_seen, p.cards_mastered, p.reviews,
+           p.last_studied_at, p.streak_days
+    FROM sets s
+    LEFT JOIN set_progress_summary p ON p.set_id = s.set_id AND p.user_id = %s
+    WHERE s.set_id = %s
+"""
+
+USER_STREAK_SQL = "SELECT last_studied_at, streak_days FROM user_study_streaks WHERE user_id = %s"
+
+
+def set_summary_to_json(row, today):
+    card_count = row[2] or 0
+    mastered = row[4] or 0
+    return {
+        "set_id": row[0],
+        "name": row[1],
+        "card_count": card_count,
+        "cards_seen": row[3] or 0,
+        "cards_mastered": mastered,
+        "mastery": round(min(mastered / card_count, 1.0), 4) if card_count else 0.0,
+        "reviews": row[5] or 0,
+        "last_studied_at": row[6].isoformat() if row[6] else None,
+        "streak_days": current_streak(row[7] or 0, row[6], today),
+    }
+
+
+@progress_bp.route('/progress/summary', methods=['GET'])
+def get_progress_summary():
+    """Return the user's progress across all studied sets, plus per-set rows.
+
+    Read from the aggregates kept up to date by every progress write, so the
+    cost grows with the number of sets studied, not the number of cards.
+    A card is mastered once answered correctly MASTERED_CORRECT_COUNT times.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    user_id = session['user_id']
+    today = datetime.datetime.utcnow().date()
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(SUMMARY_SETS_SQL, (user_id,))
+            sets = [set_summary_to_json(row, today) for row in cur.fetchall()]
+            cur.execute(USER_STREAK_SQL, (user_id,))
+            streak = cur.fetchone()
+
+        card_count = sum(entry['card_count'] for entry in sets)
+        mastered = sum(entry['cards_mastered'] for entry in sets)
+        return jsonify({
+            "totals": {
+                "sets_studied": len(sets),
+                "card_count": card_count,
+                "cards_seen": sum(entry['cards_seen'] for entry in sets),
+                "cards_mastered": mastered,
+                "mastery": round(min(mastered / card_count, 1.0), 4) if card_count else 0.0,
+                "reviews": sum(entry['reviews'] for entry in sets),
+                "last_studied_at": streak[0].isoformat() if streak else None,
+                "streak_days": current_streak(streak[1], streak[0], today) if streak else 0,
+            },
+            "sets": sets,
+            "mastered_correct_count": MASTERED_CORRECT_COUNT,
+        })
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error fetching progress summary: %s", e)
+        return jsonify({"error": "An error occurred while fetching the progress summary"}), 500
+
+
+@progress_bp.route('/progress/summary/<set_id>', methods=['GET'])
+def get_set_progress_summary(set_id):
+    """Return the user's progress on one set from its summary row."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    user_id = session['user_id']
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(SET_SUMMARY_SQL, (user_id, set_id))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({"error": "Set not found"}), 404
+        return jsonify(set_summary_to_json(row, datetime.datetime.utcnow().date()))
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error fetching progress summary for set %s: %s", set_id, e)
+        return jsonify({"error": "An error occurred while fetching the progress summary"}), 500
 
 
 @progress_bp.route('/progress/card/<int:card_id>', methods=['POST'])
@@ -40,27 +145,400 @@ def update_card_progress(card_id):
         return jsonify({"error": "Authentication required"}), 401
 
     user_id = session['user_id']
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
     try:
-        with conn.cursor() as cur:
-            # UPSERT operation: Insert or update the progress count
-            cur.execute("""
-                INSERT INTO study_progress (user_id, card_id, correct_count, last_correct_at)
-                VALUES (%s, %s, 1, %s)
-                ON CONFLICT (user_id, card_id) 
-                DO UPDATE SET 
-                    correct_count = study_progress.correct_count + 1,
-                    last_correct_at = %s;
-            """, (user_id, card_id, datetime.datetime.utcnow(), datetime.datetime.utcnow()))
-        
-        conn.commit()
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                # A "correct" answer is recorded as a good review so it also advances the schedule
+                record_review(cur, user_id, card_id, CORRECT_GRADE)
+            conn.commit()
         return jsonify({"message": "Progress updated successfully"}), 200
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as e:
-        conn.rollback()
-        print(f"Error updating progress for card {card_id}: {e}")
+        logger.exception("Error updating progress for card %s: %s", card_id, e)
         return jsonify({"error": "Failed to update progress"}), 500
-    finally:
-        conn.close() 
\ No newline at end of file
+
+MAX_BATCH_EVENTS = 1000
+MAX_EVENT_ID_LENGTH = 64
+
+
+def _parse_review_event(event, now):
+    """Validate one batch event, returning (event, error message)."""
+    if not isinstance(event, dict):
+        return None, "event must be an object"
+    event_id = event.get('event_id')
+    if not isinstance(event_id, str) or not 0 < len(event_id) <= MAX_EVENT_ID_LENGTH:
+        return None, f"event_id must be a string of 1 to {MAX_EVENT_ID_LENGTH} characters"
+    card_id = event.get('card_id')
+    if not isinstance(card_id, int) or isinstance(card_id, bool):
+        return None, "card_id must be an integer"
+
+    # Either an SM-2 grade or a plain correct/incorrect outcome
+    grade = event.get('grade')
+    if grade is None and isinstance(event.get('correct'), bool):
+        grade = CORRECT_GRADE if event['correct'] else INCORRECT_GRADE
+    if not isinstance(grade, int) or isinstance(grade, bool) or not 0 <= grade <= 5:
+        return None, "grade must be an integer from 0 to 5, or correct must be true/false"
+
+    reviewed_at = now
+    if event.get('reviewed_at'):
+        try:
+            reviewed_at = datetime.datetime.fromisoformat(str(event['reviewed_at']))
+        except ValueError:
+            return None, "reviewed_at must be an ISO 8601 timestamp"
+        if reviewed_at.tzinfo is not None:
+            reviewed_at = reviewed_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        # Don't let a skewed client clock schedule reviews in the future
+        reviewed_at = min(reviewed_at, now)
+
+    return {'event_id': event_id, 'card_id': card_id, 'grade': grade, 'reviewed_at': reviewed_at}, None
+
+
+@progress_bp.route('/progress/batch', methods=['POST'])
+def submit_review_batch():
+    """Apply many review events in one transaction.
+
+    Body: ``{"events": [{"event_id", "card_id", "grade" or "correct",
+    "reviewed_at"}]}``. ``event_id`` is an idempotency key: resubmitting an
+    event that was already applied reports it as a duplicate instead of
+    counting it twice. Each event gets its own status in ``results``.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "events must be a non-empty list"}), 400
+    if len(events) > MAX_BATCH_EVENTS:
+        return jsonify({"error": f"At most {MAX_BATCH_EVENTS} events per batch"}), 400
+
+    now = datetime.datetime.utcnow()
+    results = []
+    valid = []
+    seen = set()
+    for raw in events:
+        event, error = _parse_review_event(raw, now)
+        if error:
+            event_id = raw.get('event_id') if isinstance(raw, dict) else None
+            results.append({"event_id": event_id, "status": "invalid", "error": error})
+        elif event['event_id'] in seen:
+            results.append({"event_id": event['event_id'], "status": "duplicate"})
+        else:
+            seen.add(event['event_id'])
+            valid.append(event)
+            results.append({"event_id": event['event_id'], "status": None})
+
+    user_id = session['user_id']
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                statuses = record_reviews(cur, user_id, valid)
+            conn.commit()
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error applying review batch: %s", e)
+        return jsonify({"error": "Failed to apply review batch"}), 500
+
+    for result in results:
+        if result['status'] is None:
+            result['status'] = statuses[result['event_id']]
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return jsonify({
+        "results": results,
+        "applied": counts.get('applied', 0),
+        "duplicates": counts.get('duplicate', 0),
+        "rejected": counts.get('invalid', 0) + counts.get('not_found', 0),
+    }), 200
+
+
+def _schedule_to_json(state):
+    return {
+        "ease_factor": round(state['ease_factor'], 3),
+        "interval_days": round(state['interval_days'], 3),
+        "repetitions": state['repetitions'],
+        "lapses": state['lapses'],
+        "due_at": state['due_at'].isoformat(),
+    }
+
+
+@progress_bp.route('/progress/review/<int:card_id>', methods=['POST'])
+def review_card(card_id):
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    data = request.get_json(silent=True) or {}
+    grade = data.get('grade')
+    if not isinstance(grade, int) or isinstance(grade, bool) or not 0 <= grade <= 5:
+        return jsonify({"error": "grade must be an integer from 0 to 5"}), 400
+
+    user_id = session['user_id']
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                state = record_review(cur, user_id, card_id, grade)
+            conn.commit()
+        return jsonify({"card_id": card_id, **_schedule_to_json(state)}), 200
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error recording review for card %s: %s", card_id, e)
+        return jsonify({"error": "Failed to record review"}), 500
+
+
+# Served by idx_study_progress_user_due: an index range scan on (user_id, due_at)
+DUE_CARDS_SQL = """
+    SELECT f.id, f.set_id, f.front_text, f.back_text, f.star_status, p.due_at, p.repetitions
+    FROM study_progress p
+    JOIN flashcards f ON f.id = p.card_id
+    WHERE p.user_id = %s AND p.due_at <= %s AND (%s::varchar IS NULL OR f.set_id = %s)
+    ORDER BY p.due_at
+    LIMIT %s
+"""
+
+# New cards only come from the user's own sets, or the requested one
+NEW_CARDS_SQL = """
+    SELECT f.id, f.set_id, f.front_text, f.back_text, f.star_status, NULL, 0
+    FROM flashcards f
+    JOIN sets s ON s.set_id = f.set_id
+    WHERE (s.set_id = %s OR (%s::varchar IS NULL AND s.user_id = %s))
+      AND NOT EXISTS (
+          SELECT 1 FROM study_progress p WHERE p.user_id = %s AND p.card_id = f.id
+      )
+    ORDER BY f.created_at, f.id
+    LIMIT %s
+"""
+
+
+def parse_due_args(args):
+    """Return (limit, set_id, include_new) from /progress/due's query string."""
+    try:
+        limit = min(max(int(args.get('limit', 20)), 1), 200)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    include_new = args.get('include_new', 'true').lower() not in ('0', 'false', 'no')
+    return limit, args.get('set_id'), include_new
+
+
+def due_cards_to_json(rows):
+    return [
+        {
+            "id": row[0],
+            "set_id": row[1],
+            "front": row[2],
+            "back": row[3],
+            "star_status": row[4],
+            "due_at": row[5].isoformat() if row[5] else None,
+            "new": row[5] is None,
+        }
+        for row in rows
+    ]
+
+
+@progress_bp.route('/progress/due', methods=['GET'])
+def get_due_cards():
+    """Return the next cards to study: due reviews first, then unseen cards.
+
+    Query parameters: ``limit`` (default 20, max 200), ``set_id`` to restrict
+    to one set, and ``include_new`` (default true) to top up with cards the
+    user has never reviewed.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    try:
+        limit, set_id, include_new = parse_due_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_id = session['user_id']
+    now = datetime.datetime.utcnow()
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(DUE_CARDS_SQL, (user_id, now, set_id, set_id, limit))
+            rows = cur.fetchall()
+
+            if include_new and len(rows) < limit:
+                cur.execute(NEW_CARDS_SQL, (set_id, set_id, user_id, user_id, limit - len(rows)))
+                rows += cur.fetchall()
+
+        return jsonify({"cards": due_cards_to_json(rows), "as_of": now.isoformat()})
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error fetching due cards: %s", e)
+        return jsonify({"error": "An error occurred while fetching due cards"}), 500
+
+
+@progress_bp.route('/progress/reschedule', methods=['POST'])
+def reschedule_progress():
+    """Recompute the user's schedule for every card from their review history."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    user_id = session['user_id']
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                rescheduled = reschedule_user(cur, user_id)
+            conn.commit()
+        return jsonify({"rescheduled": rescheduled}), 200
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error rescheduling progress: %s", e)
+        return jsonify({"error": "Failed to reschedule progress"}), 500
+
+
+def _session_token(set_version, snapshot_xmin):
+    return f"{set_version}:{snapshot_xmin}"
+
+
+def parse_session_token(token):
+    """Return (set_version, snapshot_xmin), or None for a token to answer in full.
+
+    Tokens from before progress rows carried transaction ids hold a revision
+    number instead ("version.revision"); those get the full payload.
+    """
+    try:
+        if ':' not in token:
+            set_version, revision = token.split('.')
+            int(set_version), int(revision)
+            return None
+        set_version, snapshot_xmin = token.split(':')
+        return int(set_version), int(snapshot_xmin)
+    except ValueError:
+        raise ValueError("Invalid since token")
+
+
+def _progress_entry(correct_count, due_at):
+    return {"correct_count": correct_count, "due_at": due_at.isoformat() if due_at else None}
+
+
+# The oldest transaction still running when the statement's snapshot was
+# taken: every row changed by a transaction this response could not see has
+# changed_xid at or above it, whatever order the writers commit in.
+_SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+STUDY_DELTA_SQL = f"""
+    SELECT s.version, f.id, p.correct_count, p.due_at, {_SNAPSHOT_XMIN}
+    FROM sets s
+    LEFT JOIN (
+        flashcards f
+        JOIN study_progress p ON p.card_id = f.id AND p.user_id = %s AND p.changed_xid >= %s::text::xid8
+    ) ON f.set_id = s.set_id
+    WHERE s.set_id = %s
+"""
+
+STUDY_SESSION_SQL = f"""
+    SELECT s.id, s.set_id, s.topic, s.intensity_level, s.card_count, s.created_at, s.name, s.version,
+           f.id, f.front_text, f.back_text, f.star_status, f.created_at,
+           p.correct_count, p.due_at, {_SNAPSHOT_XMIN}
+    FROM sets s
+    LEFT JOIN flashcards f ON f.set_id = s.set_id
+    LEFT JOIN study_progress p ON p.card_id = f.id AND p.user_id = %s
+    WHERE s.set_id = %s
+    ORDER BY f.created_at DESC, f.id DESC
+"""
+
+
+def study_delta(rows, since):
+    """Build the delta response from STUDY_DELTA_SQL rows, or None if the set changed.
+
+    Rows changed by transactions that were still running at the previous
+    token's snapshot are sent again even if that response saw them; a
+    repeated row carries the same values, so applying it twice is harmless.
+    """
+    since_version, _ = since
+    if rows[0][0] != since_version:
+        return None
+    changed = [row for row in rows if row[1] is not None]
+    return {
+        "delta": True,
+        "progress": {row[1]: _progress_entry(row[2], row[3]) for row in changed},
+        "version": _session_token(since_version, rows[0][4]),
+    }
+
+
+def study_session(rows):
+    """Build the full study session response from STUDY_SESSION_SQL rows."""
+    first = rows[0]
+    cards = []
+    progress = {}
+    for row in rows:
+        if row[8] is None:
+            continue
+        cards.append({
+            "id": row[8],
+            "front": row[9],
+            "back": row[10],
+            "star_status": row[11],
+            "created_at": row[12],
+        })
+        if row[13] is not None:
+            progress[row[8]] = _progress_entry(row[13], row[14])
+
+    return {
+        "delta": False,
+        "set_info": {
+            "id": first[0],
+            "set_id": first[1],
+            "topic": first[2],
+            "intensity_level": first[3],
+            "card_count": first[4],
+            "created_at": first[5],
+            "name": first[6],
+        },
+        "cards": cards,
+        "progress": progress,
+        "version": _session_token(first[7], first[15]),
+    }
+
+
+@progress_bp.route('/study/session/<set_id>', methods=['GET'])
+def get_study_session(set_id):
+    """Return a set, its cards and the user's progress on them in one query.
+
+    The response includes a ``version`` token. Passing it back as ``since``
+    returns only the progress rows that changed after it (``delta: true``),
+    unless the set itself has changed, in which case the full payload is
+    returned again. The token records the snapshot the response was read
+    from rather than the newest change in it, so a write that commits after
+    a later one is still picked up by the next delta.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    since = None
+    if request.args.get('since'):
+        try:
+            since = parse_session_token(request.args['since'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    user_id = session['user_id']
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            if since is not None:
+                cur.execute(STUDY_DELTA_SQL, (user_id, since[1], set_id))
+                rows = cur.fetchall()
+                if not rows:
+                    return jsonify({"error": "Set not found"}), 404
+                delta = study_delta(rows, since)
+                if delta is not None:
+                    return jsonify(delta)
+
+            cur.execute(STUDY_SESSION_SQL, (user_id, set_id))
+            rows = cur.fetchall()
+
+        if not rows:
+            return jsonify({"error": "Set not found"}), 404
+        return jsonify(study_session(rows))
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error fetching study session for set %s: %s", set_id, e)
+        return jsonify({"error": "An error occurred while fetching the study session"}), 500
@@ -0,0 +1,53 @@
+import logging
+from flask import Blueprint, request, jsonify, session
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.db.pagination import decode_rank_cursor
+from python_ai_service.services.search import search_cards, search_sets
+
+search_bp = Blueprint('search', __name__)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_QUERY_LENGTH = 200
+
+@search_bp.route('/search', methods=['GET'])
+def search_library():
+    """Search the user's library.
+
+    ``q`` is the search text (websearch syntax), ``type`` is ``cards``
+    (default) or ``sets``, and ``limit``/``cursor`` page through the ranked
+    results.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required"}), 401
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Search text (q) is required"}), 400
+    if len(query) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"Search text is limited to {MAX_QUERY_LENGTH} characters"}), 400
+
+    kind = request.args.get('type', 'cards')
+    if kind not in ('cards', 'sets'):
+        return jsonify({"error": "type must be 'cards' or 'sets'"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_SEARCH_LIMIT)), 1), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        after = decode_rank_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    search = search_cards if kind == 'cards' else search_sets
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            results, next_cursor = search(cur, session['user_id'], query, limit, after)
+        return jsonify({"results": results, "next_cursor": next_cursor})
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Exception as e:
+        logger.exception("Error searching for %r: %s", query, e)
+        return jsonify({"error": "An error occurred while searching"}), 500
@@ -0,0 +1,144 @@
+import re
+import json
+from typing import Dict, Iterable, List, Optional
+
+# Structural characters outside and inside JSON strings; a backslash takes the character after it.
+# JSON strings never hold a raw newline, so one inside a "string" means a stray quote threw us off.
+_OUTSIDE_STRING = re.compile(r'\\.?|[{}"]', re.DOTALL)
+_INSIDE_STRING = re.compile(r'\\.?|["\n]', re.DOTALL)
+# A comma left before a closing brace, which json.loads rejects
+_TRAILING_COMMA = re.compile(r',\s*}$')
+
+
+def validate_card(card, fields: Iterable[str] = ()) -> Optional[Dict]:
+    """Return a normalized {front, back} card, or None if the object isn't one.
+
+    Any of ``fields`` present in the object are kept as they are, for prompts
+    that ask the model to echo something back alongside each card.
+    """
+    if isinstance(card, dict) and 'front' in card and 'back' in card:
+        normalized = {
+            'front': str(card['front']),
+            'back': str(card['back'])
+        }
+        normalized.update((field, card[field]) for field in fields if field in card)
+        return normalized
+    return None
+
+
+class IncrementalCardParser:
+    """Extract flashcard objects from model output as it streams in.
+
+    Text is fed in arbitrary chunks; every time an object with no objects
+    inside it closes, it is decoded and, if it is a valid card, returned
+    from ``feed``. Only such innermost objects are tried, so cards are
+    recovered whatever surrounds them: a bare array, a wrapper like
+    ``{"flashcards": [...]}``, prose or code fences with stray braces, or a
+    response cut off by max_tokens, which loses only the unfinished card.
+
+    The scanner jumps between quotes, braces and backslashes, tracking string
+    and escape state so braces inside card text don't confuse it; each
+    character is examined once and only the unfinished card is buffered.
+    """
+
+    def __init__(self, fields: Iterable[str] = ()):
+        self._fields = tuple(fields)
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        # Start of the innermost open object, while it has no object inside it
+        self._start = None
+        self._in_string = False
+        self.cards_parsed = 0
+        self.objects_rejected = 0
+
+    def feed(self, text: str) -> List[Dict]:
+        """Consume a chunk of output and return any cards completed by it."""
+        buf = self._buffer + text
+        cards = []
+        i = self._pos
+        n = len(buf)
+        while True:
+            match = (_INSIDE_STRING if self._in_string else _OUTSIDE_STRING).search(buf, i)
+            if match is None:
+                i = n
+                break
+            token = match.group()
+            if token[0] == '\\':
+                if len(token) == 1:
+                    # The escaped character is in the next chunk
+                    i = match.start()
+                    break
+            elif token == '"':
+                # Text between objects (prose) is not JSON, so only track strings inside one
+                if self._in_string or self._depth > 0:
+                    self._in_string = not self._in_string
+            elif token == '\n':
+                self._in_string = False
+            elif token == '{':
+                self._depth += 1
+                self._start = match.start()
+            elif self._depth > 0:
+                self._depth -= 1
+                if self._start is not None:
+                    card = self._decode(buf[self._start:match.end()])
+                    if card is not None:
+                        cards.append(card)
+                # Any object still open now contains one, so it cannot be a card
+                self._start = None
+            i = match.end()
+
+        # Drop everything that can no longer be part of a card.
+        keep_from = self._start if self._start is not None else i
+        self._buffer = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._start is not None:
+            self._start = 0
+        return cards
+
+    def finish(self) -> Dict:
+        """Summarize the parse once all output has been fed."""
+        return {
+            'cards': self.cards_parsed,
+            'rejected': self.objects_rejected,
+            # Output ended inside an object, e.g. cut off by max_tokens
+            'truncated': self._depth > 0 or self._in_string,
+        }
+
+    def _decode(self, fragment: str) -> Optional[Dict]:
+        try:
+            card = validate_card(json.loads(fragment, strict=False), self._fields)
+        except ValueError:
+            try:
+                card = validate_card(json.loads(_TRAILING_COMMA.sub('}', fragment), strict=False), self._fields)
+            except ValueError:
+                card = None
+        if card is None:
+            self.objects_rejected += 1
+        else:
+            self.cards_parsed += 1
+        return card
+
+
+def parse_cards(text: str, fields: Iterable[str] = ()) -> Dict:
+    """Parse a complete model response, salvaging every card in it.
+
+    Returns ``{'cards': [...], 'recovered': bool, ...}`` plus the parser's
+    summary. Well-formed JSON arrays take the fast path through json.loads;
+    anything else (prose, a wrapper object, truncation) goes through
+    IncrementalCardParser and is marked ``recovered``. ``fields`` are extra
+    keys to keep on each card (see validate_card).
+    """
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, list):
+        cards = [card for card in (validate_card(item, fields) for item in parsed) if card]
+        if len(cards) == len(parsed):
+            return {'cards': cards, 'recovered': False, 'rejected': 0, 'truncated': False}
+
+    parser = IncrementalCardParser(fields)
+    cards = parser.feed(text)
+    summary = parser.finish()
+    return {'cards': cards, 'recovered': True, 'rejected': summary['rejected'], 'truncated': summary['truncated']}
@@ -0,0 +1,168 @@
+"""Deck files: reading and writing cards as CSV, TSV or Anki text.
+
+Both directions are generators over rows, so a deck of any size is handled
+in constant memory.
+
+``csv`` and ``tsv`` files hold front and back columns, plus an optional
+``starred`` column. A first row naming the columns (front/back/starred, or
+question/answer) is recognised as a header; without one the first two
+columns are front and back.
+
+``anki`` is the plain-text format Anki imports and exports: ``#key:value``
+header lines (separator, html, columns, tags column, deck, notetype)
+followed by tab-separated Front, Back and Tags fields. Starred cards are
+exported with the tag ``starred``; on import either that tag or Anki's
+``marked`` stars a card.
+"""
+import io
+import re
+import csv
+import html
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Longest front or back accepted on import; longer rows are reported and skipped
+MAX_FIELD_LENGTH = 10000
+
+FORMATS = {
+    'csv': {'delimiter': ',', 'mimetype': 'text/csv', 'extension': 'csv'},
+    'tsv': {'delimiter': '\t', 'mimetype': 'text/tab-separated-values', 'extension': 'tsv'},
+    'anki': {'delimiter': '\t', 'mimetype': 'text/plain', 'extension': 'txt'},
+}
+
+_COLUMN_ALIASES = {
+    'front': 'front', 'question': 'front', 'term': 'front',
+    'back': 'back', 'answer': 'back', 'definition': 'back',
+    'starred': 'starred', 'star': 'starred', 'star_status': 'starred',
+    'tags': 'tags',
+}
+_ANKI_SEPARATORS = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'pipe': '|', 'space': ' ', 'colon': ':'}
+_TRUE = {'1', 't', 'true', 'y', 'yes', 'starred'}
+_STAR_TAGS = {'starred', 'marked'}
+_BREAK = re.compile(r'<br\s*/?>|</div>|</p>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]+>')
+
+# Export rows are (front, back, starred)
+Row = Tuple[str, str, bool]
+
+# Wide decks and long answers should not trip csv's default 128 KiB field limit before validation
+csv.field_size_limit(max(csv.field_size_limit(), 4 * MAX_FIELD_LENGTH))
+
+
+def format_for(name: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Pick a format from an explicit name, falling back to the request's content type."""
+    if name:
+        return name.lower() if name.lower() in FORMATS else None
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype == 'text/tab-separated-values':
+        return 'tsv'
+    return 'csv'
+
+
+def _html_to_text(value: str) -> str:
+    return html.unescape(_TAG.sub('', _BREAK.sub('\n', value))).strip()
+
+
+def _anki_header(lines: Iterator[str], options: Dict) -> Optional[str]:
+    """Consume ``#key:value`` lines into ``options``; return the first line after them."""
+    for line in lines:
+        if not line.startswith('#'):
+            return line
+        options['lines'] += 1
+        key, _, value = line[1:].partition(':')
+        key, value = key.strip().lower(), value.strip()
+        if key == 'separator':
+            options['delimiter'] = _ANKI_SEPARATORS.get(value.lower(), value[:1] or '\t')
+        elif key == 'html':
+            options['html'] = value.lower() == 'true'
+        elif key == 'columns':
+            options['columns'] = [_COLUMN_ALIASES.get(name.strip().lower()) for name in value.split(options['delimiter'])]
+        elif key == 'tags column' and value.isdigit():
+            options['tags_column'] = int(value) - 1
+    return None
+
+
+def _chain_first(first: Optional[str], lines: Iterator[str]) -> Iterator[str]:
+    if first is not None:
+        yield first
+    yield from lines
+
+
+def read_deck(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Parse a deck incrementally.
+
+    Yields ``(line, card, error)`` per data row: ``card`` is a dict with
+    front, back and starred, or None with ``error`` saying why the row was
+    rejected. ``line`` is the row's first line number in the file.
+    """
+    lines = iter(stream)
+    options = {'delimiter': FORMATS[fmt]['delimiter'], 'html': False, 'columns': None,
+               'tags_column': None, 'lines': 0}
+    first = _anki_header(lines, options) if fmt == 'anki' else None
+    reader = csv.reader(_chain_first(first, lines), delimiter=options['delimiter'])
+
+    columns = options['columns']
+    if columns is None and fmt == 'anki':
+        columns = ['front', 'back']
+        if options['tags_column'] is not None:
+            columns += [None] * (options['tags_column'] + 1 - len(columns))
+            columns[options['tags_column']] = 'tags'
+    line_offset = options['lines']
+    previous_end = 0
+
+    for row in reader:
+        line = line_offset + previous_end + 1
+        previous_end = reader.line_num
+        if not row or not any(field.strip() for field in row):
+            continue
+        if columns is None:
+            names = [_COLUMN_ALIASES.get(field.strip().lower()) for field in row]
+            if 'front' in names and 'back' in names:
+                columns = names
+                continue
+            columns = ['front', 'back', 'starred']
+
+        fields = {}
+        for name, value in zip(columns, row):
+            if name and name not in fields:
+                fields[name] = value
+        front, back = fields.get('front', ''), fields.get('back', '')
+        if options['html']:
+            front, back = _html_to_text(front), _html_to_text(back)
+        else:
+            front, back = front.strip(), back.strip()
+
+        if not front or not back:
+            yield line, None, "Missing front or back"
+            continue
+        if len(front) > MAX_FIELD_LENGTH or len(back) > MAX_FIELD_LENGTH:
+            yield line, None, f"Field longer than {MAX_FIELD_LENGTH} characters"
+            continue
+        starred = fields.get('starred', '').strip().lower() in _TRUE \
+            or bool(_STAR_TAGS & set(fields.get('tags', '').lower().split()))
+        yield line, {'front': front, 'back': back, 'starred': starred}, None
+
+
+def write_deck(rows: Iterable[Row], fmt: str, deck_name: str = '', chunk_rows: int = 1000) -> Iterator[str]:
+    """Serialize (front, back, starred) rows, yielding text every ``chunk_rows`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=FORMATS[fmt]['delimiter'], lineterminator='\n')
+    if fmt == 'anki':
+        buffer.write('#separator:tab\n#html:false\n#notetype:Basic\n')
+        if deck_name:
+            buffer.write(f"#deck:{' '.join(deck_name.split())}\n")
+        buffer.write('#columns:Front\tBack\tTags\n#tags column:3\n')
+    else:
+        writer.writerow(['front', 'back', 'starred'])
+
+    count = 0
+    for front, back, starred in rows:
+        if fmt == 'anki':
+            writer.writerow([front, back, 'starred' if starred else ''])
+        else:
+            writer.writerow([front, back, 'true' if starred else 'false'])
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,196 @@
+"""Duplicate and near-duplicate card removal.
+
+Exact duplicates are cards whose questions are equal after normalization
+(case, punctuation and whitespace ignored). Near duplicates are found with
+one-permutation MinHash over character shingles of the whole card:
+locality-sensitive hashing buckets cards whose signatures agree on any
+band, and only those candidate pairs are checked for their true shingle
+Jaccard similarity, so the work grows roughly linearly with the number of
+cards.
+
+``dedupe_cards`` handles a complete list with numpy; ``Deduplicator``
+accepts cards one at a time, for sets that are generated incrementally.
+"""
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Cards at least this similar (Jaccard over shingles) count as duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+SHINGLE_SIZE = 5
+# Signature length: each shingle hash lands in one of 2**_BIN_BITS bins
+_BIN_BITS = 5
+NUM_PERM = 1 << _BIN_BITS
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Signature value of a bin no shingle fell into (short cards)
+_EMPTY = np.uint32(0xffffffff)
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text) -> str:
+    return _NON_WORD.sub(' ', str(text or '').lower()).strip()
+
+
+def _card_text(front: str, card: Dict) -> str:
+    # Shingles only need case and spacing folded; punctuation barely moves Jaccard
+    return front + ' | ' + ' '.join(str(card.get('back') or '').lower().split())
+
+
+def _shingle_hashes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash every byte shingle of every text; return (hashes, counts per text)."""
+    encoded = [t.encode('utf-8').ljust(SHINGLE_SIZE) for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint32)
+
+    positions = len(data) - SHINGLE_SIZE + 1
+    hashes = np.zeros(positions, dtype=np.uint32)
+    for offset in range(SHINGLE_SIZE):
+        hashes = (hashes * np.uint32(0x01000193)) ^ data[offset:offset + positions]
+    # Murmur3 finalizer, so similar shingles get unrelated hashes
+    hashes ^= hashes >> np.uint32(16)
+    hashes *= np.uint32(0x85ebca6b)
+    hashes ^= hashes >> np.uint32(13)
+    hashes *= np.uint32(0xc2b2ae35)
+    hashes ^= hashes >> np.uint32(16)
+
+    # Drop shingles that straddle two texts
+    ends = np.cumsum(lengths)
+    doc = np.repeat(np.arange(len(texts)), lengths)[:positions]
+    valid = np.arange(positions) + SHINGLE_SIZE <= ends[doc]
+    counts = lengths - SHINGLE_SIZE + 1
+    return hashes[valid], counts
+
+
+def _signatures(hashes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """One-permutation MinHash signature for each run of ``counts`` hashes.
+
+    The top bits of a shingle's hash pick its bin and the rest are its value;
+    a card's signature is the minimum value in each bin. One sort over
+    (card, bin, value) replaces NUM_PERM separate hash passes.
+    """
+    doc = np.repeat(np.arange(len(counts), dtype=np.uint64), counts)
+    bins = (hashes >> np.uint32(32 - _BIN_BITS)).astype(np.uint64)
+    values = hashes & np.uint32((1 << (32 - _BIN_BITS)) - 1)
+    keyed = np.sort(((doc << np.uint64(_BIN_BITS)) | bins) << np.uint64(32) | values)
+    slots = keyed >> np.uint64(32)
+    first = np.r_[True, slots[1:] != slots[:-1]]
+    signatures = np.full(len(counts) * NUM_PERM, _EMPTY, dtype=np.uint32)
+    signatures[slots[first]] = keyed[first].astype(np.uint32)
+    return signatures.reshape(len(counts), NUM_PERM)
+
+
+def _jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard similarity of two sorted, unique hash arrays."""
+    shared = len(np.intersect1d(a, b, assume_unique=True))
+    return shared / (len(a) + len(b) - shared)
+
+
+def dedupe_cards(cards: List[Dict], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Tuple[List[Dict], Dict[str, int]]:
+    """Return (unique cards in their original order, removed counts by kind).
+
+    The first occurrence of each card is kept. Counts are reported as
+    ``{"exact": n, "near": m}``.
+    """
+    seen = set()
+    unique = []
+    texts = []
+    for card in cards:
+        front = normalize_text(card.get('front'))
+        if front not in seen:
+            seen.add(front)
+            unique.append(card)
+            texts.append(_card_text(front, card))
+    removed = {'exact': len(cards) - len(unique), 'near': 0}
+    if len(unique) < 2:
+        return unique, removed
+
+    hashes, counts = _shingle_hashes(texts)
+    signatures = _signatures(hashes, counts)
+
+    # Candidate pairs: cards whose signatures agree on every row of some band
+    candidates = set()
+    for band in range(BANDS):
+        rows = signatures[:, band * ROWS:(band + 1) * ROWS]
+        # A band with no shingles at all says nothing about similarity
+        members = np.flatnonzero((rows != _EMPTY).any(axis=1))
+        rows = np.ascontiguousarray(rows[members])
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * ROWS))).ravel()
+        _, groups = np.unique(keys, return_inverse=True)
+        order = np.argsort(groups, kind='stable')
+        grouped = groups[order]
+        first = np.r_[True, grouped[1:] != grouped[:-1]]
+        if first.all():
+            continue
+        # Pair each later member with the earliest card in its bucket
+        leaders = order[np.flatnonzero(first)][np.cumsum(first) - 1]
+        for i, j in zip(members[leaders[~first]].tolist(), members[order[~first]].tolist()):
+            candidates.add((i, j))
+    if not candidates:
+        return unique, removed
+
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    shingles = {}
+    def shingle_set(index):
+        if index not in shingles:
+            shingles[index] = np.unique(hashes[starts[index]:starts[index] + counts[index]])
+        return shingles[index]
+
+    dropped = set()
+    for i, j in sorted(candidates, key=lambda pair: (pair[1], pair[0])):
+        if i in dropped or j in dropped:
+            continue
+        if _jaccard(shingle_set(i), shingle_set(j)) >= threshold:
+            dropped.add(j)
+    removed['near'] = len(dropped)
+    return [card for index, card in enumerate(unique) if index not in dropped], removed
+
+
+class Deduplicator:
+    """Incremental version of dedupe_cards, safe to share between threads."""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._exact = set()
+        self._buckets = [{} for _ in range(BANDS)]
+        self._shingles = []
+        self._lock = threading.Lock()
+        self.exact_removed = 0
+        self.near_removed = 0
+
+    @property
+    def removed(self) -> int:
+        return self.exact_removed + self.near_removed
+
+    def add(self, card: Dict) -> bool:
+        """Record a card, returning False if it duplicates one already added."""
+        key = normalize_text(card.get('front'))
+        hashes, counts = _shingle_hashes([_card_text(key, card)])
+        signature = _signatures(hashes, counts)[0]
+        shingles = np.unique(hashes)
+        band_keys = [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+        band_keys = [band.tobytes() if (band != _EMPTY).any() else None for band in band_keys]
+
+        with self._lock:
+            if key in self._exact:
+                self.exact_removed += 1
+                return False
+            candidates = set()
+            for bucket, band_key in zip(self._buckets, band_keys):
+                if band_key is not None:
+                    candidates.update(bucket.get(band_key, ()))
+            for index in candidates:
+                if _jaccard(self._shingles[index], shingles) >= self.threshold:
+                    self.near_removed += 1
+                    return False
+            index = len(self._shingles)
+            self._shingles.append(shingles)
+            for bucket, band_key in zip(self._buckets, band_keys):
+                if band_key is not None:
+                    bucket.setdefault(band_key, []).append(index)
+            self._exact.add(key)
+            return True
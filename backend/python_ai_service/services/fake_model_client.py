@@ -0,0 +1,157 @@
+import re
+import json
+import hashlib
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+class FakeAPIError(Exception):
+    """Error raised by the fake backend, shaped like an API status error."""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = 'text'
+        self.text = text
+
+
+class _Usage:
+    def __init__(self, input_tokens, output_tokens):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class _Message:
+    def __init__(self, text, input_tokens, output_tokens, stop_reason):
+        self.content = [_TextBlock(text)]
+        self.usage = _Usage(input_tokens, output_tokens)
+        self.stop_reason = stop_reason
+
+
+def _wait(seconds, timeout):
+    """Sleep for a simulated delay, raising TimeoutError if it exceeds timeout."""
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise TimeoutError(f"Fake model did not respond within {timeout:.2f}s")
+    time.sleep(seconds)
+
+
+class _MessageStream:
+    def __init__(self, chunks, first_token_latency, chunk_delay, final_message, timeout):
+        self._chunks = chunks
+        self._first_token_latency = first_token_latency
+        self._chunk_delay = chunk_delay
+        self._final_message = final_message
+        self._timeout = timeout
+
+    @property
+    def text_stream(self):
+        _wait(self._first_token_latency, self._timeout)
+        for chunk in self._chunks:
+            time.sleep(self._chunk_delay)
+            yield chunk
+
+    def get_final_message(self):
+        return self._final_message
+
+
+class _Messages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, timeout=None, **kwargs):
+        text, message, latency = self._client._respond(kwargs)
+        _wait(latency + self._client.seconds_per_token * message.usage.output_tokens, timeout)
+        return message
+
+    @contextmanager
+    def stream(self, timeout=None, **kwargs):
+        text, message, latency = self._client._respond(kwargs)
+        size = self._client.chunk_chars
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        chunk_delay = self._client.seconds_per_token * size / self._client.chars_per_token
+        yield _MessageStream(chunks, latency, chunk_delay, message, timeout)
+
+
+class FakeModelClient:
+    """Offline stand-in for ``anthropic.Anthropic`` used by benchmarks and local runs.
+
+    It answers flashcard prompts with a JSON array of the requested number of
+    cards, simulating first-token latency, per-token generation time and the
+    ``max_tokens`` cut-off, through both ``messages.create`` and
+    ``messages.stream``.
+
+    Upstream trouble can be injected for testing the resilient client: a
+    fraction of calls fail with a 429 (``rate_limit_rate``) or a 529
+    overloaded error (``error_rate``), and a fraction respond only after
+    ``slow_latency`` seconds (``slow_rate``). A ``timeout`` argument is
+    honoured by raising TimeoutError.
+    """
+
+    chars_per_token = 4
+
+    def __init__(self, first_token_latency=0.3, seconds_per_token=0.002, chunk_chars=16,
+                 rate_limit_rate=0.0, error_rate=0.0, slow_rate=0.0, slow_latency=5.0, seed=None):
+        self.first_token_latency = first_token_latency
+        self.seconds_per_token = seconds_per_token
+        self.chunk_chars = chunk_chars
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self.messages = _Messages(self)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, kwargs):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise FakeAPIError(429, "Fake rate limit exceeded", retry_after=0.05)
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            raise FakeAPIError(529, "Fake model overloaded")
+        roll -= self.error_rate
+        latency = self.slow_latency if roll < self.slow_rate else self.first_token_latency
+
+        prompt = kwargs['messages'][-1]['content']
+        outline = re.search(r'List (\d+) distinct subtopics of (.+?)(?: for |\. )', prompt)
+        if outline:
+            subtopics = [f"{outline.group(2)} subtopic {i + 1}" for i in range(int(outline.group(1)))]
+            text = json.dumps(subtopics)
+            message = _Message(text, len(prompt) // self.chars_per_token, len(text) // self.chars_per_token, 'end_turn')
+            return text, message, latency
+
+        match = re.search(r'(?:Create|Rewrite) (\d+) (?:high-quality )?flashcards about (.+?)(?: focusing on|\. )', prompt)
+        count = int(match.group(1)) if match else 10
+        topic = match.group(2) if match else 'the topic'
+        # A distinct made-up term per card, so cards are not near duplicates of each other
+        terms = [hashlib.sha1(f"{calls}.{i}".encode()).hexdigest()[:16] for i in range(count)]
+        cards = [
+            {"front": f"{topic} question {calls}.{i + 1}: what is {term}?",
+             "back": f"{term} is answer {i + 1} about {topic}."}
+            for i, term in enumerate(terms)
+        ]
+        if match and prompt.startswith('Rewrite'):
+            # Rewrites echo the number of the card they replace
+            cards = [{"index": i + 1, **card} for i, card in enumerate(cards)]
+        text = json.dumps(cards, indent=2)
+
+        max_chars = kwargs.get('max_tokens', 4000) * self.chars_per_token
+        stop_reason = 'end_turn'
+        if len(text) > max_chars:
+            text = text[:max_chars]
+            stop_reason = 'max_tokens'
+        message = _Message(text, len(prompt) // self.chars_per_token,
+                           len(text) // self.chars_per_token, stop_reason)
+        return text, message, latency
@@ -1,22 +1,102 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
 import uuid
-import os
 import json
-from dotenv import load_dotenv
-import anthropic
-from python_ai_service.db.database import get_db_connection
-from psycopg2 import sql
+import time
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from python_ai_service.db.database import db_connection, DatabaseUnavailable
+from python_ai_service.db.bulk import create_set_with_cards, insert_flashcards
+from python_ai_service.db.versions import bump_library_version, bump_set_version
+from python_ai_service.services.card_parser import IncrementalCardParser, parse_cards
+from python_ai_service.services.dedup import Deduplicator, dedupe_cards
+from python_ai_service.services.job_queue import JobQueue
+from python_ai_service.services.generation_cache import (
+    get_generation_cache, get_regeneration_cache, make_cache_key, make_card_key
+)
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import LLM_CARDS_PARSED, record_llm_usage, register_stats
+from python_ai_service.services.llm_client import get_model_client
 
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("ANTHROPIC_API_KEY")
+logger = logging.getLogger(__name__)
 
-# Check if API key is available
-if not api_key:
-    raise ValueError("Anthropic API key is missing. Please set ANTHROPIC_API_KEY in your .env file.")
+MODEL_NAME = "claude-3-haiku-20240307"
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=api_key)
+# Bump whenever the prompt changes so cached sets from older prompts are not reused
+PROMPT_VERSION = "2"
+# Same for the card rewrite prompt; it shared PROMPT_VERSION up to "2"
+REGENERATE_PROMPT_VERSION = "3"
+
+def _resolve_card_count(intensity_level: str, custom_count: Optional[int]) -> Tuple[int, str, str]:
+    """Return (num_cards, depth_description, intensity_level) for a request."""
+    if custom_count and custom_count > 0:
+        num_cards = custom_count
+        depth_description = "Custom number of cards. Provide a mix of definitions, concepts, and true/false questions."
+    else:
+        intensity_level = intensity_level.lower()
+        if "casual" in intensity_level:
+            num_cards = 50
+            depth_description = "Keep definitions concise and explanations brief."
+        elif "personal" in intensity_level:
+            num_cards = 80
+            depth_description = "Focus on key concepts and their applications."
+        else:  # comprehensive test prep
+            num_cards = 120
+            depth_description = "Provide in-depth explanations with examples and applications."
+    return num_cards, depth_description, intensity_level
+
+def _build_prompt(num_cards: int, topic: str, test_name: Optional[str], depth_description: str,
+                  part: Optional[Tuple[int, int]] = None, subtopic: Optional[str] = None) -> str:
+    """Build the card generation prompt, optionally for one part (or one subtopic) of a larger set."""
+    test_context = f" focusing on {test_name}" if test_name else ""
+    part_context = ""
+    if part and subtopic:
+        part_context = (f"\n\nThis is part {part[0]} of {part[1]} of a larger set generated in parallel. "
+                        f"Cover only this subtopic: {subtopic}. Other parts cover the other subtopics.")
+    elif part:
+        part_context = (f"\n\nThis is part {part[0]} of {part[1]} of a larger set generated in parallel. "
+                        f"Cover aspects of the topic that a different part would be unlikely to cover.")
+
+    # Create a more structured prompt for better JSON output
+    return f"""Create {num_cards} high-quality flashcards about {topic}{test_context}. {depth_description}{part_context}
+
+IMPORTANT: Return ONLY a valid JSON array of objects. Each object should have exactly two fields:
+- "front": The question or concept (string)
+- "back": The answer or explanation (string)
+
+Example format:
+[
+  {{"front": "What is the capital of France?", "back": "Paris"}},
+  {{"front": "Define photosynthesis", "back": "The process by which plants convert sunlight into energy"}}
+]
+
+Make sure the response is valid JSON that can be parsed directly. Do not include any text before or after the JSON array."""
+
+def _fallback_flashcards(topic: str, test_name: Optional[str], num_cards: int) -> List[Dict]:
+    """Template-based cards used when the model call or parsing fails.
+
+    There are only a dozen templates; they are not repeated to reach
+    ``num_cards``, since a set padded with copies is worse than a short one.
+    """
+    flashcards = [
+        {"front": f"What is {topic}?", "back": f"{topic} is a subject area that involves studying and understanding various concepts and principles."},
+        {"front": f"Define {topic}", "back": f"The study or practice of {topic} encompasses learning about its fundamental concepts and applications."},
+        {"front": f"True or False: {topic} is an important field of study", "back": "True"},
+        {"front": f"What are the main components of {topic}?", "back": f"The main components of {topic} include core concepts, principles, and practical applications."},
+        {"front": f"How is {topic} used in practice?", "back": f"{topic} is used in various real-world applications and helps solve practical problems."},
+        {"front": f"What are the key principles of {topic}?", "back": f"The key principles of {topic} include understanding fundamental concepts, applying knowledge, and continuous learning."},
+        {"front": f"True or False: {topic} requires memorization only", "back": "False - understanding and application are also important."},
+        {"front": f"What skills are developed through studying {topic}?", "back": f"Studying {topic} develops critical thinking, problem-solving, and analytical skills."},
+        {"front": f"How does {topic} relate to other subjects?", "back": f"{topic} often connects with other fields and can be applied across different disciplines."},
+        {"front": f"What are common misconceptions about {topic}?", "back": f"Common misconceptions include thinking it's too difficult or not practical, when it's actually accessible and useful."}
+    ]
+    if test_name:
+        flashcards.extend([
+            {"front": f"How does {topic} relate to {test_name}?", "back": f"{topic} provides the foundational knowledge needed for {test_name}."},
+            {"front": f"What {topic} concepts are most important for {test_name}?", "back": f"Key {topic} concepts for {test_name} include fundamental principles and core applications."}
+        ])
+    return flashcards[:num_cards]
 
 def generate_study_materials(
         topic: str,
@@ -27,161 +107,515 @@ def generate_study_materials(
 ) -> List[Dict]:
     """Generate flashcards using Claude 3 Haiku API."""
     try:
-        # Determine number of cards based on intensity level or custom count
-        if custom_count and custom_count > 0:
-            num_cards = custom_count
-            depth_description = "Custom number of cards. Provide a mix of definitions, concepts, and true/false questions."
+        return create_study_set(topic, test_name, intensity_level, custom_count, user_id)["flashcards"]
+    except Exception as error:
+        logger.exception("Error in generate_study_materials: %s", error)
+        return [{"front": "Error", "back": f"Failed to generate flashcards: {str(error)}"}]
+
+def _request_flashcards(prompt: str, max_tokens: int = 4000, model_client=None,
+                        fields: Iterable[str] = ()) -> List[Dict]:
+    """Ask the model for cards, returning [] if the call fails.
+
+    Every complete card is kept even when the response was cut off by
+    max_tokens or wrapped in prose; see card_parser.parse_cards, which also
+    keeps any of ``fields`` the prompt asked the model to include.
+    """
+    # Raises (rather than falling back) when no model is configured
+    client = model_client or get_model_client()
+    # Generate flashcards using Claude 3 Haiku
+    started = time.perf_counter()
+    try:
+        response = client.messages.create(
+            model=MODEL_NAME,
+            max_tokens=max_tokens,
+            temperature=0.3,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        )
+
+        generated_content = response.content[0].text
+        logger.info("Model returned %d characters", len(generated_content), extra={
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "input_tokens": response.usage.input_tokens,
+            "output_tokens": response.usage.output_tokens,
+            "stop_reason": response.stop_reason,
+        })
+        logger.debug("Generated content preview: %s...", generated_content[:500])
+
+        # Salvage what we can when the response is truncated or wrapped in prose
+        parsed = parse_cards(generated_content, fields)
+        flashcards = parsed["cards"]
+        LLM_CARDS_PARSED.inc(len(flashcards), outcome="recovered" if parsed["recovered"] else "clean")
+        if parsed["recovered"]:
+            logger.warning("Model response was not a clean JSON array; recovered %d cards", len(flashcards), extra={
+                "rejected": parsed["rejected"],
+                "truncated": parsed["truncated"],
+                "stop_reason": response.stop_reason,
+            })
+            if not flashcards:
+                logger.debug("Raw response: %s", generated_content)
         else:
-            intensity_level = intensity_level.lower()
-            if "casual" in intensity_level:
-                num_cards = 50
-                depth_description = "Keep definitions concise and explanations brief."
-            elif "personal" in intensity_level:
-                num_cards = 80
-                depth_description = "Focus on key concepts and their applications."
-            else:  # comprehensive test prep
-                num_cards = 120
-                depth_description = "Provide in-depth explanations with examples and applications."
-
-        test_context = f" focusing on {test_name}" if test_name else ""
-        
-        # Create a more structured prompt for better JSON output
-        prompt = f"""Create {num_cards} high-quality flashcards about {topic}{test_context}. {depth_description}
+            logger.debug("Successfully parsed %d flashcards from JSON", len(flashcards))
 
-IMPORTANT: Return ONLY a valid JSON array of objects. Each object should have exactly two fields:
+    except Exception as e:
+        logger.error("Error calling Claude API: %s", e)
+        flashcards = []
+    return flashcards
+
+def create_study_set(
+        topic: str,
+        test_name: Optional[str] = None,
+        intensity_level: str = "general learning",
+        custom_count: Optional[int] = None,
+        user_id: Optional[int] = None,
+        use_cache: bool = True,
+        refresh_cache: bool = False
+) -> Dict:
+    """Generate and store a set, returning its set_id (None if not stored) and cards.
+
+    Identical requests are served from the generation cache unless
+    ``use_cache`` is False; ``refresh_cache`` regenerates and overwrites the
+    cached entry.
+    """
+    requested_intensity = intensity_level
+    # Determine number of cards based on intensity level or custom count
+    num_cards, depth_description, intensity_level = _resolve_card_count(intensity_level, custom_count)
+    settings = get_settings()
+    logger.info("Generating %d flashcards for topic: %s", num_cards, topic)
+
+    # Reuse cards generated for an identical request when possible
+    cache = get_generation_cache() if use_cache else None
+    cache_key = make_cache_key(topic, test_name, requested_intensity, custom_count, PROMPT_VERSION)
+    flashcards = cache.get(cache_key) if cache and not refresh_cache else None
+    cached = flashcards is not None
+    if cached:
+        logger.info("Generation cache hit for topic: %s", topic)
+    elif num_cards > settings.generation_batch_size:
+        # Too many cards for one response; plan subtopics and generate them as concurrent shards
+        flashcards = generate_sharded(topic, test_name, depth_description, num_cards)["flashcards"]
+    else:
+        prompt = _build_prompt(num_cards, topic, test_name, depth_description)
+        logger.debug("Using prompt: %s...", prompt[:200])
+        flashcards = _request_flashcards(prompt)
+
+    # If API call failed or parsing failed, create template-based flashcards
+    if not flashcards:
+        logger.warning("Falling back to template-based flashcards", extra={"topic": topic})
+        flashcards = _fallback_flashcards(topic, test_name, num_cards)
+
+    # Models often repeat themselves across a long set
+    flashcards, removed = dedupe_cards(flashcards)
+    duplicates_removed = removed['exact'] + removed['near']
+    if duplicates_removed:
+        logger.info("Removed %d duplicate and %d near-duplicate flashcards", removed['exact'], removed['near'])
+    if cache and not cached and flashcards:
+        cache.set(cache_key, flashcards)
+
+    # Store flashcards in database
+    set_id = None
+    try:
+        new_set_id = str(uuid.uuid4())
+        with db_connection() as conn:
+            # Insert the set with user_id and all of its flashcards in one transaction
+            set_pk = create_set_with_cards(conn, new_set_id, topic, intensity_level,
+                                           f"{topic} Study Set", user_id, flashcards)
+        set_id = new_set_id
+        logger.debug("Stored set %s with all %d flashcards", set_pk, len(flashcards))
+    except DatabaseUnavailable as e:
+        logger.error("Failed to get database connection: %s", e)
+    except Exception as e:
+        logger.exception("Database error storing generated set: %s", e)
+
+    return {"set_id": set_id, "card_count": len(flashcards), "cached": cached,
+            "duplicates_removed": duplicates_removed, "flashcards": flashcards}
+
+def _split_batches(num_cards: int, batch_size: int) -> List[int]:
+    """Split a card count into batch sizes, e.g. 50 by 20 -> [20, 20, 10]."""
+    batch_size = max(1, batch_size)
+    full, rest = divmod(num_cards, batch_size)
+    return [batch_size] * full + ([rest] if rest else [])
+
+def _max_tokens_for(count: int) -> int:
+    # Roughly 80 output tokens per card plus array overhead, within the model limit.
+    return min(4000, 200 + 80 * count)
+
+def _plan_shards(num_cards: int, shard_size: int, token_budget: int) -> List[int]:
+    """Split a card count into shards whose combined max_tokens, with the outline's, fit the budget.
+
+    Shards that would not fit are dropped, so an over-budget request
+    produces a smaller set rather than failing.
+    """
+    shards = _split_batches(num_cards, shard_size)
+    remaining = token_budget - _outline_max_tokens(len(shards))
+    planned = []
+    for count in shards:
+        if _max_tokens_for(count) > remaining:
+            break
+        remaining -= _max_tokens_for(count)
+        planned.append(count)
+    return planned
+
+def _outline_max_tokens(count: int) -> int:
+    # A subtopic name is a handful of words
+    return min(4000, 100 + 25 * count)
+
+def _build_outline_prompt(count: int, topic: str, test_name: Optional[str]) -> str:
+    test_context = f" for {test_name}" if test_name else ""
+    return f"""List {count} distinct subtopics of {topic}{test_context}. Together they should cover the whole topic, with as little overlap between them as possible.
+
+IMPORTANT: Return ONLY a valid JSON array of {count} short strings, for example ["Cell structure", "Photosynthesis"]. Do not include any text before or after the JSON array."""
+
+def _request_outline(count: int, topic: str, test_name: Optional[str], model_client) -> List[str]:
+    """Ask the model for ``count`` subtopics, returning [] if the call or parsing fails."""
+    try:
+        response = model_client.messages.create(
+            model=MODEL_NAME,
+            max_tokens=_outline_max_tokens(count),
+            temperature=0.3,
+            messages=[{"role": "user", "content": _build_outline_prompt(count, topic, test_name)}]
+        )
+        outline = json.loads(response.content[0].text)
+        if not isinstance(outline, list):
+            raise ValueError("Response is not a list")
+        return [item.strip() for item in outline if isinstance(item, str) and item.strip()][:count]
+    except Exception as e:
+        logger.warning("Could not get a subtopic outline for %s: %s", topic, e)
+        return []
+
+def generate_sharded(
+        topic: str,
+        test_name: Optional[str],
+        depth_description: str,
+        num_cards: int,
+        model_client=None,
+        shard_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        token_budget: Optional[int] = None
+) -> Dict:
+    """Generate a large set as a map over subtopics.
+
+    The model first outlines the topic into one subtopic per shard of at
+    most ``shard_size`` cards; the shards are then generated concurrently,
+    ``max_concurrency`` at a time, and their cards merged in outline order.
+    Shard prompts without a subtopic (a failed or short outline) fall back
+    to "part i of n" hints. The outline and shards together are planned to
+    stay within ``token_budget`` output tokens. Duplicates across shards are
+    left to the caller to remove.
+
+    Defaults come from GENERATION_BATCH_SIZE, GENERATION_MAX_CONCURRENCY and
+    GENERATION_TOKEN_BUDGET.
+    """
+    settings = get_settings()
+    shard_size = shard_size or settings.generation_batch_size
+    max_concurrency = max_concurrency or settings.generation_max_concurrency
+    token_budget = token_budget or settings.generation_token_budget
+    model_client = model_client or get_model_client()
+    started = time.perf_counter()
+
+    shards = _plan_shards(num_cards, shard_size, token_budget)
+    if sum(shards) < num_cards:
+        logger.warning("Token budget allows %d of %d requested cards", sum(shards), num_cards,
+                       extra={"topic": topic, "token_budget": token_budget})
+    if not shards:
+        return {"flashcards": [], "shards": 0, "subtopics": [], "failed_shards": 0}
+
+    subtopics = _request_outline(len(shards), topic, test_name, model_client)
+    outlined_at = time.perf_counter()
+
+    def run_shard(index: int) -> List[Dict]:
+        subtopic = subtopics[index] if index < len(subtopics) else None
+        prompt = _build_prompt(shards[index], topic, test_name, depth_description,
+                               part=(index + 1, len(shards)), subtopic=subtopic)
+        return _request_flashcards(prompt, _max_tokens_for(shards[index]), model_client)[:shards[index]]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(shards)))) as executor:
+        results = list(executor.map(run_shard, range(len(shards))))
+
+    flashcards = [card for cards in results for card in cards]
+    failed = sum(1 for cards in results if not cards)
+    logger.info("Generated %d cards in %d shards", len(flashcards), len(shards), extra={
+        "topic": topic,
+        "subtopics": len(subtopics),
+        "failed_shards": failed,
+        "outline_ms": round((outlined_at - started) * 1000, 1),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return {"flashcards": flashcards, "shards": len(shards), "subtopics": subtopics, "failed_shards": failed}
+
+DEFAULT_REGENERATE_INSTRUCTION = "Make the question clearer and the answer accurate, complete and concise."
+
+def _build_regeneration_prompt(cards: List[Dict], topic: str, instruction: str) -> str:
+    numbered = json.dumps([{"index": number, "front": card["front"], "back": card["back"]}
+                           for number, card in enumerate(cards, 1)], indent=2, ensure_ascii=False)
+    return f"""Rewrite {len(cards)} flashcards about {topic}. Instruction: {instruction}
+
+Here are the current cards:
+{numbered}
+
+IMPORTANT: Return ONLY a valid JSON array with exactly {len(cards)} objects, one rewritten card per card above. Each object should have exactly three fields:
+- "index": The index of the card above that it rewrites (integer)
 - "front": The question or concept (string)
 - "back": The answer or explanation (string)
 
-Example format:
-[
-  {{"front": "What is the capital of France?", "back": "Paris"}},
-  {{"front": "Define photosynthesis", "back": "The process by which plants convert sunlight into energy"}}
-]
+Do not include any text before or after the JSON array."""
 
-Make sure the response is valid JSON that can be parsed directly. Do not include any text before or after the JSON array."""
+def regenerate_cards(
+        topic: str,
+        cards: List[Dict],
+        instruction: Optional[str] = None,
+        model_client=None,
+        use_cache: bool = True
+) -> Dict:
+    """Rewrite a few cards of a set in one model call.
 
-        print(f"Generating {num_cards} flashcards for topic: {topic}")
-        print(f"Using prompt: {prompt[:200]}...")
-
-        # Generate flashcards using Claude 3 Haiku
-        try:
-            response = client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=4000,
-                temperature=0.3,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+    Each rewrite is memoized under the card's text and the instruction, so
+    asking again for a card that was already rewritten the same way costs
+    nothing; only the remaining cards go to the model, batched into a
+    single request. Returns ``{"cards": [...], "cached": n, "generated": n}``
+    where ``cards`` lines up with the input and holds None for any card the
+    model did not return (e.g. a truncated response).
+
+    The prompt numbers the cards and each rewrite must echo its card's
+    ``index``; rewrites are matched on it rather than on position, since a
+    rejected object would shift every later one onto the wrong card. A
+    rewrite with a missing, unknown or repeated index is dropped.
+    """
+    instruction = (instruction or '').strip() or DEFAULT_REGENERATE_INSTRUCTION
+    cache = get_regeneration_cache() if use_cache else None
+    keys = [make_card_key(card["front"], card["back"], instruction, REGENERATE_PROMPT_VERSION) for card in cards]
+    results = []
+    for key in keys:
+        cached = cache.get(key) if cache else None
+        results.append(cached[0] if cached else None)
+    cached_count = sum(1 for card in results if card is not None)
+
+    misses = [index for index, card in enumerate(results) if card is None]
+    generated = []
+    if misses:
+        started = time.perf_counter()
+        prompt = _build_regeneration_prompt([cards[index] for index in misses], topic, instruction)
+        rewrites = _request_flashcards(prompt, _max_tokens_for(len(misses)), model_client, fields=('index',))
+        matched = {}
+        for rewrite in rewrites:
+            number = rewrite.pop('index', None)
+            # bool is an int too, but never a card number
+            if type(number) is int and 1 <= number <= len(misses) and number not in matched:
+                matched[number] = rewrite
+        for number, card in matched.items():
+            index = misses[number - 1]
+            results[index] = card
+            if cache:
+                cache.set(keys[index], [card])
+        generated = list(matched.values())
+        logger.info("Regenerated %d of %d cards", len(generated), len(misses), extra={
+            "unmatched": len(rewrites) - len(generated),
+            "topic": topic,
+            "cached": cached_count,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return {"cards": results, "cached": cached_count, "generated": len(generated)}
+
+def _insert_set_row(set_id: str, topic: str, intensity_level: str, user_id: Optional[int]) -> None:
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+                VALUES (%s, %s, %s, 0, %s, %s)
+                """,
+                (set_id, topic, intensity_level, f"{topic} Study Set", user_id)
             )
-            
-            generated_content = response.content[0].text
-            print(f"Generated content length: {len(generated_content)}")
-            print(f"Generated content preview: {generated_content[:500]}...")
-            
-            # Parse the JSON response
-            try:
-                flashcards = json.loads(generated_content)
-                if not isinstance(flashcards, list):
-                    raise ValueError("Response is not a list")
-                    
-                # Validate each flashcard has the required fields
-                validated_flashcards = []
-                for card in flashcards:
-                    if isinstance(card, dict) and 'front' in card and 'back' in card:
-                        validated_flashcards.append({
-                            'front': str(card['front']),
-                            'back': str(card['back'])
-                        })
-                
-                flashcards = validated_flashcards
-                print(f"Successfully parsed {len(flashcards)} flashcards from JSON")
-                
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")
-                print(f"Raw response: {generated_content}")
-                flashcards = []
-                
-        except Exception as e:
-            print(f"Error calling Claude API: {e}")
-            flashcards = []
-
-        # If API call failed or parsing failed, create template-based flashcards
-        if not flashcards:
-            print("Falling back to template-based flashcards")
-            flashcards = [
-                {"front": f"What is {topic}?", "back": f"{topic} is a subject area that involves studying and understanding various concepts and principles."},
-                {"front": f"Define {topic}", "back": f"The study or practice of {topic} encompasses learning about its fundamental concepts and applications."},
-                {"front": f"True or False: {topic} is an important field of study", "back": "True"},
-                {"front": f"What are the main components of {topic}?", "back": f"The main components of {topic} include core concepts, principles, and practical applications."},
-                {"front": f"How is {topic} used in practice?", "back": f"{topic} is used in various real-world applications and helps solve practical problems."},
-            ]
-            while len(flashcards) < num_cards:
-                flashcards.extend([
-                    {"front": f"What are the key principles of {topic}?", "back": f"The key principles of {topic} include understanding fundamental concepts, applying knowledge, and continuous learning."},
-                    {"front": f"True or False: {topic} requires memorization only", "back": "False - understanding and application are also important."},
-                    {"front": f"What skills are developed through studying {topic}?", "back": f"Studying {topic} develops critical thinking, problem-solving, and analytical skills."},
-                    {"front": f"How does {topic} relate to other subjects?", "back": f"{topic} often connects with other fields and can be applied across different disciplines."},
-                    {"front": f"What are common misconceptions about {topic}?", "back": f"Common misconceptions include thinking it's too difficult or not practical, when it's actually accessible and useful."}
-                ])
-            if test_name:
-                flashcards.extend([
-                    {"front": f"How does {topic} relate to {test_name}?", "back": f"{topic} provides the foundational knowledge needed for {test_name}."},
-                    {"front": f"What {topic} concepts are most important for {test_name}?", "back": f"Key {topic} concepts for {test_name} include fundamental principles and core applications."}
-                ])
-            flashcards = flashcards[:num_cards]
-
-        # Store flashcards in database
-        print(f"Attempting to store {len(flashcards)} flashcards in database...")
-        conn = get_db_connection()
-        if conn:
-            try:
-                cur = conn.cursor()
-                set_id = str(uuid.uuid4())
-                print(f"Generated set_id: {set_id}")
-                
-                # Insert the set with user_id
-                cur.execute(
-                    sql.SQL("""
-                        INSERT INTO sets 
-                        (set_id, topic, intensity_level, card_count, name, user_id)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        RETURNING id
-                    """),
-                    (set_id, topic, intensity_level, len(flashcards), f"{topic} Study Set", user_id)
+            bump_library_version(cur, user_id)
+        conn.commit()
+
+def _insert_batch(set_id: str, cards: List[Dict]) -> None:
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            insert_flashcards(cur, set_id, cards)
+            cur.execute(
+                "UPDATE sets SET card_count = card_count + %s WHERE set_id = %s",
+                (len(cards), set_id)
+            )
+            bump_set_version(cur, set_id)
+        conn.commit()
+
+def _stream_batch(model_client, batch_index: int, count: int, prompt: str, events: queue.Queue,
+                  stop: threading.Event, set_id: Optional[str], dedup: Deduplicator) -> None:
+    """Worker: stream one batch from the model, emitting cards as they parse.
+
+    Cards that duplicate one already produced by any batch are dropped.
+    """
+    parser = IncrementalCardParser()
+    cards = []
+    try:
+        with model_client.messages.stream(
+            model=MODEL_NAME,
+            max_tokens=_max_tokens_for(count),
+            temperature=0.3,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for text in stream.text_stream:
+                if stop.is_set():
+                    return
+                for card in parser.feed(text):
+                    if len(cards) >= count:
+                        break
+                    if not dedup.add(card):
+                        continue
+                    cards.append(card)
+                    events.put({"type": "card", "batch": batch_index, "card": card})
+            # The stream has been read to the end, so this does not block
+            record_llm_usage(stream.get_final_message().usage)
+
+        if set_id and cards:
+            _insert_batch(set_id, cards)
+        events.put({"type": "batch_saved", "batch": batch_index, "count": len(cards),
+                    "persisted": bool(set_id)})
+    except Exception as e:
+        logger.error("Error generating batch %d: %s", batch_index, e)
+        events.put({"type": "batch_failed", "batch": batch_index, "count": len(cards), "error": str(e)})
+    finally:
+        events.put({"type": "_batch_done", "batch": batch_index, "cards": cards})
+
+def stream_study_materials(
+        topic: str,
+        test_name: Optional[str] = None,
+        intensity_level: str = "general learning",
+        custom_count: Optional[int] = None,
+        user_id: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        model_client=None,
+        persist: bool = True,
+        use_cache: bool = True,
+        refresh_cache: bool = False
+) -> Iterator[Dict]:
+    """Generate a set in concurrent batches, yielding progress events as cards arrive.
+
+    Events are dicts with a ``type`` of ``set``, ``card``, ``batch_saved``,
+    ``batch_failed`` or ``done``. The batches are planned within
+    GENERATION_TOKEN_BUDGET, so ``set``'s ``target_count`` may be smaller
+    than the ``requested_count``. Each batch's cards are inserted as soon as
+    that batch finishes streaming, so the set fills in while later batches
+    are still being generated. A generation cache hit is stored and streamed
+    in one go without calling the model. Cards that duplicate an earlier one
+    are dropped and counted in the ``done`` event's ``duplicates_removed``.
+    """
+    settings = get_settings()
+    # Batch size and concurrency default to GENERATION_BATCH_SIZE and GENERATION_MAX_CONCURRENCY
+    batch_size = batch_size or settings.generation_batch_size
+    max_concurrency = max_concurrency or settings.generation_max_concurrency
+    started = time.perf_counter()
+    cache = get_generation_cache() if use_cache else None
+    cache_key = make_cache_key(topic, test_name, intensity_level, custom_count, PROMPT_VERSION)
+    requested, depth_description, intensity_level = _resolve_card_count(intensity_level, custom_count)
+    # Batches share GENERATION_TOKEN_BUDGET like generate_sharded's shards; the rest of the request is dropped
+    batches = _plan_shards(requested, batch_size, settings.generation_token_budget)
+    num_cards = sum(batches)
+    if num_cards < requested:
+        logger.warning("Token budget allows %d of %d requested cards", num_cards, requested,
+                       extra={"topic": topic, "token_budget": settings.generation_token_budget})
+
+    cached_cards = cache.get(cache_key) if cache and not refresh_cache else None
+    set_id = str(uuid.uuid4()) if persist else None
+    if cached_cards is not None:
+        cached_cards, removed = dedupe_cards(cached_cards)
+        if persist:
+            with db_connection() as conn:
+                create_set_with_cards(conn, set_id, topic, intensity_level,
+                                      f"{topic} Study Set", user_id, cached_cards)
+        yield {"type": "set", "set_id": set_id, "target_count": len(cached_cards), "batches": 0, "cached": True}
+        for card in cached_cards:
+            yield {"type": "card", "batch": None, "card": card}
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield {"type": "done", "set_id": set_id, "card_count": len(cached_cards), "cached": True,
+               "duplicates_removed": removed['exact'] + removed['near'],
+               "time_to_first_card_ms": elapsed_ms, "elapsed_ms": elapsed_ms}
+        return
+
+    model_client = model_client or get_model_client()
+    if persist:
+        _insert_set_row(set_id, topic, intensity_level, user_id)
+    yield {"type": "set", "set_id": set_id, "target_count": num_cards, "requested_count": requested,
+           "batches": len(batches), "cached": False}
+
+    events = queue.Queue()
+    stop = threading.Event()
+    dedup = Deduplicator()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches))))
+    first_card_at = None
+    batch_cards = {}
+    total = 0
+    try:
+        for index, count in enumerate(batches):
+            prompt = _build_prompt(count, topic, test_name, depth_description,
+                                   part=(index + 1, len(batches)) if len(batches) > 1 else None)
+            executor.submit(_stream_batch, model_client, index, count, prompt, events, stop, set_id, dedup)
+
+        remaining = len(batches)
+        while remaining:
+            event = events.get()
+            if event["type"] == "_batch_done":
+                remaining -= 1
+                batch_cards[event["batch"]] = event["cards"]
+                total += len(event["cards"])
+                continue
+            if event["type"] == "card" and first_card_at is None:
+                first_card_at = time.perf_counter()
+            yield event
+
+        if total == 0:
+            logger.warning("Falling back to template-based flashcards", extra={"topic": topic})
+            cards = [card for card in _fallback_flashcards(topic, test_name, num_cards) if dedup.add(card)]
+            if persist:
+                _insert_batch(set_id, cards)
+            for card in cards:
+                if first_card_at is None:
+                    first_card_at = time.perf_counter()
+                yield {"type": "card", "batch": None, "card": card}
+            total = len(cards)
+        elif cache:
+            cache.set(cache_key, [card for index in sorted(batch_cards) for card in batch_cards[index]])
+
+        yield {
+            "type": "done",
+            "set_id": set_id,
+            "card_count": total,
+            "cached": False,
+            "duplicates_removed": dedup.removed,
+            "time_to_first_card_ms": round((first_card_at - started) * 1000, 1) if first_card_at else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    finally:
+        # Also reached when the client disconnects and the generator is closed early.
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+_generation_queue = None
+_generation_queue_lock = threading.Lock()
+
+def get_generation_queue() -> JobQueue:
+    """Return the process-wide generation job queue, creating it on first use.
+
+    Configured with GENERATION_WORKERS, GENERATION_MAX_QUEUE and
+    GENERATION_MAX_JOBS_PER_USER.
+    """
+    global _generation_queue
+    if _generation_queue is None:
+        with _generation_queue_lock:
+            if _generation_queue is None:
+                settings = get_settings()
+                _generation_queue = JobQueue(
+                    create_study_set,
+                    workers=settings.generation_workers,
+                    max_queue=settings.generation_max_queue,
+                    max_per_user=settings.generation_max_jobs_per_user,
+                    name="generation"
                 )
-                set_record = cur.fetchone()
-                print(f"Inserted set with id: {set_record[0] if set_record else 'None'}")
-                conn.commit()
-                
-                # Insert flashcards
-                for i, card in enumerate(flashcards):
-                    cur.execute(
-                        sql.SQL("""
-                            INSERT INTO flashcards 
-                            (set_id, front_text, back_text, star_status)
-                            VALUES (%s, %s, %s, false)
-                        """),
-                        (set_id, card['front'], card['back'])
-                    )
-                    if i % 10 == 0:  # Log every 10th card
-                        print(f"Inserted flashcard {i+1}/{len(flashcards)}")
-                
-                conn.commit()
-                print(f"Successfully stored all {len(flashcards)} flashcards")
-            except Exception as e:
-                print(f"Database error: {e}")
-                conn.rollback()
-            finally:
-                cur.close()
-                conn.close()
-        else:
-            print("Failed to get database connection")
-        
-        print(f"Returning {len(flashcards)} flashcards")
-        return flashcards
-    except Exception as error:
-        print(f"Error in generate_study_materials: {error}")
-        return [{"front": "Error", "back": f"Failed to generate flashcards: {str(error)}"}] 
\ No newline at end of file
+    return _generation_queue
+
+register_stats('generation_queue', lambda: _generation_queue.stats() if _generation_queue is not None else None)
@@ -0,0 +1,289 @@
+import json
+import time
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from psycopg2.extras import Json
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import register_stats
+from python_ai_service.db.database import db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_text(value) -> str:
+    return ' '.join(str(value).lower().split()) if value else ''
+
+
+def make_cache_key(topic: str, test_name: Optional[str], intensity_level: str,
+                   custom_count: Optional[int], prompt_version: str) -> str:
+    """Build a content address for a generation request.
+
+    Topic, test name and intensity are case- and whitespace-normalized so that
+    "AP Biology" and " ap  biology" share an entry.
+    """
+    count = int(custom_count) if custom_count and int(custom_count) > 0 else None
+    payload = json.dumps([
+        _normalize_text(topic),
+        _normalize_text(test_name),
+        # A custom count overrides the intensity level when choosing cards
+        None if count else _normalize_text(intensity_level),
+        count,
+        prompt_version,
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_card_key(front: str, back: str, instruction: Optional[str], prompt_version: str) -> str:
+    """Build a content address for rewriting one card with an instruction.
+
+    Card text is matched exactly; the instruction is normalized like a topic.
+    """
+    payload = json.dumps(['card', front, back, _normalize_text(instruction), prompt_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """Bounded in-process LRU cache with a per-entry time to live."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1000, ttl=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (cards, evicted) where evicted counts entries dropped as expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, 0
+            stored_at, cards = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None, 1
+            self._entries.move_to_end(key)
+            return cards, 0
+
+    def set(self, key, cards):
+        """Store cards, returning the number of entries evicted to make room."""
+        with self._lock:
+            self._entries[key] = (time.time(), cards)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class PostgresCacheBackend:
+    """Cache stored in the generation_cache table, shared by every worker process."""
+
+    name = 'postgres'
+
+    def __init__(self, ttl=7 * 24 * 3600):
+        self.ttl = ttl
+
+    def get(self, key):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT cards, EXTRACT(EPOCH FROM (NOW() - created_at)) FROM generation_cache WHERE cache_key = %s",
+                    (key,)
+                )
+                row = cur.fetchone()
+                if row is None:
+                    return None, 0
+                cards, age = row
+                if self.ttl and age > self.ttl:
+                    cur.execute("DELETE FROM generation_cache WHERE cache_key = %s", (key,))
+                    conn.commit()
+                    return None, 1
+            return cards, 0
+
+    def set(self, key, cards):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO generation_cache (cache_key, cards, created_at)
+                    VALUES (%s, %s, NOW())
+                    ON CONFLICT (cache_key) DO UPDATE SET cards = EXCLUDED.cards, created_at = NOW()
+                    """,
+                    (key, Json(cards))
+                )
+                evicted = 0
+                if self.ttl:
+                    cur.execute(
+                        "DELETE FROM generation_cache WHERE created_at < NOW() - make_interval(secs => %s)",
+                        (self.ttl,)
+                    )
+                    evicted = cur.rowcount
+            conn.commit()
+        return evicted
+
+    def delete(self, key):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM generation_cache WHERE cache_key = %s", (key,))
+                deleted = cur.rowcount > 0
+            conn.commit()
+        return deleted
+
+    def clear(self):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM generation_cache")
+            conn.commit()
+
+    def size(self):
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM generation_cache")
+            return cur.fetchone()[0]
+
+
+class GenerationCache:
+    """Content-addressed cache of generated card lists with hit/miss counters.
+
+    Backend errors are logged and treated as misses so that a cache outage
+    never fails a generation request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        try:
+            cards, evicted = self.backend.get(key)
+        except Exception as e:
+            logger.warning("Generation cache lookup failed: %s", e)
+            self._count(errors=1, misses=1)
+            return None
+        if cards is None:
+            self._count(misses=1, evictions=evicted)
+        else:
+            self._count(hits=1)
+        return cards
+
+    def set(self, key: str, cards: List[Dict]) -> None:
+        try:
+            evicted = self.backend.set(key, cards)
+        except Exception as e:
+            logger.warning("Generation cache store failed: %s", e)
+            self._count(errors=1)
+            return
+        self._count(stores=1, evictions=evicted)
+
+    def invalidate(self, key: str) -> bool:
+        deleted = self.backend.delete(key)
+        if deleted:
+            self._count(invalidations=1)
+        return deleted
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self._count(invalidations=1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': self.backend.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+                'errors': self.errors,
+            }
+        try:
+            stats['entries'] = self.backend.size()
+        except Exception:
+            stats['entries'] = None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    """Return the process-wide generation cache, or None if disabled.
+
+    GENERATION_CACHE_BACKEND selects ``memory`` (default), ``postgres`` or
+    ``none``; GENERATION_CACHE_TTL and GENERATION_CACHE_MAX_ENTRIES tune it.
+    """
+    global _cache
+    settings = get_settings()
+    if settings.generation_cache_backend == 'none':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = settings.generation_cache_ttl
+                if settings.generation_cache_backend == 'postgres':
+                    backend = PostgresCacheBackend(ttl=ttl)
+                else:
+                    backend = MemoryCacheBackend(max_entries=settings.generation_cache_max_entries, ttl=ttl)
+                _cache = GenerationCache(backend)
+    return _cache
+
+
+_regeneration_cache = None
+
+def get_regeneration_cache() -> Optional[GenerationCache]:
+    """Return the process-wide cache of single-card rewrites, or None if disabled.
+
+    Uses the generation cache's backend and TTL settings, with its own size
+    limit (REGENERATION_CACHE_MAX_ENTRIES) so per-card entries don't evict
+    whole sets. Keys from make_card_key never collide with set keys, so the
+    postgres backend shares the generation_cache table.
+    """
+    global _regeneration_cache
+    settings = get_settings()
+    if settings.generation_cache_backend == 'none':
+        return None
+    if _regeneration_cache is None:
+        with _cache_lock:
+            if _regeneration_cache is None:
+                ttl = settings.generation_cache_ttl
+                if settings.generation_cache_backend == 'postgres':
+                    backend = PostgresCacheBackend(ttl=ttl)
+                else:
+                    backend = MemoryCacheBackend(max_entries=settings.regeneration_cache_max_entries, ttl=ttl)
+                _regeneration_cache = GenerationCache(backend)
+    return _regeneration_cache
+
+register_stats('generation_cache', lambda: _cache.stats() if _cache is not None else None)
+register_stats('regeneration_cache',
+               lambda: _regeneration_cache.stats() if _regeneration_cache is not None else None)
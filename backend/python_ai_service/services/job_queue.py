@@ -0,0 +1,170 @@
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at its maximum depth."""
+
+
+class UserLimitExceeded(Exception):
+    """Raised when a user already has the maximum number of active jobs."""
+
+
+class Job:
+    """A unit of background work and its lifecycle timestamps."""
+
+    def __init__(self, user_id, params):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.params = params
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queue_wait_ms': round((self.started_at - self.created_at) * 1000, 1) if self.started_at else None,
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == 'succeeded':
+            data['result'] = self.result
+        return data
+
+
+class JobQueue:
+    """In-process job queue served by a fixed pool of worker threads.
+
+    Backpressure is applied at submit time: a full queue raises ``QueueFull``
+    and a user with ``max_per_user`` queued or running jobs gets
+    ``UserLimitExceeded``. Finished jobs are kept for ``result_ttl`` seconds
+    so clients can poll for their results.
+    """
+
+    def __init__(self, handler: Callable[..., Dict], workers=4, max_queue=50, max_per_user=2,
+                 result_ttl=3600, name='jobs'):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.result_ttl = result_ttl
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._running = 0
+        self._wait_times = deque(maxlen=1000)
+
+    def _ensure_workers(self):
+        # Threads don't survive fork, so (re)start them in whichever process submits.
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if not job.active and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, user_id, params: Dict) -> Job:
+        """Enqueue a job for ``handler(**params)`` and return it immediately."""
+        with self._lock:
+            self._ensure_workers()
+            self._prune(time.time())
+            active = sum(1 for job in self._jobs.values() if job.user_id == user_id and job.active)
+            if active >= self.max_per_user:
+                self._rejected += 1
+                raise UserLimitExceeded(f"You already have {active} generation jobs in progress")
+            job = Job(user_id, params)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFull("The generation queue is full, please try again shortly")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = 'running'
+                job.started_at = time.time()
+                self._running += 1
+                self._wait_times.append(job.started_at - job.created_at)
+            try:
+                result = self.handler(**job.params)
+                status, error = 'succeeded', None
+            except Exception as e:
+                logger.exception("Job %s failed: %s", job.id, e)
+                result, status, error = None, 'failed', str(e)
+            with self._lock:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                self._running -= 1
+                if status == 'succeeded':
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            self._queue.task_done()
+
+    def stats(self) -> Dict:
+        """Return queue depth, worker utilisation and queue wait time metrics."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'max_per_user': self.max_per_user,
+                'queued': self._queue.qsize(),
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'queue_wait_ms': {
+                    'samples': len(waits),
+                    'avg': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                    'p95': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                    'max': round(waits[-1] * 1000, 1) if waits else 0.0,
+                },
+            }
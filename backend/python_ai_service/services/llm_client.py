@@ -0,0 +1,377 @@
+"""Resilient wrapper around the model client.
+
+``ResilientModelClient`` exposes the same ``messages.create`` and
+``messages.stream`` calls as ``anthropic.Anthropic`` and adds, per process:
+
+* a concurrency limit on in-flight model calls,
+* token buckets on requests per minute and (estimated) tokens per minute,
+* a deadline per call, passed down as the request timeout and respected by
+  every wait, so a slow upstream cannot hold a worker indefinitely,
+* exponential backoff with jitter on rate limits, overload and transient
+  network errors, honouring ``retry-after`` when the API sends one,
+* optional hedging of non-streaming calls: if the first request has not
+  answered after ``hedge_after`` seconds a second identical one is sent and
+  whichever finishes first wins.
+
+The backend is pluggable; ``LLM_BACKEND=fake`` uses FakeModelClient, which
+can also inject rate limits, errors and slow responses for offline testing.
+"""
+import sys
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import LLM_REQUEST_SECONDS, record_llm_usage, register_stats
+from python_ai_service.services.fake_model_client import FakeModelClient
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token, used to estimate a request's cost before sending it
+CHARS_PER_TOKEN = 4
+
+# Status codes worth retrying: timeout, conflict, rate limit and server errors
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+class ModelUnavailable(Exception):
+    """Raised when a model call cannot be admitted before its deadline."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilling at ``rate`` per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> bool:
+        """Take ``amount`` tokens if they are available right now."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float, deadline: Optional[float] = None) -> float:
+        """Block until ``amount`` tokens are taken, returning the seconds waited.
+
+        Raises ModelUnavailable straight away if the wait would run past
+        ``deadline`` (a time.monotonic() value).
+        """
+        # A request bigger than the bucket would never fit; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return now - started
+                delay = (amount - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                raise ModelUnavailable("Model rate limit would be exceeded before the deadline")
+            time.sleep(delay)
+
+    def refund(self, amount: float) -> None:
+        """Return tokens that were reserved but not used."""
+        if amount <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, TimeoutError):
+        return True
+    # anthropic is only imported once a real backend is built; APITimeoutError
+    # is a subclass of APIConnectionError
+    anthropic = sys.modules.get('anthropic')
+    if anthropic is not None and isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = getattr(error, 'status_code', None)
+    return status is not None and (status in _RETRYABLE_STATUS or status >= 500)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait, if it said."""
+    value = getattr(error, 'retry_after', None)
+    if value is None:
+        response = getattr(error, 'response', None)
+        value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _estimate_tokens(kwargs: Dict) -> int:
+    """Upper estimate of a request's tokens: the prompt plus max_tokens of output."""
+    chars = 0
+    for message in kwargs.get('messages', []):
+        content = message.get('content')
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    chars += len(str(kwargs.get('system', '')))
+    return chars // CHARS_PER_TOKEN + int(kwargs.get('max_tokens', 0))
+
+
+class _Messages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        return self._client._create(kwargs)
+
+    def stream(self, **kwargs):
+        return self._client._stream(kwargs)
+
+
+class ResilientModelClient:
+    """Rate-limited, deadline-bounded, retrying drop-in for ``anthropic.Anthropic``.
+
+    ``timeout`` is the default total budget of a call in seconds, including
+    time spent queued for a slot or for rate limit tokens and any retries; a
+    call can pass its own ``timeout=`` to override it. For streams the
+    budget covers getting the stream started; once text is flowing, errors
+    are not retried because cards have already been handed to the caller.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 8, requests_per_minute: float = 50,
+                 tokens_per_minute: float = 100000, timeout: float = 60.0, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 hedge_after: Optional[float] = None):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.messages = _Messages(self)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "hedges": 0, "hedge_wins": 0,
+                       "throttled_seconds": 0.0}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str, amount=1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    @contextmanager
+    def _slot(self, deadline: float):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise ModelUnavailable("Too many model calls in progress")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _admit(self, cost: int, deadline: float) -> None:
+        """Wait for rate limit tokens for one attempt."""
+        waited = 0.0
+        if self._requests:
+            waited += self._requests.acquire(1, deadline)
+        if self._tokens:
+            waited += self._tokens.acquire(cost, deadline)
+        if waited:
+            self._count('throttled_seconds', waited)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter keeps a burst of failed callers from retrying in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, _retry_after(error) or 0.0)
+
+    def _with_retries(self, call, cost: int, deadline: float):
+        """Run ``call(timeout)`` until it succeeds, retrying transient errors within the deadline."""
+        attempt = 0
+        while True:
+            self._admit(cost, deadline)
+            try:
+                return call(max(0.0, deadline - time.monotonic()))
+            except Exception as error:
+                delay = self._backoff(attempt, error) if _is_retryable(error) else None
+                if delay is None or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self._count('failures')
+                    raise
+                logger.warning("Model call failed (%s); retrying in %.2fs", error,
+                               extra={"attempt": attempt + 1, "retry_in": round(delay, 3)})
+                self._count('retries')
+                time.sleep(delay)
+                attempt += 1
+
+    def _deadline(self, kwargs: Dict) -> float:
+        timeout = kwargs.pop('timeout', None)
+        return time.monotonic() + (self.timeout if timeout is None else timeout)
+
+    def _create(self, kwargs: Dict):
+        started = time.perf_counter()
+        deadline = self._deadline(kwargs)
+        cost = _estimate_tokens(kwargs)
+        self._count('calls')
+        try:
+            with self._slot(deadline):
+                message = self._with_retries(lambda timeout: self._hedged_create(kwargs, cost, timeout),
+                                             cost, deadline)
+        except Exception:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, operation='create', outcome='error')
+            raise
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, operation='create', outcome='ok')
+        usage = getattr(message, 'usage', None)
+        record_llm_usage(usage)
+        if self._tokens and usage is not None:
+            self._tokens.refund(cost - usage.input_tokens - usage.output_tokens)
+        return message
+
+    @contextmanager
+    def _stream(self, kwargs: Dict):
+        """Stream a response; its duration is measured until the caller closes it."""
+        started = time.perf_counter()
+        deadline = self._deadline(kwargs)
+        cost = _estimate_tokens(kwargs)
+        self._count('calls')
+        outcome = 'error'
+        try:
+            with self._slot(deadline), ExitStack() as stack:
+                # Opening the stream sends the request, so that is the part retried
+                yield self._with_retries(
+                    lambda timeout: stack.enter_context(self.backend.messages.stream(timeout=timeout, **kwargs)),
+                    cost, deadline
+                )
+            outcome = 'ok'
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, operation='stream', outcome=outcome)
+
+    def _hedged_create(self, kwargs: Dict, cost: int, timeout: float):
+        if not self.hedge_after or self.hedge_after >= timeout:
+            return self.backend.messages.create(timeout=timeout, **kwargs)
+
+        deadline = time.monotonic() + timeout
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self.backend.messages.create, timeout=timeout, **kwargs)
+        pending = {primary}
+        if not wait(pending, timeout=self.hedge_after)[0] and self._admit_hedge(cost):
+            self._count('hedges')
+            pending.add(executor.submit(self._hedge, kwargs, deadline - time.monotonic()))
+
+        # The slower request cannot be cancelled; it finishes in the background
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"Model did not respond within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _admit_hedge(self, cost: int) -> bool:
+        """Take a slot and rate limit tokens for a hedge, only if free right now."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        if (self._requests and not self._requests.try_acquire(1)) or \
+                (self._tokens and not self._tokens.try_acquire(cost)):
+            self._slots.release()
+            return False
+        return True
+
+    def _hedge(self, kwargs: Dict, timeout: float):
+        try:
+            return self.backend.messages.create(timeout=timeout, **kwargs)
+        finally:
+            self._slots.release()
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=2 * self.max_concurrency,
+                                                              thread_name_prefix='llm-hedge')
+        return self._hedge_executor
+
+
+def _create_backend(settings):
+    if settings.llm_backend == "fake":
+        return FakeModelClient(
+            first_token_latency=settings.fake_model_latency,
+            rate_limit_rate=settings.fake_model_rate_limit_rate,
+            error_rate=settings.fake_model_error_rate,
+            slow_rate=settings.fake_model_slow_rate
+        )
+    if not settings.anthropic_api_key:
+        raise ValueError("Anthropic API key is missing. Please set ANTHROPIC_API_KEY in your .env file.")
+    # The SDK takes over a second to import, so it is only loaded when first needed
+    import anthropic
+    # Retries are done by ResilientModelClient, which knows the call's deadline
+    return anthropic.Anthropic(api_key=settings.anthropic_api_key, max_retries=0)
+
+
+def create_model_client(backend=None) -> ResilientModelClient:
+    """Build a model client configured from the settings.
+
+    LLM_BACKEND selects ``anthropic`` or ``fake``; LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE (0 disables a limit),
+    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES and LLM_HEDGE_AFTER_SECONDS (unset
+    disables hedging) tune the wrapper.
+    """
+    settings = get_settings()
+    return ResilientModelClient(
+        backend if backend is not None else _create_backend(settings),
+        max_concurrency=settings.llm_max_concurrency,
+        requests_per_minute=settings.llm_requests_per_minute,
+        tokens_per_minute=settings.llm_tokens_per_minute,
+        timeout=settings.llm_timeout,
+        max_retries=settings.llm_max_retries,
+        hedge_after=settings.llm_hedge_after
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_model_client() -> ResilientModelClient:
+    """Return the process-wide model client, creating it on first use.
+
+    Raises ValueError if the Anthropic backend is selected without an API key.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_model_client()
+    return _client
+
+
+def model_client_stats() -> Optional[Dict]:
+    """Return the process-wide model client's stats, or None if it has not been created."""
+    return _client.stats() if _client is not None else None
+
+
+register_stats('llm_client', model_client_stats)
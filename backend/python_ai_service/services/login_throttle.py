@@ -0,0 +1,113 @@
+"""Login throttling, per client address and per username.
+
+Two limits, both kept in process memory:
+
+* each client address gets a token bucket of LOGIN_IP_BURST attempts
+  refilling at LOGIN_IP_RATE_PER_MINUTE, which sheds floods before any
+  password is hashed; a classroom behind one NAT address needs a burst
+  large enough for the whole class;
+* a username with LOGIN_MAX_FAILURES failed attempts inside
+  LOGIN_FAILURE_WINDOW seconds is refused until the oldest of them ages
+  out, which stops password guessing from many addresses.
+
+Setting either rate or failure limit to 0 turns that limit off. With
+several worker processes each enforces its limits separately.
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import register_stats
+from python_ai_service.services.llm_client import TokenBucket
+
+
+class LoginThrottle:
+    """Decides whether a login attempt may proceed, and for how long it must wait if not."""
+
+    def __init__(self, ip_rate_per_minute=120.0, ip_burst=30, max_failures=5, failure_window=300.0,
+                 max_tracked=100000):
+        self.ip_rate = ip_rate_per_minute / 60.0
+        self.ip_burst = ip_burst
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.max_tracked = max_tracked
+        self._buckets = OrderedDict()
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled_ip = 0
+        self.throttled_username = 0
+
+    def _track(self, table, key, factory):
+        # Bounded LRU so a spray of addresses or usernames cannot grow memory without limit
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = factory()
+            while len(table) > self.max_tracked:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return entry
+
+    def check(self, ip: Optional[str], username: str) -> Optional[float]:
+        """Admit an attempt, or return the seconds the client should wait before retrying."""
+        username = username.lower()
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(username)
+            if failures is not None:
+                while failures and now - failures[0] > self.failure_window:
+                    failures.popleft()
+                if self.max_failures and len(failures) >= self.max_failures:
+                    self.throttled_username += 1
+                    return failures[0] + self.failure_window - now
+            if self.ip_rate:
+                bucket = self._track(self._buckets, ip, lambda: TokenBucket(self.ip_rate, self.ip_burst))
+                if not bucket.try_acquire(1):
+                    self.throttled_ip += 1
+                    return 1 / self.ip_rate
+            self.allowed += 1
+        return None
+
+    def record_failure(self, username: str) -> None:
+        if not self.max_failures:
+            return
+        with self._lock:
+            self._track(self._failures, username.lower(), deque).append(time.monotonic())
+
+    def record_success(self, username: str) -> None:
+        with self._lock:
+            self._failures.pop(username.lower(), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'throttled_ip': self.throttled_ip,
+                'throttled_username': self.throttled_username,
+                'tracked_ips': len(self._buckets),
+                'tracked_usernames': len(self._failures),
+            }
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+def get_login_throttle() -> LoginThrottle:
+    """Return the process-wide login throttle, configured from the LOGIN_* settings."""
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                settings = get_settings()
+                _throttle = LoginThrottle(
+                    ip_rate_per_minute=settings.login_ip_rate_per_minute,
+                    ip_burst=settings.login_ip_burst,
+                    max_failures=settings.login_max_failures,
+                    failure_window=settings.login_failure_window,
+                )
+    return _throttle
+
+register_stats('login_throttle', lambda: _throttle.stats() if _throttle is not None else None)
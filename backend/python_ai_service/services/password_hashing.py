@@ -0,0 +1,160 @@
+"""Password hashing on a bounded process pool.
+
+Hashing and checking passwords is deliberately expensive (scrypt by
+default). Done on request threads, a burst of logins holds the worker's
+CPU and leaves every other endpoint waiting, so the work is handed to
+PASSWORD_HASH_WORKERS separate processes instead. At most
+PASSWORD_HASH_MAX_PENDING operations may be queued or running; beyond that
+``HashingOverloaded`` is raised straight away so the caller can answer 503
+rather than queue without bound. PASSWORD_HASH_WORKERS=0 hashes inline.
+
+PASSWORD_HASH_METHOD sets the cost of new hashes, in werkzeug's format
+(``scrypt:N:r:p`` or ``pbkdf2:sha256:iterations``). Stored hashes made with
+other parameters still verify, and are replaced on the user's next login.
+"""
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _exit_with_parent(parent_pid):
+    """Pool initializer: end the worker if the server process is killed without shutting the pool down."""
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, daemon=True).start()
+
+
+class HashingOverloaded(Exception):
+    """Raised when a hashing operation cannot be admitted or finished in time."""
+
+
+class PasswordHasher:
+    """Runs werkzeug's hash and check functions on a process pool with a pending-work limit."""
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=32, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.pending = 0
+        self.busy_seconds = 0.0
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # Spawned rather than forked: the server process is multi-threaded
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_exit_with_parent, initargs=(os.getpid(),))
+        return self._executor
+
+    def _release(self, started):
+        self._slots.release()
+        self._count(pending=-1, completed=1, busy_seconds=time.perf_counter() - started)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise HashingOverloaded("Too many password operations in progress")
+        self._count(pending=1)
+        started = time.perf_counter()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._release(started)
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self._reset_executor()
+            self._release(started)
+            raise HashingOverloaded("Password hashing workers are restarting")
+        # The slot is held until the worker finishes, even if this request stops waiting
+        future.add_done_callback(lambda _: self._release(started))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count(timeouts=1)
+            raise HashingOverloaded("Password hashing did not finish in time")
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise HashingOverloaded("Password hashing workers are restarting")
+
+    def _reset_executor(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            logger.error("Password hashing pool broke; starting a new one")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True if a stored hash was made with different parameters than PASSWORD_HASH_METHOD."""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'avg_seconds': round(self.busy_seconds / self.completed, 4) if self.completed else 0.0,
+            }
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the process-wide hasher, configured from the PASSWORD_HASH_* settings."""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                settings = get_settings()
+                _hasher = PasswordHasher(
+                    method=settings.password_hash_method,
+                    workers=settings.password_hash_workers,
+                    max_pending=settings.password_hash_max_pending,
+                    timeout=settings.password_hash_timeout,
+                )
+    return _hasher
+
+register_stats('password_hasher', lambda: _hasher.stats() if _hasher is not None else None)
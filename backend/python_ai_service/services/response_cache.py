@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import register_stats
+
+
+class ResponseCache:
+    """Serialized response bodies keyed by ETag, bounded by total bytes.
+
+    Keys embed the version of the data they were rendered from, so entries
+    never need invalidating: once a set changes its old entries simply stop
+    being requested and fall out of the LRU.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_entry_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: str, body: bytes) -> bool:
+        """Store a body, returning False if it is too large to cache."""
+        if len(body) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            self.stores += 1
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'stores': self.stores,
+            }
+
+
+def make_etag(scope: str, key, version, query_string: bytes) -> str:
+    """Strong ETag for one rendering of versioned data.
+
+    The query string is part of the tag because pagination and field
+    projection change the body.
+    """
+    args = hashlib.sha1(query_string).hexdigest()[:12]
+    return f"{scope}-{key}-v{version}-{args}"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None if disabled.
+
+    RESPONSE_CACHE_MAX_BYTES bounds its memory (default 16 MiB, 0 disables
+    it) and RESPONSE_CACHE_MAX_ENTRY_BYTES skips very large responses.
+    """
+    global _cache
+    settings = get_settings()
+    if settings.response_cache_max_bytes <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_bytes=settings.response_cache_max_bytes,
+                    max_entry_bytes=settings.response_cache_max_entry_bytes
+                )
+    return _cache
+
+register_stats('response_cache', lambda: _cache.stats() if _cache is not None else None)
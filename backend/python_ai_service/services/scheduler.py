@@ -0,0 +1,397 @@
+"""SM-2 spaced-repetition scheduling.
+
+Each (user, card) pair carries an ease factor, an interval in days, a count
+of consecutive successful repetitions and a lapse count. A review is graded
+0-5 (SM-2 scale; 3 and above counts as recalled) and moves the card's due
+time to ``reviewed_at + interval``.
+
+``schedule_review`` applies one review; ``replay_reviews`` applies many at
+once with numpy, vectorized across cards, which is what makes recomputing a
+user's whole history and applying batched submissions cheap.
+"""
+import datetime
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from python_ai_service.db.progress_summary import UPDATE_SUMMARY_SQL, summary_params
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+PASSING_GRADE = 3
+# Grade recorded for the legacy "answered correctly" progress endpoint
+CORRECT_GRADE = 4
+INCORRECT_GRADE = 1
+# Long passing streaks grow intervals geometrically; cap them at 100 years
+MAX_INTERVAL_DAYS = 36500.0
+SECONDS_PER_DAY = 86400.0
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _to_epoch(value: datetime.datetime) -> float:
+    return (value - _EPOCH).total_seconds()
+
+
+def _from_epoch(seconds: float) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(seconds=float(seconds))
+
+
+def _next_ease(ease, grade):
+    miss = 5 - grade
+    return np.maximum(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+
+
+def schedule_review(state: Optional[Dict], grade: int, reviewed_at: datetime.datetime) -> Dict:
+    """Apply one graded review to a card's scheduling state.
+
+    ``state`` holds ease_factor, interval_days, repetitions and lapses (None
+    for a card never reviewed). Returns the new state including due_at.
+    """
+    state = state or {}
+    ease = state.get('ease_factor', DEFAULT_EASE)
+    interval = state.get('interval_days', 0.0)
+    reps = state.get('repetitions', 0)
+    lapses = state.get('lapses', 0)
+
+    if grade >= PASSING_GRADE:
+        if reps == 0:
+            interval = 1.0
+        elif reps == 1:
+            interval = 6.0
+        else:
+            interval = min(interval * ease, MAX_INTERVAL_DAYS)
+        reps += 1
+    else:
+        reps = 0
+        interval = 1.0
+        lapses += 1
+    ease = float(_next_ease(ease, grade))
+
+    return {
+        'ease_factor': ease,
+        'interval_days': interval,
+        'repetitions': reps,
+        'lapses': lapses,
+        'last_reviewed_at': reviewed_at,
+        'due_at': reviewed_at + datetime.timedelta(days=interval),
+    }
+
+
+def replay_reviews(card_ids: Sequence[int], grades: Sequence[int], reviewed_at: Sequence[float],
+                   initial: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """Replay many reviews and return the final SM-2 state of every card.
+
+    ``reviewed_at`` is in epoch seconds. Reviews are ordered per card by
+    time, then applied one "round" at a time: round k updates every card's
+    k-th review in a single vectorized step, so cost grows with the longest
+    history of any one card rather than with the total number of reviews.
+
+    ``initial`` optionally supplies starting state arrays keyed like the
+    result and aligned with ``np.unique(card_ids)``. The result holds
+    ``card_id``, ``ease_factor``, ``interval_days``, ``repetitions``,
+    ``lapses``, ``last_reviewed_at`` and ``due_at`` (epoch seconds) arrays.
+    """
+    card_ids = np.asarray(card_ids, dtype=np.int64)
+    grades = np.asarray(grades, dtype=np.int16)
+    times = np.asarray(reviewed_at, dtype=np.float64)
+
+    order = np.lexsort((times, card_ids))
+    card_ids, grades, times = card_ids[order], grades[order], times[order]
+    if len(card_ids):
+        starts = np.flatnonzero(np.r_[True, card_ids[1:] != card_ids[:-1]])
+    else:
+        starts = np.zeros(0, dtype=np.int64)
+    lengths = np.diff(np.r_[starts, len(card_ids)])
+    unique_ids = card_ids[starts]
+    n = len(unique_ids)
+
+    if initial is not None:
+        ease = np.array(initial['ease_factor'], dtype=np.float64)
+        interval = np.array(initial['interval_days'], dtype=np.float64)
+        reps = np.array(initial['repetitions'], dtype=np.int64)
+        lapses = np.array(initial['lapses'], dtype=np.int64)
+    else:
+        ease = np.full(n, DEFAULT_EASE)
+        interval = np.zeros(n)
+        reps = np.zeros(n, dtype=np.int64)
+        lapses = np.zeros(n, dtype=np.int64)
+    last = np.zeros(n)
+
+    for k in range(int(lengths.max()) if n else 0):
+        active = np.flatnonzero(lengths > k)
+        idx = starts[active] + k
+        g = grades[idx]
+        passed = g >= PASSING_GRADE
+        r = reps[active]
+        iv = interval[active]
+
+        grown = np.where(r == 0, 1.0, np.where(r == 1, 6.0, np.minimum(iv * ease[active], MAX_INTERVAL_DAYS)))
+        interval[active] = np.where(passed, grown, 1.0)
+        reps[active] = np.where(passed, r + 1, 0)
+        lapses[active] += ~passed
+        ease[active] = _next_ease(ease[active], g)
+        last[active] = times[idx]
+
+    return {
+        'card_id': unique_ids,
+        'ease_factor': ease,
+        'interval_days': interval,
+        'repetitions': reps,
+        'lapses': lapses,
+        'last_reviewed_at': last,
+        'due_at': last + interval * SECONDS_PER_DAY,
+    }
+
+
+_SELECT_STATE_SQL = """
+    SELECT ease_factor, interval_days, repetitions, lapses
+    FROM study_progress WHERE user_id = %s AND card_id = %s
+    FOR UPDATE
+"""
+
+_UPSERT_PROGRESS_SQL = """
+    INSERT INTO study_progress
+        (user_id, card_id, correct_count, last_correct_at, ease_factor, interval_days,
+         repetitions, lapses, last_reviewed_at, due_at)
+    VALUES (%(user_id)s, %(card_id)s, %(correct)s, CASE WHEN %(correct)s = 1 THEN %(reviewed_at)s END,
+            %(ease_factor)s, %(interval_days)s, %(repetitions)s, %(lapses)s, %(reviewed_at)s, %(due_at)s)
+    ON CONFLICT (user_id, card_id)
+    DO UPDATE SET
+        correct_count = study_progress.correct_count + EXCLUDED.correct_count,
+        last_correct_at = COALESCE(EXCLUDED.last_correct_at, study_progress.last_correct_at),
+        ease_factor = EXCLUDED.ease_factor,
+        interval_days = EXCLUDED.interval_days,
+        repetitions = EXCLUDED.repetitions,
+        lapses = EXCLUDED.lapses,
+        last_reviewed_at = EXCLUDED.last_reviewed_at,
+        due_at = EXCLUDED.due_at,
+        changed_xid = pg_current_xact_id()
+    RETURNING correct_count, xmax = 0
+"""
+
+_LOG_REVIEW_SQL = "INSERT INTO review_log (user_id, card_id, grade, reviewed_at) VALUES (%s, %s, %s, %s)"
+
+
+def _apply_review(row, user_id, card_id, grade, reviewed_at):
+    """Return (new state, upsert params) for a review of a card whose state row is ``row``."""
+    state = dict(zip(('ease_factor', 'interval_days', 'repetitions', 'lapses'), row)) if row else None
+    new = schedule_review(state, grade, reviewed_at)
+    correct = 1 if grade >= PASSING_GRADE else 0
+    return new, dict(new, user_id=user_id, card_id=card_id, correct=correct, reviewed_at=reviewed_at)
+
+
+def record_review(cur, user_id: int, card_id: int, grade: int,
+                  reviewed_at: Optional[datetime.datetime] = None) -> Dict:
+    """Log a review and update the card's progress, schedule and progress summaries. Does not commit."""
+    reviewed_at = reviewed_at or datetime.datetime.utcnow()
+    cur.execute(_SELECT_STATE_SQL, (user_id, card_id))
+    new, params = _apply_review(cur.fetchone(), user_id, card_id, grade, reviewed_at)
+    cur.execute(_UPSERT_PROGRESS_SQL, params)
+    correct_count, inserted = cur.fetchone()
+    cur.execute(_LOG_REVIEW_SQL, (user_id, card_id, grade, reviewed_at))
+    cur.execute(UPDATE_SUMMARY_SQL, summary_params(
+        user_id, [(card_id, inserted, correct_count, params['correct'], 1, reviewed_at)]))
+    return new
+
+
+async def record_review_async(cur, user_id: int, card_id: int, grade: int,
+                              reviewed_at: Optional[datetime.datetime] = None) -> Dict:
+    """``record_review`` for an async (psycopg 3) cursor. Does not commit."""
+    reviewed_at = reviewed_at or datetime.datetime.utcnow()
+    await cur.execute(_SELECT_STATE_SQL, (user_id, card_id))
+    new, params = _apply_review(await cur.fetchone(), user_id, card_id, grade, reviewed_at)
+    await cur.execute(_UPSERT_PROGRESS_SQL, params)
+    correct_count, inserted = await cur.fetchone()
+    await cur.execute(_LOG_REVIEW_SQL, (user_id, card_id, grade, reviewed_at))
+    await cur.execute(UPDATE_SUMMARY_SQL, summary_params(
+        user_id, [(card_id, inserted, correct_count, params['correct'], 1, reviewed_at)]))
+    return new
+
+
+def reschedule_user(cur, user_id: int) -> int:
+    """Recompute every card's schedule for a user from review_log. Does not commit.
+
+    Returns the number of cards rescheduled.
+    """
+    cur.execute(
+        "SELECT card_id, grade, EXTRACT(EPOCH FROM reviewed_at) FROM review_log WHERE user_id = %s",
+        (user_id,)
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return 0
+    columns = np.array(rows, dtype=np.float64).T
+    result = replay_reviews(columns[0].astype(np.int64), columns[1].astype(np.int16), columns[2])
+
+    execute_values(
+        cur,
+        sql.SQL("""
+        UPDATE study_progress AS p SET
+            ease_factor = v.ease_factor,
+            interval_days = v.interval_days,
+            repetitions = v.repetitions,
+            lapses = v.lapses,
+            last_reviewed_at = v.last_reviewed_at,
+            due_at = v.due_at,
+            changed_xid = pg_current_xact_id()
+        FROM (VALUES %s) AS v (card_id, ease_factor, interval_days, repetitions, lapses, last_reviewed_at, due_at)
+        WHERE p.user_id = {user_id} AND p.card_id = v.card_id
+        """).format(user_id=sql.Literal(user_id)),
+        [
+            (int(card_id), float(ease), float(interval), int(reps), int(lapses), _from_epoch(last), _from_epoch(due))
+            for card_id, ease, interval, reps, lapses, last, due in zip(
+                result['card_id'], result['ease_factor'], result['interval_days'],
+                result['repetitions'], result['lapses'], result['last_reviewed_at'], result['due_at'])
+        ],
+        template="(%s, %s::real, %s::real, %s, %s, %s::timestamp, %s::timestamp)",
+        page_size=1000
+    )
+    return len(result['card_id'])
+
+
+def record_reviews(cur, user_id: int, events: List[Dict]) -> Dict[str, str]:
+    """Apply a batch of review events in one transaction. Does not commit.
+
+    Each event has ``event_id`` (the client's idempotency key, unique within
+    the batch), ``card_id``, ``grade`` and ``reviewed_at`` (naive UTC). Events
+    are logged with one multi-row insert that skips keys already seen, then
+    every touched card is rescheduled and upserted in one statement, and the
+    progress summaries of their sets are updated in one more. Cards are
+    rescheduled on top of their stored state, except cards with an event
+    older than their last review, which are replayed from their full
+    review_log history so a late batch never moves a schedule backwards.
+
+    Returns ``{event_id: status}`` with status ``applied``, ``duplicate`` or
+    ``not_found``.
+    """
+    statuses = {}
+    if not events:
+        return statuses
+
+    cur.execute("SELECT id FROM flashcards WHERE id = ANY(%s)", (sorted({e['card_id'] for e in events}),))
+    known = {row[0] for row in cur.fetchall()}
+    candidates = []
+    for event in events:
+        if event['card_id'] in known:
+            candidates.append(event)
+        else:
+            statuses[event['event_id']] = 'not_found'
+    if not candidates:
+        return statuses
+
+    inserted = execute_values(
+        cur,
+        """
+        INSERT INTO review_log (user_id, card_id, grade, reviewed_at, event_id) VALUES %s
+        ON CONFLICT (user_id, event_id) WHERE event_id IS NOT NULL DO NOTHING
+        RETURNING event_id
+        """,
+        [(user_id, e['card_id'], e['grade'], e['reviewed_at'], e['event_id']) for e in candidates],
+        page_size=len(candidates),
+        fetch=True
+    )
+    new_ids = {row[0] for row in inserted}
+    applied = []
+    for event in candidates:
+        if event['event_id'] in new_ids:
+            applied.append(event)
+            statuses[event['event_id']] = 'applied'
+        else:
+            statuses[event['event_id']] = 'duplicate'
+    if not applied:
+        return statuses
+
+    card_ids = sorted({e['card_id'] for e in applied})
+    cur.execute(
+        """
+        SELECT card_id, ease_factor, interval_days, repetitions, lapses, EXTRACT(EPOCH FROM last_reviewed_at)
+        FROM study_progress WHERE user_id = %s AND card_id = ANY(%s)
+        ORDER BY card_id
+        FOR UPDATE
+        """,
+        (user_id, card_ids)
+    )
+    existing = {row[0]: row for row in cur.fetchall()}
+    # A late batch (e.g. an offline device syncing) can hold reviews older than
+    # a card's last one; its stored state already includes newer reviews, so
+    # such cards are replayed from their whole review_log history instead.
+    late = {e['card_id'] for e in applied
+            if existing.get(e['card_id']) and existing[e['card_id']][5] is not None
+            and _to_epoch(e['reviewed_at']) < float(existing[e['card_id']][5])}
+    in_order = [e for e in applied if e['card_id'] not in late]
+    results = []
+    if in_order:
+        # Sorted card ids line up with the np.unique order replay_reviews uses
+        columns = zip(*(existing[card_id][1:5] if card_id in existing else (DEFAULT_EASE, 0.0, 0, 0)
+                        for card_id in sorted({e['card_id'] for e in in_order})))
+        initial = dict(zip(('ease_factor', 'interval_days', 'repetitions', 'lapses'), columns))
+        results.append(replay_reviews(
+            [e['card_id'] for e in in_order],
+            [e['grade'] for e in in_order],
+            [_to_epoch(e['reviewed_at']) for e in in_order],
+            initial=initial
+        ))
+    if late:
+        # The batch's own events were logged above, so the history is complete
+        cur.execute(
+            """
+            SELECT card_id, grade, EXTRACT(EPOCH FROM reviewed_at)
+            FROM review_log WHERE user_id = %s AND card_id = ANY(%s)
+            """,
+            (user_id, sorted(late))
+        )
+        columns = np.array(cur.fetchall(), dtype=np.float64).T
+        results.append(replay_reviews(columns[0].astype(np.int64), columns[1].astype(np.int16), columns[2]))
+    result = {key: np.concatenate([part[key] for part in results]) for key in results[0]}
+    # Upsert in card_id order, the order the rows were locked in above, so
+    # concurrent batches of one user take study_progress row locks in the same order
+    order = np.argsort(result['card_id'], kind='stable')
+    result = {key: values[order] for key, values in result.items()}
+
+    correct = Counter(e['card_id'] for e in applied if e['grade'] >= PASSING_GRADE)
+    reviews = Counter(e['card_id'] for e in applied)
+    last_correct = {}
+    for event in applied:
+        if event['grade'] >= PASSING_GRADE:
+            last_correct[event['card_id']] = max(event['reviewed_at'], last_correct.get(event['card_id'], event['reviewed_at']))
+
+    upserted = execute_values(
+        cur,
+        """
+        INSERT INTO study_progress
+            (user_id, card_id, correct_count, last_correct_at, ease_factor, interval_days,
+             repetitions, lapses, last_reviewed_at, due_at)
+        VALUES %s
+        ON CONFLICT (user_id, card_id)
+        DO UPDATE SET
+            correct_count = study_progress.correct_count + EXCLUDED.correct_count,
+            last_correct_at = GREATEST(study_progress.last_correct_at, EXCLUDED.last_correct_at),
+            ease_factor = EXCLUDED.ease_factor,
+            interval_days = EXCLUDED.interval_days,
+            repetitions = EXCLUDED.repetitions,
+            lapses = EXCLUDED.lapses,
+            last_reviewed_at = EXCLUDED.last_reviewed_at,
+            due_at = EXCLUDED.due_at,
+            changed_xid = pg_current_xact_id()
+        RETURNING card_id, correct_count, xmax = 0
+        """,
+        [
+            (user_id, int(card_id), correct[int(card_id)], last_correct.get(int(card_id)), float(ease),
+             float(interval), int(reps), int(lapses), _from_epoch(last), _from_epoch(due))
+            for card_id, ease, interval, reps, lapses, last, due in zip(
+                result['card_id'], result['ease_factor'], result['interval_days'],
+                result['repetitions'], result['lapses'], result['last_reviewed_at'], result['due_at'])
+        ],
+        template="(%s, %s, %s, %s::timestamp, %s::real, %s::real, %s, %s, %s::timestamp, %s::timestamp)",
+        page_size=len(card_ids),
+        fetch=True
+    )
+    last_reviewed = dict(zip(result['card_id'].tolist(), result['last_reviewed_at'].tolist()))
+    cur.execute(UPDATE_SUMMARY_SQL, summary_params(user_id, [
+        (card_id, inserted, correct_count, correct[card_id], reviews[card_id], _from_epoch(last_reviewed[card_id]))
+        for card_id, correct_count, inserted in upserted
+    ]))
+    return statuses
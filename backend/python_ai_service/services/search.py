@@ -0,0 +1,84 @@
+"""Ranked full-text search over a user's cards and sets.
+
+Both searches use the generated ``search_vector`` columns and their GIN
+indexes. Queries use websearch syntax ("quoted phrases", -exclusions, or)
+and results are ordered by ts_rank, best first, with keyset pagination on
+(rank, id).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+
+from python_ai_service.db.pagination import encode_rank_cursor
+
+_CARD_QUERY = """
+    SELECT f.id, f.set_id, s.name, f.front_text, f.back_text, f.star_status,
+           ts_rank(f.search_vector, q) AS rank
+    FROM websearch_to_tsquery('english', %s) AS q
+    JOIN flashcards f ON f.search_vector @@ q
+    JOIN sets s ON s.set_id = f.set_id
+    WHERE s.user_id = %s {after}
+    ORDER BY rank DESC, f.id DESC
+    LIMIT %s
+"""
+
+_SET_QUERY = """
+    SELECT s.id, s.set_id, s.name, s.topic, s.card_count, s.created_at,
+           ts_rank(s.search_vector, q) AS rank
+    FROM websearch_to_tsquery('english', %s) AS q
+    JOIN sets s ON s.search_vector @@ q
+    WHERE s.user_id = %s {after}
+    ORDER BY rank DESC, s.id DESC
+    LIMIT %s
+"""
+
+
+def _search(cur, template: str, alias: str, user_id: int, query: str, limit: int,
+            after: Optional[Tuple[float, int]]) -> Tuple[List[tuple], Optional[str]]:
+    params = [query, user_id]
+    after_sql = sql.SQL('')
+    if after:
+        after_sql = sql.SQL("AND (ts_rank({alias}.search_vector, q), {alias}.id) < (%s::real, %s)").format(
+            alias=sql.Identifier(alias))
+        params.extend(after)
+    params.append(limit + 1)
+    cur.execute(sql.SQL(template).format(after=after_sql), params)
+    rows = cur.fetchall()
+    next_cursor = encode_rank_cursor(rows[limit - 1][-1], rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def search_cards(cur, user_id: int, query: str, limit: int,
+                 after: Optional[Tuple[float, int]] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Return (matching cards from the user's sets, next_cursor)."""
+    rows, next_cursor = _search(cur, _CARD_QUERY, 'f', user_id, query, limit, after)
+    return [
+        {
+            'id': row[0],
+            'set_id': row[1],
+            'set_name': row[2],
+            'front': row[3],
+            'back': row[4],
+            'star_status': row[5],
+            'rank': row[6],
+        }
+        for row in rows
+    ], next_cursor
+
+
+def search_sets(cur, user_id: int, query: str, limit: int,
+                after: Optional[Tuple[float, int]] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Return (the user's sets whose name or topic match, next_cursor)."""
+    rows, next_cursor = _search(cur, _SET_QUERY, 's', user_id, query, limit, after)
+    return [
+        {
+            'id': row[0],
+            'set_id': row[1],
+            'name': row[2],
+            'topic': row[3],
+            'card_count': row[4],
+            'created_at': row[5],
+            'rank': row[6],
+        }
+        for row in rows
+    ], next_cursor
@@ -0,0 +1,111 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from python_ai_service.config import get_settings
+from python_ai_service.metrics import register_stats
+from python_ai_service.db.database import db_connection
+
+USER_COLUMNS = ('id', 'username', 'email', 'bio', 'profile_image_url')
+USER_SQL = "SELECT id, username, email, bio, profile_image_url FROM users WHERE id = %s"
+
+
+class UserCache:
+    """Short-lived LRU of user records keyed by user id.
+
+    Entries expire after USER_CACHE_TTL seconds, which bounds how stale a
+    record can be in other worker processes; the process that changes a
+    user calls ``invalidate`` so its own next read is fresh.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, user_id, user: Dict) -> None:
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_user_cache() -> UserCache:
+    """Return the process-wide user cache, sized by USER_CACHE_MAX_ENTRIES and USER_CACHE_TTL."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = UserCache(max_entries=settings.user_cache_max_entries, ttl=settings.user_cache_ttl)
+    return _cache
+
+def user_from_row(row) -> Dict:
+    return dict(zip(USER_COLUMNS, row))
+
+def get_user(user_id) -> Optional[Dict]:
+    """Return the user's record, from the cache when fresh. None if the user does not exist."""
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(USER_SQL, (user_id,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        user = user_from_row(row)
+        cache.set(user_id, user)
+    return user
+
+def prime_user(user: Dict) -> None:
+    """Cache a record the caller has just read, e.g. at login."""
+    get_user_cache().set(user['id'], user)
+
+def invalidate_user(user_id) -> None:
+    """Drop the cached record after the user's row changes."""
+    get_user_cache().invalidate(user_id)
+
+register_stats('user_cache', lambda: _cache.stats() if _cache is not None else None)
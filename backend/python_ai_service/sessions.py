@@ -0,0 +1,312 @@
+"""Server-side sessions.
+
+The session cookie holds only a random session id; the session data lives
+in a store selected by SESSION_BACKEND:
+
+- ``postgres`` (default): the sessions table, shared by every worker and
+  host, so logging out or revoking a user's sessions takes effect
+  everywhere at once.
+- ``sqlite``: a local database file (SESSION_SQLITE_PATH), shared by the
+  workers on one host.
+- ``memory``: an in-process LRU bounded by SESSION_MAX_ENTRIES. Sessions
+  are lost on restart and not shared between processes.
+- ``cookie``: Flask's signed cookies, which cannot be revoked.
+
+Sessions expire after the app's PERMANENT_SESSION_LIFETIME. The session id
+is replaced whenever the logged-in user changes, so an id issued before a
+login cannot be used after it.
+"""
+import time
+import secrets
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from python_ai_service.db.database import db_connection
+from python_ai_service.metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+_serializer = TaggedJSONSerializer()
+
+
+class MemorySessionBackend:
+    """Bounded in-process LRU of sessions with per-entry expiry."""
+
+    name = 'memory'
+    # Lookups never block, so async handlers can call them directly
+    blocking = False
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            expires_at, _, data = entry
+            if expires_at < time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return data
+
+    def set(self, sid, user_id, data, ttl):
+        with self._lock:
+            self._entries[sid] = (time.time() + ttl, user_id, data)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            revoked = [sid for sid, (_, owner, _) in self._entries.items() if owner == user_id]
+            for sid in revoked:
+                del self._entries[sid]
+        return len(revoked)
+
+    def size(self):
+        return len(self._entries)
+
+
+class PostgresSessionBackend:
+    """Sessions stored in the sessions table (migration 0009)."""
+
+    name = 'postgres'
+    blocking = True
+
+    def get(self, sid):
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT data FROM sessions WHERE session_id = %s AND expires_at > NOW()", (sid,))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, user_id, data, ttl):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO sessions (session_id, user_id, data, expires_at)
+                    VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        user_id = EXCLUDED.user_id, data = EXCLUDED.data, expires_at = EXCLUDED.expires_at
+                    """,
+                    (sid, user_id, data, ttl)
+                )
+                # Sessions are written on login and logout, so this keeps the table trimmed
+                cur.execute("DELETE FROM sessions WHERE expires_at <= NOW()")
+            conn.commit()
+
+    def delete(self, sid):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM sessions WHERE session_id = %s", (sid,))
+            conn.commit()
+
+    def delete_user(self, user_id):
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM sessions WHERE user_id = %s", (user_id,))
+                revoked = cur.rowcount
+            conn.commit()
+        return revoked
+
+    def size(self):
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM sessions WHERE expires_at > NOW()")
+            return cur.fetchone()[0]
+
+
+class SqliteSessionBackend:
+    """Sessions in a SQLite file, shared by the worker processes on one host."""
+
+    name = 'sqlite'
+    blocking = True
+
+    def __init__(self, path='sessions.sqlite3'):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers in other processes proceed during writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, user_id, data, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+                (sid, user_id, data, now + ttl)
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (sid,))
+
+    def delete_user(self, user_id):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+    def size(self):
+        return self._connect().execute(
+            "SELECT count(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+class ServerSideSession(SecureCookieSession):
+    """Session data loaded from the store, remembering which id and user it was loaded for."""
+
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.loaded_user_id = (initial or {}).get('user_id')
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface that keeps session data in a backend store."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.blocking = backend.blocking
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.misses = 0
+        self.created = 0
+        self.revoked = 0
+        self.errors = 0
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return ServerSideSession()
+        try:
+            raw = self.backend.get(sid)
+        except Exception as e:
+            # Fail closed: an unreadable store means nobody is logged in
+            logger.error("Session lookup failed: %s", e)
+            self._count(lookups=1, errors=1)
+            return ServerSideSession()
+        if raw is None:
+            self._count(lookups=1, misses=1)
+            return ServerSideSession()
+        self._count(lookups=1)
+        return ServerSideSession(_serializer.loads(raw), sid=sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if not session.modified:
+            return
+
+        user_id = session.get('user_id')
+        sid = session.sid
+        if sid is None or user_id != session.loaded_user_id:
+            # New session, or a different user logged in on this one: issue a fresh id
+            if sid is not None:
+                self.backend.delete(sid)
+            sid = secrets.token_urlsafe(32)
+            self._count(created=1)
+        ttl = app.permanent_session_lifetime.total_seconds()
+        self.backend.set(sid, user_id, _serializer.dumps(dict(session)), ttl)
+        response.set_cookie(name, sid, expires=self.get_expiration_time(app, session), httponly=httponly,
+                            domain=domain, path=path, secure=secure, samesite=samesite)
+        response.vary.add("Cookie")
+
+    def revoke_user(self, user_id) -> int:
+        """End every session of a user, in every worker using this store."""
+        revoked = self.backend.delete_user(user_id)
+        self._count(revoked=revoked)
+        return revoked
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                'backend': self.backend.name,
+                'lookups': self.lookups,
+                'misses': self.misses,
+                'created': self.created,
+                'revoked': self.revoked,
+                'errors': self.errors,
+            }
+        try:
+            stats['active'] = self.backend.size()
+        except Exception:
+            stats['active'] = None
+        return stats
+
+
+_interface = None
+
+def create_session_interface(settings) -> Optional[ServerSideSessionInterface]:
+    """Build the session interface for SESSION_BACKEND, or None to keep Flask's signed cookies."""
+    global _interface
+    if settings.session_backend == 'cookie':
+        return None
+    if settings.session_backend == 'memory':
+        backend = MemorySessionBackend(max_entries=settings.session_max_entries)
+    elif settings.session_backend == 'sqlite':
+        backend = SqliteSessionBackend(settings.session_sqlite_path)
+    elif settings.session_backend == 'postgres':
+        backend = PostgresSessionBackend()
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {settings.session_backend}")
+    _interface = ServerSideSessionInterface(backend)
+    return _interface
+
+register_stats('sessions', lambda: _interface.stats() if _interface is not None else None)
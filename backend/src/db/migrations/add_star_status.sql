@@ -1,2 +0,0 @@
--- Add star_status column to flashcards table
-ALTER TABLE flashcards ADD COLUMN star_status BOOLEAN DEFAULT FALSE; 
\ No newline at end of file
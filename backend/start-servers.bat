@@ -2,6 +2,10 @@
 echo Starting Flashcard App Backend Servers...
 echo.
 
+echo Applying database migrations...
+python -m python_ai_service.db.migrate upgrade
+echo.
+
 echo Starting Python AI Service on port 5001...
 start "Python AI Service" cmd /k "cd python_ai_service && python app.py"
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Card Parser Test Script
+Run this to check that flashcards are salvaged from truncated, chunked and
+noisy model output. Each property is checked against many randomly
+generated responses; a seed is printed so failures can be reproduced.
+
+    python test_card_parser.py --trials 500
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+# Add the python_ai_service directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'python_ai_service'))
+
+from python_ai_service.services.card_parser import IncrementalCardParser, parse_cards
+
+# Characters that stress the scanner: braces and quotes inside strings, escapes, non-ASCII
+ALPHABET = 'abc xyz{}[]",:\\\n\t/é漢😀'
+
+def random_text(rng):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 20)))
+
+def random_cards(rng):
+    return [{"front": random_text(rng), "back": random_text(rng)} for _ in range(rng.randint(0, 12))]
+
+def render(rng, cards):
+    """Serialize cards the way a model might: pretty or compact, maybe escaped to ASCII."""
+    return json.dumps(cards, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+
+def feed_in_chunks(rng, text):
+    parser = IncrementalCardParser()
+    cards = []
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 16)
+        cards.extend(parser.feed(text[i:i + size]))
+        i += size
+    return cards, parser.finish()
+
+def check(name, trials, prop, seed):
+    rng = random.Random(seed)
+    for trial in range(trials):
+        failure = prop(rng)
+        if failure:
+            print(f"❌ {name}: trial {trial} (seed {seed}): {failure}")
+            return False
+    print(f"✅ {name} ({trials} trials)")
+    return True
+
+def prop_round_trip(rng):
+    """A clean response parses to exactly its cards, through the fast path."""
+    cards = random_cards(rng)
+    result = parse_cards(render(rng, cards))
+    if result['cards'] != cards or result['recovered']:
+        return f"expected {len(cards)} clean cards, got {result}"
+
+def prop_chunking(rng):
+    """Splitting the response into arbitrary chunks changes nothing."""
+    cards = random_cards(rng)
+    parsed, summary = feed_in_chunks(rng, render(rng, cards))
+    if parsed != cards or summary['truncated']:
+        return f"expected {len(cards)} cards, got {len(parsed)} ({summary})"
+
+def prop_truncation(rng):
+    """Cutting the response anywhere keeps exactly the cards completed before the cut."""
+    cards = random_cards(rng)
+    if not cards:
+        return None
+    text = render(rng, cards)
+    # Where each card's closing brace falls in the text
+    ends = []
+    decoder = json.JSONDecoder()
+    i = text.index('[') + 1
+    for _ in cards:
+        while text[i] in ' \n,':
+            i += 1
+        _, i = decoder.raw_decode(text, i)
+        ends.append(i)
+
+    cut = rng.randint(0, len(text))
+    expected = [card for card, end in zip(cards, ends) if end <= cut]
+    result = parse_cards(text[:cut])
+    if result['cards'] != expected:
+        return f"cut at {cut}/{len(text)}: expected {len(expected)} cards, got {len(result['cards'])}"
+    if cut < len(text) and not result['recovered']:
+        return f"cut at {cut}/{len(text)} not reported as recovered"
+
+def prop_noise(rng):
+    """Prose, code fences, stray braces and wrapper objects around the array lose no cards."""
+    cards = random_cards(rng)
+    body = render(rng, cards)
+    if rng.random() < 0.5:
+        body = json.dumps({"flashcards": cards, "count": len(cards)}, indent=rng.choice([None, 2]))
+    prefix = rng.choice(['', 'Here are your flashcards:\n', 'Sure! {see below}\n', '```json\n',
+                         'Note: use "quotes" and a stray { here\n'])
+    suffix = rng.choice(['', '\n```', '\nLet me know if you want more}', '\nI hope these help!'])
+    parsed, _ = feed_in_chunks(rng, prefix + body + suffix)
+    if parsed != cards:
+        return f"expected {len(cards)} cards, got {len(parsed)} from {prefix!r} ... {suffix!r}"
+
+def prop_repairs(rng):
+    """Trailing commas and non-card objects are handled without losing neighbouring cards."""
+    cards = random_cards(rng)
+    parts = []
+    rejected = 0
+    for card in cards:
+        text = json.dumps(card)
+        if rng.random() < 0.3:
+            text = text[:-1] + ',}'
+        parts.append(text)
+        if rng.random() < 0.2:
+            parts.append('{"note": "not a card"}')
+            rejected += 1
+    result = parse_cards('[' + ', '.join(parts) + ']')
+    if result['cards'] != cards or result['rejected'] != rejected:
+        return f"expected {len(cards)} cards and {rejected} rejected, got {len(result['cards'])}, {result['rejected']}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    print("=== Card Parser Test ===\n")
+    print(f"Seed: {seed}\n")
+    results = [
+        check("clean responses round-trip", args.trials, prop_round_trip, seed),
+        check("chunk boundaries don't matter", args.trials, prop_chunking, seed),
+        check("truncated responses keep every complete card", args.trials, prop_truncation, seed),
+        check("prose and wrappers are skipped", args.trials, prop_noise, seed),
+        check("trailing commas repaired, non-cards rejected", args.trials, prop_repairs, seed),
+    ]
+    if all(results):
+        print("\n✅ Card parser test completed successfully!")
+    else:
+        print("\n❌ Card parser test failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Study Session Delta Test Script
+Run this against a development database to verify that study session delta
+tokens don't lose progress written by transactions that commit out of order.
+
+Two progress writes run in interleaved transactions: a reschedule of the
+first card starts writing, a review of the second card writes and commits,
+a client polls the session, and only then does the reschedule commit. The
+client's next delta must include the first card even though a later write
+was already visible when it polled. (Reviews of one user serialize on their
+progress summary rows, so the first writer is a reschedule, which doesn't
+touch them.)
+"""
+
+import os
+import sys
+import uuid
+
+# Add the python_ai_service directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'python_ai_service'))
+
+from python_ai_service.db.bulk import insert_flashcards
+from python_ai_service.db.database import db_connection
+from python_ai_service.routes.progress_routes import (
+    STUDY_DELTA_SQL, STUDY_SESSION_SQL, parse_session_token, study_delta, study_session
+)
+from python_ai_service.services.scheduler import CORRECT_GRADE, INCORRECT_GRADE, record_review, reschedule_user
+
+
+def seed(conn):
+    """Create a throwaway user with a two-card set, the first card reviewed.
+
+    Returns (user_id, set_id, card_ids).
+    """
+    set_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, 'x') RETURNING id",
+                    (f"delta-test-{set_id[:8]}", f"delta-test-{set_id[:8]}@example.com"))
+        user_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO sets (set_id, topic, intensity_level, card_count, name, user_id)
+            VALUES (%s, 'delta test', 'general learning', 2, 'Delta Test', %s)
+        """, (set_id, user_id))
+        insert_flashcards(cur, set_id, [{'front': 'first', 'back': '1'}, {'front': 'second', 'back': '2'}])
+        cur.execute("SELECT id FROM flashcards WHERE set_id = %s ORDER BY id", (set_id,))
+        card_ids = [row[0] for row in cur.fetchall()]
+        record_review(cur, user_id, card_ids[0], INCORRECT_GRADE)
+    conn.commit()
+    return user_id, set_id, card_ids
+
+
+def poll(conn, user_id, set_id, token=None):
+    """Fetch the session the way GET /study/session does."""
+    with conn.cursor() as cur:
+        if token is not None:
+            since = parse_session_token(token)
+            cur.execute(STUDY_DELTA_SQL, (user_id, since[1], set_id))
+            response = study_delta(cur.fetchall(), since)
+        else:
+            cur.execute(STUDY_SESSION_SQL, (user_id, set_id))
+            response = study_session(cur.fetchall())
+    conn.rollback()
+    return response
+
+
+def test_interleaved_commits():
+    print("=== Study Session Delta Test ===\n")
+    with db_connection() as setup:
+        user_id, set_id, (first_card, second_card) = seed(setup)
+        try:
+            with db_connection() as first, db_connection() as second, db_connection() as client:
+                # The first writer starts (and takes its transaction id) before the second
+                with first.cursor() as cur:
+                    cur.execute("UPDATE review_log SET grade = %s WHERE user_id = %s", (CORRECT_GRADE, user_id))
+                    reschedule_user(cur, user_id)
+                with second.cursor() as cur:
+                    record_review(cur, user_id, second_card, CORRECT_GRADE)
+                second.commit()
+
+                session = poll(client, user_id, set_id)
+                print(f"Polled while the reschedule is uncommitted, token {session['version']}")
+                if second_card not in session['progress']:
+                    print("❌ The committed review of the second card is missing")
+                    return False
+
+                first.commit()
+                delta = poll(client, user_id, set_id, session['version'])
+                if delta is None or first_card not in delta['progress']:
+                    print(f"❌ Delta after the late commit missed the reschedule of card {first_card}: {delta}")
+                    return False
+                print(f"✅ Delta after the late commit includes card {first_card}")
+
+                settled = poll(client, user_id, set_id, delta['version'])
+                if settled['progress']:
+                    print(f"❌ Delta with nothing running still returned {sorted(settled['progress'])}")
+                    return False
+                print("✅ Next delta is empty once no writer is running")
+                return True
+        finally:
+            with setup.cursor() as cur:
+                cur.execute("DELETE FROM sets WHERE user_id = %s", (user_id,))
+                cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            setup.commit()
+
+
+if __name__ == "__main__":
+    if test_interleaved_commits():
+        print("\n✅ Study session delta test completed successfully!")
+    else:
+        sys.exit(1)
@@ -38,15 +38,29 @@ const GenerationInput: React.FC = () => {
         }
       }
 
+      // Generation runs as a background job; poll it until it finishes
       const response = await axios.post('http://localhost:5001/generate_flashcards', requestData, {
         withCredentials: true
       });
 
-      console.log('Flashcards generated:', response.data);
+      let job = response.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await axios.get(`http://localhost:5001/generation_jobs/${job.job_id}`, {
+          withCredentials: true
+        });
+        job = statusResponse.data;
+      }
+
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || 'Generation job failed');
+      }
+
+      console.log('Flashcards generated:', job.result);
       
       // Store the set_id in localStorage for the edit cards page
-      if (response.data.set_id) {
-        localStorage.setItem('currentSetId', response.data.set_id);
+      if (job.result.set_id) {
+        localStorage.setItem('currentSetId', job.result.set_id);
       }
       
       // Navigate to the edit cards page to see the generated flashcards
@@ -6,19 +6,19 @@ import axios from 'axios';
 import { Bar, BarChart, ResponsiveContainer } from "recharts"
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card"
 
-interface SetInfo {
+// One set's row from /progress/summary, kept up to date by every progress write
+interface SetSummary {
     name: string;
     card_count: number;
-}
-
-interface ProgressData {
-    [cardId: number]: number;
+    cards_seen: number;
+    cards_mastered: number;
+    reviews: number;
+    streak_days: number;
 }
 
 const LearnDashboard: React.FC = () => {
     const { setId } = useParams<{ setId: string }>();
-    const [setInfo, setSetInfo] = useState<SetInfo | null>(null);
-    const [progress, setProgress] = useState<ProgressData>({});
+    const [summary, setSummary] = useState<SetSummary | null>(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
 
@@ -27,12 +27,8 @@ const LearnDashboard: React.FC = () => {
             if (!setId) return;
             try {
                 setLoading(true);
-                const [setInfoRes, progressRes] = await Promise.all([
-                    axios.get(`http://localhost:5001/get_flashcards_by_set/${setId}`, { withCredentials: true }),
-                    axios.get(`http://localhost:5001/progress/set/${setId}`, { withCredentials: true })
-                ]);
-                setSetInfo(setInfoRes.data.set_info);
-                setProgress(progressRes.data);
+                const { data } = await axios.get(`http://localhost:5001/progress/summary/${setId}`, { withCredentials: true });
+                setSummary(data);
             } catch (err) {
                 setError(err instanceof Error ? err.message : 'An unknown error occurred');
             } finally {
@@ -43,12 +39,14 @@ const LearnDashboard: React.FC = () => {
         fetchDashboardData();
     }, [setId]);
 
-    const progressChartData = Object.entries(progress).map(([cardId, correctCount]) => ({
-        name: `Card ${cardId}`,
-        total: correctCount,
-    }));
-    
-    const masteredCount = Object.values(progress).filter(count => count >= 3).length;
+    const cardCount = summary?.card_count || 0;
+    const masteredCount = summary?.cards_mastered || 0;
+    const seenCount = summary?.cards_seen || 0;
+    const progressChartData = [
+        { name: 'Not started', total: Math.max(cardCount - seenCount, 0) },
+        { name: 'Learning', total: Math.max(seenCount - masteredCount, 0) },
+        { name: 'Mastered', total: masteredCount },
+    ];
 
     if (loading) return <div className="p-8 text-center">Loading Dashboard...</div>;
     if (error) return <div className="p-8 text-center text-red-500">Error: {error}</div>;
@@ -56,8 +54,8 @@ const LearnDashboard: React.FC = () => {
     return (
         <div className="min-h-screen bg-gray-50 p-8">
             <div className="max-w-6xl mx-auto">
-                <h1 className="text-3xl font-bold text-gray-900 mb-2">Studying: {setInfo?.name}</h1>
-                <p className="text-gray-600 mb-8">You have {setInfo?.card_count || 0} cards in this set. Choose a study mode to begin.</p>
+                <h1 className="text-3xl font-bold text-gray-900 mb-2">Studying: {summary?.name}</h1>
+                <p className="text-gray-600 mb-8">You have {cardCount} cards in this set. Choose a study mode to begin.</p>
                 
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-8">
                     {/* Overall Progress Stats */}
@@ -66,8 +64,11 @@ const LearnDashboard: React.FC = () => {
                             <CardTitle>Overall Progress</CardTitle>
                         </CardHeader>
                         <CardContent>
-                            <div className="text-2xl font-bold">{masteredCount} / {setInfo?.card_count || 0}</div>
+                            <div className="text-2xl font-bold">{masteredCount} / {cardCount}</div>
                             <p className="text-xs text-muted-foreground">Cards Mastered (3+ correct)</p>
+                            <p className="text-xs text-muted-foreground">
+                                {summary?.reviews || 0} reviews, {summary?.streak_days || 0} day streak
+                            </p>
                             <div className="h-[120px]">
                                 <ResponsiveContainer width="100%" height="100%">
                                     <BarChart data={progressChartData}>
@@ -84,19 +85,19 @@ const LearnDashboard: React.FC = () => {
                             title="Memorize"
                             description="Recall the card front from the back."
                             link={`/learn/${setId}/memorize`}
-                            progress={{completed: masteredCount, total: setInfo?.card_count || 0}}
+                            progress={{completed: masteredCount, total: cardCount}}
                         />
                         <StudyModeCard
                             title="Matching"
                             description="Match terms with their definitions in a grid."
                             link={`/learn/${setId}/matching`}
-                            progress={{completed: 0, total: setInfo?.card_count || 0}} // Placeholder
+                            progress={{completed: 0, total: cardCount}} // Placeholder
                         />
                         <StudyModeCard
                             title="Quiz"
                             description="Test your knowledge with multiple-choice questions."
                             link={`/learn/${setId}/quiz`}
-                             progress={{completed: 0, total: setInfo?.card_count || 0}} // Placeholder
+                             progress={{completed: 0, total: cardCount}} // Placeholder
                         />
                     </div>
                 </div>
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import axios from 'axios';
 
@@ -12,6 +12,9 @@ interface SetInfo {
     name: string;
 }
 
+// Deltas are complete on their own, but reload everything now and then anyway
+const FULL_REFRESH_MS = 5 * 60 * 1000;
+
 const Memorize: React.FC = () => {
   const { setId } = useParams<{ setId: string }>();
   const [setInfo, setSetInfo] = useState<SetInfo | null>(null)
@@ -24,23 +27,39 @@ const Memorize: React.FC = () => {
   const [showAnswer, setShowAnswer] = useState(false);
   const [selectedAnswer, setSelectedAnswer] = useState<string | null>(null);
 
-  const fetchSetData = useCallback(async () => {
+  const [sessionVersion, setSessionVersion] = useState<string | null>(null);
+  const lastFullRefresh = useRef(0);
+
+  const fetchSetData = useCallback(async (since?: string | null) => {
     if (!setId) return;
     try {
-      setLoading(true);
-      const [setData, progressData] = await Promise.all([
-        axios.get(`http://localhost:5001/get_flashcards_by_set/${setId}`, { withCredentials: true }),
-        axios.get(`http://localhost:5001/progress/set/${setId}`, { withCredentials: true })
-      ]);
-      
-      setCards(setData.data.flashcards);
-      setSetInfo(setData.data.set_info);
-      
-      const progressMap: Record<number, number> = {};
-      setData.data.flashcards.forEach((card: Card) => {
-        progressMap[card.id] = progressData.data[card.id] || 0;
+      if (!lastFullRefresh.current) setLoading(true);
+      const { data } = await axios.get(`http://localhost:5001/study/session/${setId}`, {
+        params: since ? { since } : {},
+        withCredentials: true
       });
-      setProgress(progressMap);
+
+      if (data.delta) {
+        // Only the progress rows that changed since our last refresh
+        setProgress(prev => {
+          const next = { ...prev };
+          Object.entries(data.progress).forEach(([cardId, entry]: [string, any]) => {
+            next[Number(cardId)] = entry.correct_count;
+          });
+          return next;
+        });
+      } else {
+        setCards(data.cards);
+        setSetInfo(data.set_info);
+
+        const progressMap: Record<number, number> = {};
+        data.cards.forEach((card: Card) => {
+          progressMap[card.id] = data.progress[card.id]?.correct_count || 0;
+        });
+        setProgress(progressMap);
+        lastFullRefresh.current = Date.now();
+      }
+      setSessionVersion(data.version);
 
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An unknown error occurred');
@@ -99,8 +118,8 @@ const Memorize: React.FC = () => {
     } else {
         // finished, for now just restart
         setCurrentCardIndex(0);
-        // Optionally refetch data to ensure sync with db
-        fetchSetData();
+        // Refresh only what changed since the session was loaded, with a full reload every few minutes
+        fetchSetData(Date.now() - lastFullRefresh.current < FULL_REFRESH_MS ? sessionVersion : null);
     }
   };
 